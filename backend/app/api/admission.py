@@ -0,0 +1,232 @@
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "on").lower() not in (
+    "0", "off", "false", "no"
+)
+# Behind a proxy the client address is the first X-Forwarded-For hop
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "false").lower() in (
+    "1", "true", "yes", "on"
+)
+# Token buckets kept per route, least recently seen clients dropped first
+MAX_TRACKED_CLIENTS = int(os.getenv("ADMISSION_MAX_TRACKED_CLIENTS", "10000"))
+# Scope key under which AdmissionMiddleware collects slots to free
+RELEASES_KEY = "admission.releases"
+
+
+@dataclass(frozen=True)
+class AdmissionLimits:
+    # Requests a route runs at once; None for no limit
+    max_concurrent: Optional[int] = None
+    # Requests allowed to wait for a slot; beyond that they are shed at once
+    max_queued: int = 0
+    # Longest wait for a slot before giving up with 503
+    queue_timeout: float = 1.0
+    # Sustained requests per second per client; None for no limit
+    rate: Optional[float] = None
+    # Requests a client may make in a burst; defaults to one second's worth
+    burst: Optional[int] = None
+
+
+class ConcurrencyLimiter:
+    def __init__(self, limits: AdmissionLimits):
+        self.limits = limits
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+        self._semaphore = asyncio.Semaphore(limits.max_concurrent)
+
+    def _reject(self, detail: str) -> HTTPException:
+        self.shed += 1
+        retry_after = max(1, math.ceil(self.limits.queue_timeout))
+        return HTTPException(
+            status_code=503, detail=detail, headers={"Retry-After": str(retry_after)}
+        )
+
+    async def acquire(self) -> None:
+        if self._semaphore.locked():
+            if self.waiting >= self.limits.max_queued:
+                raise self._reject("Server busy, try again shortly")
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.limits.queue_timeout)
+            except asyncio.TimeoutError:
+                raise self._reject("Server busy, try again shortly")
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+        self.admitted += 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def status(self) -> dict:
+        return {
+            "limit": self.limits.max_concurrent,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "shed": self.shed,
+        }
+
+
+class TokenBucket:
+    """
+    Per-client token buckets for one route: each client gains ``rate``
+    tokens a second up to ``burst`` and spends one per request.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.limited = 0
+        self._clients: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, client: str) -> float:
+        """
+        Spend a token for ``client``; returns 0, or the seconds until one is
+        available if the bucket is empty.
+        """
+        now = time.monotonic()
+        tokens, updated = self._clients.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+            self.limited += 1
+        self._clients[client] = (tokens, now)
+        if len(self._clients) > MAX_TRACKED_CLIENTS:
+            self._clients.popitem(last=False)
+        return wait
+
+    def status(self) -> dict:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "clients": len(self._clients),
+            "limited": self.limited,
+        }
+
+
+def client_key(request: Request) -> str:
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+class AdmissionControl:
+    """
+    Router dependency shedding load before a request touches the database:
+    a per-client token bucket answers 429 and a per-route concurrency limit
+    answers 503 once its queue is full or a request waited too long, both
+    with Retry-After. Every route of the router gets its own limiter and
+    buckets, configured by ``routes`` (keyed by ``"METHOD /path"`` or
+    ``"/path"`` as declared, prefix included) or else by ``default``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        default: Optional[AdmissionLimits] = None,
+        routes: Optional[Dict[str, AdmissionLimits]] = None,
+    ):
+        self.name = name
+        self.default = default
+        self.routes = routes or {}
+        self._limiters: Dict[str, ConcurrencyLimiter] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        admission_controls.append(self)
+
+    def _limits(self, method: str, path: str) -> Optional[AdmissionLimits]:
+        return self.routes.get(f"{method} {path}", self.routes.get(path, self.default))
+
+    async def __call__(self, request: Request):
+        route = request.scope.get("route")
+        path = getattr(route, "path", request.url.path)
+        limits = self._limits(request.method, path) if ADMISSION_CONTROL else None
+        if limits is None:
+            yield
+            return
+        key = f"{request.method} {path}"
+
+        if limits.rate:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                burst = limits.burst or max(1, math.ceil(limits.rate))
+                bucket = self._buckets[key] = TokenBucket(limits.rate, burst)
+            wait = bucket.take(client_key(request))
+            if wait:
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many requests",
+                    headers={"Retry-After": str(max(1, math.ceil(wait)))},
+                )
+
+        if not limits.max_concurrent:
+            yield
+            return
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            limiter = self._limiters[key] = ConcurrencyLimiter(limits)
+        await limiter.acquire()
+        releases = request.scope.get(RELEASES_KEY)
+        if releases is not None:
+            # Dependencies exit before a streamed body is sent; the
+            # middleware frees the slot once the response is complete
+            releases.append(limiter.release)
+            yield
+            return
+        try:
+            yield
+        finally:
+            limiter.release()
+
+    def status(self) -> dict:
+        return {
+            "concurrency": {key: limiter.status() for key, limiter in self._limiters.items()},
+            "rate_limits": {key: bucket.status() for key, bucket in self._buckets.items()},
+        }
+
+
+class AdmissionMiddleware:
+    """
+    Holds concurrency slots taken by AdmissionControl until the whole
+    response has been sent, so streamed exports count while they stream.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        releases = scope[RELEASES_KEY] = []
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            for release in releases:
+                release()
+
+
+admission_controls: List[AdmissionControl] = []
+
+
+def admission_status() -> dict:
+    return {control.name: control.status() for control in admission_controls}
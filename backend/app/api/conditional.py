@@ -0,0 +1,55 @@
+import hashlib
+import os
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from data.database import get_session
+from services.catalog_version import get_catalog_version
+
+# Clients may store responses but must revalidate them with If-None-Match
+SITES_CACHE_CONTROL = os.getenv("SITES_CACHE_CONTROL", "public, no-cache")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison function (RFC 9110, 13.1.2)
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def check_etag(request: Request, response: Response, etag: str) -> None:
+    """
+    Answer 304 Not Modified when the client already holds ``etag``;
+    otherwise attach the validator and caching policy to ``response``.
+    """
+    headers = {"ETag": etag, "Cache-Control": SITES_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+
+def site_etag(site_id: int, digest: str) -> str:
+    """
+    Derived from the representation itself: ids are reused after a delete
+    and versions restart at 1, so neither identifies the content alone.
+    """
+    return f'"site-{site_id}-{digest}"'
+
+
+async def catalog_etag(
+    request: Request, response: Response, db: AsyncSession = Depends(get_session)
+) -> None:
+    """
+    Route dependency for collection reads: the ETag is derived from the
+    catalog version and the request's query, so an unchanged catalog is
+    answered with 304 before the route runs a query or serializes anything.
+    """
+    version = await get_catalog_version(db)
+    query = sorted(request.query_params.multi_items())
+    digest = hashlib.sha1(repr((request.url.path, query)).encode()).hexdigest()
+    check_etag(request, response, f'"catalog-{version}-{digest[:16]}"')
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 
 from services.contributions_service import (
     create_contribution,
@@ -16,6 +18,8 @@ from schemas.contributions import (
     ContributionRead,
 )
 from models.contributions import ContributionStatus
+from services.export_service import MEDIA_TYPES, stream_contributions
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
 
 from data.database import get_session
 
@@ -30,17 +34,43 @@ async def create_contribution_endpoint(
 
 
 @router.get("/all", response_model=list[ContributionRead])
-async def get_all_contributions_endpoint(db: AsyncSession = Depends(get_session)):
-    return await get_all_contributions(db)
+async def get_all_contributions_endpoint(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_session),
+):
+    page = await get_all_contributions(db, limit, cursor)
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return page.items
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_contributions_endpoint(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$")
+):
+    return StreamingResponse(
+        stream_contributions(format),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="contributions.{format}"'
+        },
+    )
 
 
 @router.get("/by-status", response_model=list[ContributionRead])
 async def list_contributions(
+    response: Response,
     status: ContributionStatus = ContributionStatus.pending,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_session),
 ):
-    contributions = await list_contributions_by_status(db, status)
-    return contributions
+    page = await list_contributions_by_status(db, status, limit, cursor)
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return page.items
 
 
 @router.patch("/{contribution_id}/approve", response_model=ContributionRead)
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import ORJSONResponse
+
+from data.schema import head_revision
+
+router = APIRouter()
+
+
+@router.get("/live")
+async def liveness():
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def readiness(request: Request):
+    """
+    200 once migrations are applied and in-process indexes are loaded, 503
+    before; point the load balancer's readiness probe here.
+    """
+    if not getattr(request.app.state, "ready", False):
+        return ORJSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready", "schema_revision": head_revision()}
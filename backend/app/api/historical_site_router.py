@@ -1,12 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
+from api.conditional import catalog_etag, check_etag, site_etag
+from api.responses import encoded, raw_json
 from data.database import get_session
 from typing import Optional, List
 from schemas.historical_site import (
     HistoricalSiteCreate,
+    HistoricalSiteDetail,
     HistoricalSiteRead,
+    HistoricalSiteNearbyRead,
     HistoricalSiteUpdate,
+    MapCluster,
+    TagFacet,
+    TimelineBucket,
+    BulkImportReport,
+)
+from services.bulk_import_service import (
+    BULK_IMPORT_CHUNK_SIZE,
+    format_from_content_type,
+    import_sites,
+    parse_rows,
 )
 from services.historical_site_service import (
     create_historical_site,
@@ -16,13 +31,35 @@ from services.historical_site_service import (
     delete_historical_site,
     search_historical_sites,
     search_nearby_sites,
+    get_tag_facets,
     get_sites_by_date_range,
+    get_site_timeline,
+    TIMELINE_BUCKETS,
+    get_site_detail,
+    get_site_details_in_viewport,
+    get_site_columns_in_bounds,
+)
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from services.catalog_version import get_catalog_version
+from services.cluster_index import cluster_index, parse_bbox
+from services.export_service import MEDIA_TYPES, stream_sites
+from services.serialization import (
+    COLUMNAR_FORMATS,
+    dump_list,
+    msgpack_available,
+    nearby_reads,
 )
-from models.historical_site import HistoricalSite
 
 
 router = APIRouter()
 
+MAX_NEARBY_LIMIT = 500
+MAX_SEARCH_LIMIT = 200
+MAX_VIEWPORT_LIMIT = 500
+MAX_MAP_ZOOM = 24
+MAX_IN_BOUNDS_LIMIT = 10000
+MAX_BULK_CHUNK_SIZE = 10000
+
 
 @router.post("/", response_model=HistoricalSiteRead)
 async def create_site_endpoint(
@@ -36,61 +73,275 @@ async def create_site_endpoint(
     return site
 
 
-@router.get("/search", response_model=list[HistoricalSite])
+@router.post("/bulk", response_model=BulkImportReport)
+async def bulk_import_endpoint(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(json|ndjson|csv)$"),
+    chunk_size: int = Query(BULK_IMPORT_CHUNK_SIZE, ge=1, le=MAX_BULK_CHUNK_SIZE),
+    db: AsyncSession = Depends(get_session),
+):
+    """
+    Upsert sites (matched by name) from a JSON array, NDJSON or CSV body,
+    streamed and written in chunks. The format defaults to the one implied
+    by the Content-Type header.
+    """
+    format = format or format_from_content_type(request.headers.get("content-type"))
+    try:
+        return await import_sites(db, parse_rows(request.stream(), format), chunk_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_sites_endpoint(format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    return StreamingResponse(
+        stream_sites(format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="sites.{format}"'},
+    )
+
+
+@router.get(
+    "/search",
+    response_model=list[HistoricalSiteRead],
+    dependencies=[Depends(catalog_etag)],
+)
 async def search_sites_endpoint(
+    response: Response,
     query: Optional[str] = Query(None),
     tags: Optional[List[str]] = Query(None),
+    tag_mode: str = Query("any", pattern="^(any|all)$"),
+    limit: int = Query(50, ge=1, le=MAX_SEARCH_LIMIT),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_session),
 ):
     try:
-        sites = await search_historical_sites(db, query_string=query, tags=tags)
-        return sites
+        page = await search_historical_sites(
+            db,
+            query_string=query,
+            tags=tags,
+            limit=limit,
+            cursor=cursor,
+            match_all_tags=tag_mode == "all",
+        )
+        if page.next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+        return raw_json(page.items, response)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/dates", response_model=list[HistoricalSiteRead])
+@router.get(
+    "/tags", response_model=list[TagFacet], dependencies=[Depends(catalog_etag)]
+)
+async def tag_facets_endpoint(
+    query: Optional[str] = Query(None),
+    tags: Optional[List[str]] = Query(None),
+    tag_mode: str = Query("any", pattern="^(any|all)$"),
+    db: AsyncSession = Depends(get_session),
+):
+    facets = await get_tag_facets(
+        db, query_string=query, tags=tags, match_all_tags=tag_mode == "all"
+    )
+    return [TagFacet(tag=tag, count=count) for tag, count in facets]
+
+
+@router.get(
+    "/dates",
+    response_model=list[HistoricalSiteRead],
+    dependencies=[Depends(catalog_etag)],
+)
 async def fetch_sites_by_dates(
+    response: Response,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_session),
 ):
-    sites = await get_sites_by_date_range(db, start_date, end_date)
-    return sites
+    page = await get_sites_by_date_range(db, start_date, end_date, limit, cursor)
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return raw_json(page.items, response)
 
 
-@router.get("/nearby", response_model=list[HistoricalSiteRead])
+@router.get(
+    "/timeline",
+    response_model=list[TimelineBucket],
+    dependencies=[Depends(catalog_etag)],
+)
+async def site_timeline_endpoint(
+    bucket: str = Query("decade", pattern="^(year|decade|century)$"),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_session),
+):
+    """
+    Number of sites established per year, decade or century.
+    """
+    try:
+        counts = await get_site_timeline(db, bucket, start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    width = TIMELINE_BUCKETS[bucket]
+    return [
+        TimelineBucket(start_year=year, end_year=year + width - 1, count=count)
+        for year, count in counts
+    ]
+
+
+@router.get(
+    "/nearby",
+    response_model=list[HistoricalSiteNearbyRead],
+    dependencies=[Depends(catalog_etag)],
+)
 async def get_nearby_sites(
+    response: Response,
     latitude: float,
     longitude: float,
-    max_distance: float,
+    max_distance: Optional[float] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_NEARBY_LIMIT),
+    db: AsyncSession = Depends(get_session),
+):
+    try:
+        results = await search_nearby_sites(
+            db, latitude, longitude, radius=max_distance, limit=limit
+        )
+        return raw_json(
+            dump_list(HistoricalSiteNearbyRead, nearby_reads(results)), response
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get(
+    "/clusters",
+    response_model=list[MapCluster],
+    dependencies=[Depends(catalog_etag)],
+)
+async def get_map_clusters(
+    response: Response,
+    bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat"),
+    zoom: int = Query(..., ge=0, le=MAX_MAP_ZOOM),
+):
+    """
+    Marker clusters for a map viewport, served from the in-memory cluster
+    index.
+    """
+    try:
+        clusters = cluster_index.clusters(*parse_bbox(bbox), zoom)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return raw_json(dump_list(MapCluster, clusters), response)
+
+
+@router.get("/in-bounds", dependencies=[Depends(catalog_etag)])
+async def get_sites_in_bounds(
+    response: Response,
+    bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat"),
+    fields: Optional[List[str]] = Query(
+        None, description="Columns to return, comma separated; id is always included"
+    ),
+    format: str = Query("json", pattern="^(json|msgpack)$"),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_IN_BOUNDS_LIMIT),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_session),
+):
+    """
+    Only the requested columns of the sites in the box, as parallel arrays:
+    ``{"count": n, "columns": {"id": [...], "name": [...], ...}}``, in JSON
+    or, with ``format=msgpack`` (requires the msgpack package), MessagePack.
+    """
+    if format == "msgpack" and not msgpack_available():
+        raise HTTPException(status_code=406, detail="MessagePack is not available")
+    if fields:
+        fields = [
+            field.strip() for value in fields for field in value.split(",") if field.strip()
+        ]
+    try:
+        west, south, east, north = parse_bbox(bbox)
+        page = await get_site_columns_in_bounds(
+            db, south, west, north, east, fields, limit, cursor, format
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return encoded(page.items, response, COLUMNAR_FORMATS[format])
+
+
+@router.get("/viewport", response_model=list[HistoricalSiteDetail])
+async def get_viewport_sites(
+    response: Response,
+    min_lat: float,
+    min_lon: float,
+    max_lat: float,
+    max_lon: float,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_VIEWPORT_LIMIT),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_session),
 ):
     try:
-        sites = await search_nearby_sites(db, latitude, longitude, max_distance)
-        return [HistoricalSiteRead.from_orm(site) for site in sites]
+        page = await get_site_details_in_viewport(
+            db, min_lat, min_lon, max_lat, max_lon, limit, cursor
+        )
+        if page.next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+        return raw_json(dump_list(HistoricalSiteDetail, page.items), response)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/{site_id}", response_model=HistoricalSiteRead)
-async def get_site_endpoint(site_id: int, db: AsyncSession = Depends(get_session)):
+async def get_site_endpoint(
+    site_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_session),
+):
+    # Drops what this process cached if another one changed the catalog
+    await get_catalog_version(db)
     site = await get_historical_site(db, site_id)
-    if not site:
-        raise HTTPException(status_code=404, detail="Site not found")
-    return HistoricalSiteRead.from_orm(site)
+    check_etag(request, response, site_etag(site_id, site.digest))
+    return raw_json(site.body, response)
 
 
-@router.get("/", response_model=list[HistoricalSiteRead])
-async def get_all_sites_endpoint(db: AsyncSession = Depends(get_session)):
+@router.get("/{site_id}/detail", response_model=HistoricalSiteDetail)
+async def get_site_detail_endpoint(
+    site_id: int, response: Response, db: AsyncSession = Depends(get_session)
+):
+    site = await get_site_detail(db, site_id)
+    return raw_json(site.model_dump_json().encode(), response)
+
+
+@router.get(
+    "/",
+    response_model=list[HistoricalSiteRead],
+    dependencies=[Depends(catalog_etag)],
+)
+async def get_all_sites_endpoint(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_session),
+):
     try:
-        sites = await get_all_historical_sites(db)
-        return sites
+        page = await get_all_historical_sites(db, limit, cursor)
+        if page.next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+        return raw_json(page.items, response)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    return HistoricalSiteRead.from_orm(sites)
 
 
 @router.put("/{site_id}", response_model=HistoricalSiteRead)
@@ -102,12 +353,14 @@ async def update_site_endpoint(
     site = await update_historical_site(db, site_id, site_update)
     if not site:
         raise HTTPException(status_code=404, detail="Site not found")
-    return HistoricalSiteRead.from_orm(site)
+    return site
 
 
 @router.delete("/{site_id}", response_model=HistoricalSiteRead)
-async def delete_site_endpoint(site_id: int, db: AsyncSession = Depends(get_session)):
+async def delete_site_endpoint(
+    site_id: int, response: Response, db: AsyncSession = Depends(get_session)
+):
     site = await delete_historical_site(db, site_id)
     if not site:
         raise HTTPException(status_code=404, detail="Not successful in deleting site")
-    return HistoricalSiteRead.from_orm(site)
+    return raw_json(site.model_dump_json().encode(), response)
@@ -0,0 +1,243 @@
+import logging
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.admission import admission_status
+from data.database import pool_status
+from services.cache import site_cache
+from services.job_queue import job_queue
+from services.metrics import Family, registry
+
+logger = logging.getLogger(__name__)
+
+# A request running the same SELECT this many times is probably loading a
+# relationship row by row (N+1)
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+
+SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+
+REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds",
+    "Request latency by method, route template and status",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight", "Requests being handled right now"
+)
+REQUEST_QUERIES = registry.histogram(
+    "http_request_db_queries",
+    "Database queries issued per request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+REQUEST_DB_SECONDS = registry.histogram(
+    "http_request_db_seconds", "Time per request spent in database queries", ["route"]
+)
+QUERY_DURATION = registry.histogram(
+    "db_query_duration_seconds",
+    "Database query latency by statement type",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+N_PLUS_ONE = registry.counter(
+    "db_n_plus_one_requests",
+    f"Requests that ran one SELECT at least {N_PLUS_ONE_THRESHOLD} times",
+    ["route"],
+)
+
+
+class RequestQueries:
+    """
+    Queries issued while handling one request.
+    """
+
+    __slots__ = ("count", "seconds", "selects", "log")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        # Occurrences of each SELECT statement, to spot N+1 patterns
+        self.selects: Counter = Counter()
+        # (statement, seconds) of every query, only when someone asks for it
+        self.log: Optional[List[tuple]] = None
+
+    def most_repeated(self) -> int:
+        return max(self.selects.values(), default=0)
+
+
+_request_queries: ContextVar[Optional[RequestQueries]] = ContextVar(
+    "request_queries", default=None
+)
+
+
+def current_queries() -> Optional[RequestQueries]:
+    return _request_queries.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+    words = statement.lstrip()[:7].split(None, 1)
+    operation = words[0].upper() if words else ""
+    if operation not in SQL_OPERATIONS:
+        operation = "OTHER"
+    QUERY_DURATION.observe(operation, value=elapsed)
+    queries = _request_queries.get()
+    if queries is not None:
+        queries.count += 1
+        queries.seconds += elapsed
+        if operation == "SELECT":
+            queries.selects[statement] += 1
+        if queries.log is not None:
+            queries.log.append((statement, elapsed))
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """
+    Records latency per route template (not raw path, to keep label
+    cardinality bounded) and the queries each request issued. Plain ASGI,
+    so streamed responses pass through untouched.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._n_plus_one_reported = set()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        queries = RequestQueries()
+        token = _request_queries.set(queries)
+        REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            REQUESTS_IN_FLIGHT.dec()
+            _request_queries.reset(token)
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            REQUEST_DURATION.observe(scope["method"], template, str(status), value=elapsed)
+            REQUEST_QUERIES.observe(template, value=queries.count)
+            if queries.count:
+                REQUEST_DB_SECONDS.observe(template, value=queries.seconds)
+            repeated = queries.most_repeated()
+            if repeated >= N_PLUS_ONE_THRESHOLD:
+                N_PLUS_ONE.inc(template)
+                if template not in self._n_plus_one_reported:
+                    self._n_plus_one_reported.add(template)
+                    logger.warning(
+                        f"Possible N+1 queries on {scope['method']} {template}: "
+                        f"one SELECT ran {repeated} times"
+                    )
+
+
+def _gauge(name: str, help: str, value: float) -> Family:
+    return (name, "gauge", help, [("", {}, value)])
+
+
+def _counter(name: str, help: str, value: float) -> Family:
+    return (name, "counter", help, [("_total", {}, value)])
+
+
+@registry.collector
+def _pool_metrics() -> List[Family]:
+    status = pool_status()
+    families = [
+        _counter("db_pool_checkouts", "Connections checked out of the pool", status["checkouts"]),
+        _counter(
+            "db_pool_checkout_wait_seconds",
+            "Time spent waiting for a pooled connection",
+            status["wait_seconds_total"],
+        ),
+        _gauge(
+            "db_pool_checkout_wait_seconds_max",
+            "Longest wait for a pooled connection",
+            status["wait_seconds_max"],
+        ),
+    ]
+    for key, help in (
+        ("size", "Pool size"),
+        ("checked_out", "Connections in use"),
+        ("overflow", "Connections open beyond the pool size"),
+        ("idle", "Connections idle in the pool"),
+    ):
+        if key in status:
+            families.append(_gauge(f"db_pool_{key}", help, status[key]))
+    return families
+
+
+@registry.collector
+def _cache_metrics() -> List[Family]:
+    return [
+        _counter(f"site_cache_{name}", f"Site cache {name}", value)
+        for name, value in site_cache.stats.as_dict().items()
+    ]
+
+
+@registry.collector
+def _job_metrics() -> List[Family]:
+    status = job_queue.status()
+    families = [
+        _gauge("job_queue_depth", "Jobs waiting in the in-memory queue", status["queue_depth"]),
+        _gauge("job_queue_in_flight", "Jobs being run", status["in_flight"]),
+        _gauge(
+            "job_wait_seconds_max",
+            "Longest wait from due to started",
+            status["wait_seconds_max"],
+        ),
+        _gauge("job_run_seconds_max", "Longest job run", status["run_seconds_max"]),
+        _counter(
+            "job_wait_seconds",
+            "Time jobs waited from due to started",
+            status["wait_seconds_total"],
+        ),
+        _counter("job_run_seconds", "Time spent running jobs", status["run_seconds_total"]),
+    ]
+    for outcome in ("enqueued", "overflowed", "succeeded", "retried", "failed"):
+        families.append(_counter(f"jobs_{outcome}", f"Jobs {outcome}", status[outcome]))
+    return families
+
+
+@registry.collector
+def _admission_metrics() -> List[Family]:
+    in_flight, waiting, shed, limited = [], [], [], []
+    for router, status in admission_status().items():
+        for route, limiter in status["concurrency"].items():
+            labels = {"router": router, "route": route}
+            in_flight.append(("", labels, limiter["in_flight"]))
+            waiting.append(("", labels, limiter["waiting"]))
+            shed.append(("_total", labels, limiter["shed"]))
+        for route, bucket in status["rate_limits"].items():
+            limited.append(("_total", {"router": router, "route": route}, bucket["limited"]))
+    return [
+        ("admission_in_flight", "gauge", "Requests admitted and running", in_flight),
+        ("admission_waiting", "gauge", "Requests waiting for a slot", waiting),
+        ("admission_shed", "counter", "Requests rejected with 503", shed),
+        ("admission_rate_limited", "counter", "Requests rejected with 429", limited),
+    ]
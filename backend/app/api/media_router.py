@@ -0,0 +1,53 @@
+from fastapi import APIRouter, HTTPException, Request
+
+from api.conditional import etag_matches
+from api.responses import FileRangeResponse
+from services.media import MEDIA_CACHE_CONTROL, parse_range, resolve_media
+
+router = APIRouter()
+
+
+@router.api_route("/{path:path}", methods=["GET", "HEAD"])
+async def stream_media(path: str, request: Request):
+    """
+    Audio guides and other recordings under ``static``, e.g.
+    ``/static/audio/tour.mp3`` is streamed from ``/media/audio/tour.mp3``.
+    Honours single byte ranges (206), so players can seek without
+    downloading the whole file.
+    """
+    media = resolve_media(path)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Cache-Control": MEDIA_CACHE_CONTROL,
+        "ETag": media.etag,
+        "Last-Modified": media.last_modified,
+    }
+    if etag_matches(request.headers.get("if-none-match"), media.etag):
+        raise HTTPException(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() not in (media.etag, media.last_modified):
+        # The client's partial copy is stale, send the whole file instead
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, media.size)
+    except ValueError:
+        raise HTTPException(
+            status_code=416, headers={**headers, "Content-Range": f"bytes */{media.size}"}
+        )
+
+    if byte_range is None:
+        return FileRangeResponse(
+            str(media.path), 0, media.size, headers=headers, media_type=media.media_type
+        )
+    first, last = byte_range
+    headers["Content-Range"] = f"bytes {first}-{last}/{media.size}"
+    return FileRangeResponse(
+        str(media.path),
+        first,
+        last - first + 1,
+        status_code=206,
+        headers=headers,
+        media_type=media.media_type,
+    )
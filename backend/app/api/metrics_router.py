@@ -0,0 +1,49 @@
+import os
+import secrets
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.admission import admission_status
+from data.database import get_session, pool_status
+from services.cache import site_cache
+from services.job_queue import job_counts, job_queue
+from services.metrics import registry
+
+# When set, scrapers must send "Authorization: Bearer <token>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+
+def require_metrics_token(request: Request) -> None:
+    if METRICS_TOKEN:
+        supplied = request.headers.get("authorization", "").removeprefix("Bearer ")
+        if not secrets.compare_digest(supplied, METRICS_TOKEN):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+
+router = APIRouter(dependencies=[Depends(require_metrics_token)])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/metrics/cache", include_in_schema=False)
+async def cache_stats():
+    return site_cache.stats.as_dict()
+
+
+@router.get("/metrics/pool", include_in_schema=False)
+async def pool_stats():
+    return pool_status()
+
+
+@router.get("/metrics/admission", include_in_schema=False)
+async def admission_stats():
+    return admission_status()
+
+
+@router.get("/metrics/jobs", include_in_schema=False)
+async def job_stats(db: AsyncSession = Depends(get_session)):
+    return {**job_queue.status(), "jobs": await job_counts(db)}
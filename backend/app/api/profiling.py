@@ -0,0 +1,278 @@
+"""
+Opt-in request profiling. A request carrying ``X-Profile: <PROFILE_TOKEN>``
+(or ``?profile=<PROFILE_TOKEN>``) runs under a profiler, and with
+``PROFILE_SAMPLE_RATE=N`` one request in N is profiled without asking.
+Profiles are written to PROFILE_DIR, or returned in place of the response
+body when the request also sends ``X-Profile-Output: inline``.
+
+The middleware is only installed when one of those settings is present
+(see main.py), so a disabled profiler costs nothing.
+"""
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional
+
+import orjson
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.instrumentation import current_queries
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_SAMPLE_RATE = int(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Only paths starting with one of these are sampled automatically, e.g.
+# "/sites/search,/sites/nearby"; empty for all
+PROFILE_SAMPLE_PATHS = tuple(
+    path for path in os.getenv("PROFILE_SAMPLE_PATHS", "").split(",") if path
+)
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "/tmp/harlem-profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.001"))
+
+PROFILE_HEADER = b"x-profile"
+OUTPUT_HEADER = b"x-profile-output"
+# "sample" (default) or "cprofile"
+MODE_HEADER = b"x-profile-mode"
+
+
+def profiling_enabled() -> bool:
+    return bool(PROFILE_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+
+class StackSampler:
+    """
+    Samples the stack of one thread (the event loop's) every ``interval``
+    seconds from a helper thread and counts identical stacks, in the
+    collapsed format flamegraph.pl and speedscope read. Unlike cProfile it
+    sees time spent waiting as well, and costs the same for deep stacks.
+    """
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                names.append(self._frame_name(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class DeterministicProfiler:
+    """
+    cProfile over the event loop thread. Exact call counts, but it also
+    records whatever other requests run concurrently, and slows the
+    process down while enabled.
+    """
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def start(self) -> None:
+        self._profile.enable()
+
+    def stop(self) -> None:
+        self._profile.disable()
+
+    def stats_text(self, limit: int = 40) -> str:
+        output = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=output)
+        stats.sort_stats("cumulative").print_stats(limit)
+        return output.getvalue()
+
+    def dump(self, path: Path) -> None:
+        self._profile.dump_stats(str(path))
+
+
+def _headers(scope: Scope) -> Dict[bytes, bytes]:
+    return {name.lower(): value for name, value in scope.get("headers", [])}
+
+
+def _query_flag(scope: Scope, name: str) -> Optional[str]:
+    match = re.search(rf"(?:^|&){name}=([^&]*)", scope.get("query_string", b"").decode())
+    return match.group(1) if match else None
+
+
+class ProfilingMiddleware:
+    """
+    Install inside MetricsMiddleware, whose per-request query tracking is
+    used to capture the SQL a profiled request issued.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._requests = 0
+        self._busy = False
+
+    def _requested(self, scope: Scope, headers: Dict[bytes, bytes]) -> bool:
+        if not PROFILE_TOKEN:
+            return False
+        supplied = headers.get(PROFILE_HEADER, b"").decode() or _query_flag(scope, "profile")
+        # Constant time, so response timing does not reveal the token
+        return supplied is not None and secrets.compare_digest(
+            supplied.encode(), PROFILE_TOKEN.encode()
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = _headers(scope)
+        requested = self._requested(scope, headers)
+        sampled = False
+        if (
+            not requested
+            and PROFILE_SAMPLE_RATE > 0
+            and scope["path"].startswith(PROFILE_SAMPLE_PATHS or "/")
+        ):
+            self._requests += 1
+            sampled = self._requests % PROFILE_SAMPLE_RATE == 0
+        # One profile at a time: profilers see the whole thread, so
+        # overlapping captures would describe each other's requests
+        if not (requested or sampled) or self._busy:
+            await self.app(scope, receive, send)
+            return
+
+        mode = (headers.get(MODE_HEADER, b"") or b"sample").decode()
+        inline = requested and headers.get(OUTPUT_HEADER, b"").decode() == "inline"
+        self._busy = True
+        try:
+            await self._profile(scope, receive, send, mode, inline, sampled)
+        finally:
+            self._busy = False
+
+    async def _profile(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        mode: str,
+        inline: bool,
+        sampled: bool,
+    ) -> None:
+        queries = current_queries()
+        if queries is not None:
+            queries.log = []
+        profiler = (
+            DeterministicProfiler()
+            if mode == "cprofile"
+            else StackSampler(threading.get_ident())
+        )
+        status = 500
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{int(time.time() * 1000) % 1000:03d}"
+
+        async def capture(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if not inline:
+                    message = {
+                        **message,
+                        "headers": [
+                            *message.get("headers", []),
+                            (b"x-profile-id", profile_id.encode()),
+                        ],
+                    }
+            if not inline:
+                await send(message)
+
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            profiler.stop()
+            elapsed = time.perf_counter() - started
+        route = getattr(scope.get("route"), "path", scope["path"])
+        report = {
+            "id": profile_id,
+            "method": scope["method"],
+            "route": route,
+            "path": scope["path"],
+            "status": status,
+            "duration_ms": round(elapsed * 1000, 3),
+            "mode": mode,
+            "sampled": sampled,
+            "sql": [
+                {"statement": statement, "duration_ms": round(seconds * 1000, 3)}
+                for statement, seconds in (queries.log if queries is not None else [])
+            ],
+        }
+        if isinstance(profiler, StackSampler):
+            report["collapsed"] = profiler.collapsed()
+        else:
+            report["stats"] = profiler.stats_text()
+
+        if inline:
+            body = orjson.dumps(report)
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode()),
+                    ],
+                }
+            )
+            await send({"type": "http.response.body", "body": body})
+            return
+        try:
+            # File writes and pruning PROFILE_DIR stay off the event loop
+            await asyncio.to_thread(self._write, report, profiler)
+        except OSError:
+            logger.exception(f"Could not write profile {profile_id}")
+
+    def _write(self, report: dict, profiler) -> None:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", report["route"]).strip("_") or "root"
+        stem = PROFILE_DIR / f"{report['id']}-{report['method']}-{slug}"
+        if isinstance(profiler, StackSampler):
+            stem.with_suffix(".collapsed").write_text(report.pop("collapsed"))
+        else:
+            profiler.dump(stem.with_suffix(".prof"))
+            report.pop("stats")
+        stem.with_suffix(".json").write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+        self._prune()
+
+    @staticmethod
+    def _prune() -> None:
+        files = sorted(PROFILE_DIR.glob("*.json"))
+        for old in files[: max(0, len(files) - PROFILE_KEEP)]:
+            for path in PROFILE_DIR.glob(f"{old.stem}.*"):
+                path.unlink(missing_ok=True)
@@ -0,0 +1,124 @@
+import mmap
+from typing import Mapping, Optional
+
+import anyio
+from fastapi import Response
+from starlette.types import Receive, Scope, Send
+
+
+class RawJSONResponse(Response):
+    """
+    Response whose body is already encoded JSON, e.g. a cached page.
+    """
+
+    media_type = "application/json"
+
+
+def encoded(body: bytes, response: Response, media_type: str) -> Response:
+    """
+    Like ``raw_json`` for any pre-encoded body.
+    """
+    return Response(
+        body,
+        status_code=response.status_code or 200,
+        headers=response.headers,
+        media_type=media_type,
+    )
+
+
+def raw_json(body: bytes, response: Response) -> RawJSONResponse:
+    """
+    Return pre-encoded JSON from a route. Returning a ``Response`` skips the
+    route's ``response_model`` validation, so the headers set on the route's
+    ``response`` parameter (ETag, cursor) are carried over here.
+    """
+    return RawJSONResponse(
+        body, status_code=response.status_code or 200, headers=response.headers
+    )
+
+
+class FileRangeResponse(Response):
+    """
+    Streams ``length`` bytes of a file from ``offset`` without reading the
+    file into memory. Servers offering the ASGI zero-copy extension get the
+    file descriptor and send it with sendfile(2); otherwise the file is
+    memory-mapped and sent in ``chunk_size`` slices, so concurrent
+    listeners share the page cache rather than each holding a copy.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        offset: int,
+        length: int,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+    ):
+        self.path = path
+        self.offset = offset
+        self.length = length
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(headers)
+        self.headers["content-length"] = str(length)
+
+    async def _stream(self, send: Send, zero_copy: bool) -> None:
+        with open(self.path, "rb") as file:
+            if zero_copy:
+                await send(
+                    {
+                        "type": "http.response.zerocopysend",
+                        "file": file.fileno(),
+                        "offset": self.offset,
+                        "count": self.length,
+                    }
+                )
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                end = self.offset + self.length
+                for start in range(self.offset, end, self.chunk_size):
+                    stop = min(start + self.chunk_size, end)
+                    # Touching cold pages reads the disk, so slice off the loop
+                    body = await anyio.to_thread.run_sync(
+                        mapped.__getitem__, slice(start, stop)
+                    )
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": body,
+                            "more_body": stop < end,
+                        }
+                    )
+
+    async def _listen_for_disconnect(self, receive: Receive) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        if scope["method"].upper() == "HEAD" or self.length == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        zero_copy = "http.response.zerocopysend" in (scope.get("extensions") or {})
+
+        # Stop reading as soon as a listener goes away, e.g. after seeking
+        async with anyio.create_task_group() as task_group:
+
+            async def run_and_cancel(func, *args) -> None:
+                await func(*args)
+                task_group.cancel_scope.cancel()
+
+            task_group.start_soon(run_and_cancel, self._stream, send, zero_copy)
+            await run_and_cancel(self._listen_for_disconnect, receive)
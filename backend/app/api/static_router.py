@@ -0,0 +1,80 @@
+from typing import Optional, Sequence
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+
+from api.conditional import etag_matches
+from services.static_assets import (
+    IMMUTABLE_CACHE_CONTROL,
+    MUTABLE_CACHE_CONTROL,
+    encodings_available,
+    static_assets,
+)
+
+router = APIRouter()
+
+
+def negotiate_encoding(accept_encoding: Optional[str], offered: Sequence[str]) -> Optional[str]:
+    """
+    The first of ``offered`` (in order of preference) that the client
+    accepts with a non-zero quality, honouring ``*``.
+    """
+    if not accept_encoding:
+        return None
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    for coding in offered:
+        if qualities.get(coding, qualities.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+@router.get("/_manifest.json")
+async def asset_manifest():
+    """
+    Plain asset paths mapped to their fingerprinted URLs, for clients that
+    want year-long caching.
+    """
+    return static_assets.manifest()
+
+
+@router.api_route("/{path:path}", methods=["GET", "HEAD"])
+async def serve_asset(path: str, request: Request):
+    entry = await static_assets.lookup(path)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    asset, immutable = entry
+
+    offered = [coding for coding in encodings_available() if coding in asset.encoded]
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"), offered)
+    # Each content coding is a different representation with its own tag
+    etag = asset.etag if encoding is None else f'"{asset.digest}-{encoding}"'
+    headers = {
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else MUTABLE_CACHE_CONTROL,
+        "ETag": etag,
+        "Last-Modified": asset.last_modified,
+    }
+    if offered:
+        headers["Vary"] = "Accept-Encoding"
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+        return Response(asset.encoded[encoding], headers=headers, media_type=asset.media_type)
+    return FileResponse(
+        asset.path,
+        headers=headers,
+        media_type=asset.media_type,
+        stat_result=asset.stat_result,
+    )
@@ -0,0 +1,679 @@
+"""
+Load benchmark: every API endpoint, in-process, against a synthetic catalog.
+
+Each size runs in its own process (settings and indexes are bound at
+import) against its own SQLite database under benchmarks/.data, generated
+by benchmarks.datagen on first use and reused afterwards. Requests go
+through the whole ASGI app with httpx, middleware included, without a
+network or server in between. Admission control is switched off so its
+limits do not show up as latency.
+
+Run from backend/app:
+
+    python -m benchmarks.api_benchmark --sizes 10000 100000 1000000
+    python -m benchmarks.api_benchmark --sizes 10000 --compare benchmarks/results/api-<time>.json
+
+Results are written to benchmarks/results as JSON; --compare reports the
+endpoints whose p95 grew by more than --threshold and exits non-zero.
+"""
+import argparse
+import asyncio
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import orjson
+
+from benchmarks.datagen import ERAS, IMAGES, NEIGHBOURHOODS, TAGS, SiteGenerator
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+DATA_DIR = BENCHMARKS_DIR / ".data"
+RESULTS_DIR = BENCHMARKS_DIR / "results"
+
+# Rows written by the bulk scenario; upserted on name, so the catalog does
+# not grow from run to run
+BULK_ROWS = 100
+
+
+@dataclass
+class Scenario:
+    method: str
+    path: str
+    # Keyword arguments for httpx's request(), without the method
+    build: Callable[[random.Random], dict]
+    label: str = ""
+    # Overrides --requests and --concurrency
+    requests: Optional[int] = None
+    concurrency: Optional[int] = None
+    on_response: Optional[Callable] = None
+
+    @property
+    def name(self) -> str:
+        name = f"{self.method} {self.path}"
+        return f"{name} ({self.label})" if self.label else name
+
+
+@dataclass
+class Catalog:
+    sites: int
+    contributions: int
+    run_id: str
+    created_sites: List[int] = field(default_factory=list)
+    created_contributions: List[int] = field(default_factory=list)
+
+
+def _bbox(rng: random.Random, span: float) -> str:
+    _, lat, lon, spread, _ = rng.choice(NEIGHBOURHOODS)
+    lat += rng.uniform(-spread, spread)
+    lon += rng.uniform(-spread, spread)
+    return f"{lon - span:.5f},{lat - span:.5f},{lon + span:.5f},{lat + span:.5f}"
+
+
+def _point(rng: random.Random) -> dict:
+    _, lat, lon, spread, _ = rng.choice(NEIGHBOURHOODS)
+    return {"latitude": rng.gauss(lat, spread), "longitude": rng.gauss(lon, spread)}
+
+
+def _years(rng: random.Random) -> dict:
+    start = rng.randint(1650, 2000)
+    return {"start_date": f"{start}-01-01T00:00:00", "end_date": f"{start + 20}-01-01T00:00:00"}
+
+
+def _new_site(catalog: Catalog, rng: random.Random, index: int) -> dict:
+    return {
+        "name": f"Benchmark Site {catalog.run_id}-{index}",
+        "description": "Created by the API benchmark.",
+        **_point(rng),
+        "era": rng.choice(ERAS),
+        "tags": rng.sample(TAGS, 3),
+        "images": [rng.choice(IMAGES)],
+        "date_established": "1920-05-01T00:00:00",
+    }
+
+
+def _new_contribution(catalog: Catalog, rng: random.Random) -> dict:
+    return {
+        "historical_site_id": rng.randint(1, catalog.sites),
+        "contributor_name": "Benchmark",
+        "contribution_details": "Created by the API benchmark.",
+        "images": [f"http://localhost{rng.choice(IMAGES)}"],
+    }
+
+
+def _bulk_body(rng: random.Random) -> bytes:
+    rows = []
+    for index in range(BULK_ROWS):
+        rows.append(
+            {
+                "name": f"Benchmark Bulk Site {index}",
+                "description": "Upserted by the API benchmark.",
+                **_point(rng),
+                "era": rng.choice(ERAS),
+                "tags": rng.sample(TAGS, 2),
+            }
+        )
+    return b"\n".join(orjson.dumps(row) for row in rows)
+
+
+def _cycle(ids: List[int]) -> Callable[[], int]:
+    position = -1
+
+    def next_id() -> int:
+        nonlocal position
+        position += 1
+        return ids[position % len(ids)] if ids else 0
+
+    return next_id
+
+
+def scenarios(catalog: Catalog, requests: int, media_path: str) -> List[Scenario]:
+    """
+    One scenario per endpoint (and per notable variant), reads first. Write
+    scenarios only touch rows created earlier in the same run, and delete
+    them again, so a reused database stays as generated.
+    """
+    site_id = lambda rng: rng.randint(1, catalog.sites)
+    contribution_id = lambda rng: rng.randint(1, catalog.contributions)
+    created_site = _cycle(catalog.created_sites)
+    created_contribution = _cycle(catalog.created_contributions)
+    counter = iter(range(sys.maxsize))
+    third = max(1, requests // 3)
+
+    def remember(ids: List[int]):
+        def on_response(response) -> None:
+            if response.status_code == 200:
+                ids.append(response.json()["id"])
+
+        return on_response
+
+    def remember_contribution(response) -> None:
+        # The response carries no id; rows are numbered on from the largest
+        # id, and nothing else inserts contributions meanwhile
+        if response.status_code == 200:
+            ids = catalog.created_contributions
+            ids.append(catalog.contributions + len(ids) + 1)
+
+    def pop(ids: List[int]) -> int:
+        return ids.pop() if ids else 0
+
+    try:
+        import msgpack  # noqa: F401
+
+        formats = ["json", "msgpack"]
+    except ImportError:
+        formats = ["json"]
+
+    reads = [
+        Scenario("GET", "/health/live", lambda rng: {"url": "/health/live"}),
+        Scenario("GET", "/health/ready", lambda rng: {"url": "/health/ready"}),
+        Scenario("GET", "/sites/{site_id}", lambda rng: {"url": f"/sites/{site_id(rng)}"}),
+        Scenario(
+            "GET",
+            "/sites/{site_id}/detail",
+            lambda rng: {"url": f"/sites/{site_id(rng)}/detail"},
+        ),
+        Scenario("GET", "/sites/", lambda rng: {"url": "/sites/", "params": {"limit": 50}}),
+        Scenario(
+            "GET",
+            "/sites/search",
+            lambda rng: {"url": "/sites/search", "params": {"query": rng.choice(TAGS)}},
+            label="text",
+        ),
+        Scenario(
+            "GET",
+            "/sites/search",
+            lambda rng: {
+                "url": "/sites/search",
+                "params": {"tags": rng.sample(TAGS[:10], 2), "tag_mode": "all"},
+            },
+            label="tags",
+        ),
+        Scenario(
+            "GET",
+            "/sites/tags",
+            lambda rng: {"url": "/sites/tags", "params": {"query": rng.choice(TAGS)}},
+        ),
+        Scenario("GET", "/sites/dates", lambda rng: {"url": "/sites/dates", "params": _years(rng)}),
+        Scenario(
+            "GET",
+            "/sites/timeline",
+            lambda rng: {
+                "url": "/sites/timeline",
+                "params": {"bucket": rng.choice(["year", "decade", "century"]), **_years(rng)},
+            },
+        ),
+        Scenario(
+            "GET",
+            "/sites/nearby",
+            lambda rng: {
+                "url": "/sites/nearby",
+                "params": {**_point(rng), "max_distance": 1.0, "limit": 50},
+            },
+        ),
+        Scenario(
+            "GET",
+            "/sites/clusters",
+            lambda rng: {
+                "url": "/sites/clusters",
+                "params": {"bbox": _bbox(rng, 0.05), "zoom": rng.randint(11, 15)},
+            },
+        ),
+        *(
+            Scenario(
+                "GET",
+                "/sites/in-bounds",
+                lambda rng, format=format: {
+                    "url": "/sites/in-bounds",
+                    "params": {"bbox": _bbox(rng, 0.005), "format": format},
+                },
+                label=format,
+            )
+            for format in formats
+        ),
+        Scenario(
+            "GET",
+            "/sites/viewport",
+            lambda rng: {
+                "url": "/sites/viewport",
+                "params": dict(
+                    zip(
+                        ("min_lon", "min_lat", "max_lon", "max_lat"),
+                        map(float, _bbox(rng, 0.005).split(",")),
+                    )
+                ),
+            },
+        ),
+        Scenario("GET", "/metrics/cache", lambda rng: {"url": "/metrics/cache"}),
+        Scenario("GET", "/metrics/pool", lambda rng: {"url": "/metrics/pool"}),
+        Scenario("GET", "/metrics/admission", lambda rng: {"url": "/metrics/admission"}),
+        Scenario("GET", "/metrics/jobs", lambda rng: {"url": "/metrics/jobs"}),
+        Scenario(
+            "GET",
+            "/contributions/{id}",
+            lambda rng: {"url": f"/contributions/{contribution_id(rng)}"},
+        ),
+        Scenario(
+            "GET",
+            "/contributions/all",
+            lambda rng: {"url": "/contributions/all", "params": {"limit": 50}},
+        ),
+        Scenario(
+            "GET",
+            "/contributions/by-status",
+            lambda rng: {
+                "url": "/contributions/by-status",
+                "params": {"status": rng.choice(["pending", "approved", "rejected"])},
+            },
+        ),
+        Scenario("GET", "/metrics", lambda rng: {"url": "/metrics"}),
+        Scenario(
+            "GET",
+            "/static/{path}",
+            lambda rng: {
+                "url": rng.choice(IMAGES),
+                "headers": {"Accept-Encoding": "br, gzip"},
+            },
+        ),
+        Scenario("GET", "/static/_manifest.json", lambda rng: {"url": "/static/_manifest.json"}),
+        Scenario(
+            "GET",
+            "/media/{path}",
+            lambda rng: {
+                "url": f"/media/{media_path}",
+                "headers": {"Range": f"bytes={rng.randrange(0, 512 * 1024)}-"},
+            },
+            label="range",
+        ),
+        Scenario(
+            "GET",
+            "/sites/export",
+            lambda rng: {"url": "/sites/export", "params": {"format": "ndjson"}},
+            requests=3,
+            concurrency=1,
+        ),
+        Scenario(
+            "GET",
+            "/contributions/export",
+            lambda rng: {"url": "/contributions/export", "params": {"format": "csv"}},
+            requests=3,
+            concurrency=1,
+        ),
+    ]
+    writes = [
+        Scenario(
+            "POST",
+            "/sites/",
+            lambda rng: {"url": "/sites/", "json": _new_site(catalog, rng, next(counter))},
+            on_response=remember(catalog.created_sites),
+        ),
+        Scenario(
+            "PUT",
+            "/sites/{site_id}",
+            lambda rng: {
+                "url": f"/sites/{created_site()}",
+                "json": {"description": f"Updated by the API benchmark ({rng.random()})."},
+            },
+        ),
+        Scenario(
+            "POST",
+            "/sites/bulk",
+            lambda rng: {
+                "url": "/sites/bulk",
+                "content": _bulk_body(rng),
+                "headers": {"Content-Type": "application/x-ndjson"},
+            },
+            requests=10,
+            concurrency=1,
+        ),
+        Scenario(
+            "DELETE",
+            "/sites/{site_id}",
+            lambda rng: {"url": f"/sites/{pop(catalog.created_sites)}"},
+        ),
+        Scenario(
+            "POST",
+            "/contributions/",
+            lambda rng: {"url": "/contributions/", "json": _new_contribution(catalog, rng)},
+            on_response=remember_contribution,
+        ),
+        Scenario(
+            "PUT",
+            "/contributions/{id}",
+            lambda rng: {
+                "url": f"/contributions/{created_contribution()}",
+                "json": {
+                    "contributor_name": "Benchmark",
+                    "contribution_details": f"Updated by the API benchmark ({rng.random()}).",
+                    "images": [],
+                    "audio": None,
+                    "verified": False,
+                    "status": "pending",
+                },
+            },
+        ),
+        Scenario(
+            "PATCH",
+            "/contributions/{contribution_id}/approve",
+            lambda rng: {"url": f"/contributions/{pop(catalog.created_contributions)}/approve"},
+            requests=third,
+        ),
+        Scenario(
+            "PATCH",
+            "/contributions/{contribution_id}/reject",
+            lambda rng: {"url": f"/contributions/{pop(catalog.created_contributions)}/reject"},
+            requests=third,
+        ),
+        Scenario(
+            "DELETE",
+            "/contributions/{id}",
+            lambda rng: {"url": f"/contributions/{pop(catalog.created_contributions)}"},
+            requests=max(1, requests - 2 * third),
+        ),
+    ]
+    return reads + writes
+
+
+def summarize(latencies: List[float], statuses: Counter, errors: Counter, elapsed: float) -> dict:
+    completed = len(latencies)
+    summary = {
+        "requests": completed + sum(errors.values()),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "errors": dict(errors),
+        "seconds": round(elapsed, 4),
+        "rps": round(completed / elapsed, 1) if elapsed else None,
+    }
+    if not latencies:
+        return {**summary, "mean_ms": None, "p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        **summary,
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+async def measure(client, scenario: Scenario, rng: random.Random, count: int, concurrency: int) -> dict:
+    # Build every request up front so only the request itself is timed
+    pending = iter([scenario.build(rng) for _ in range(count)])
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    errors: Counter = Counter()
+
+    async def worker() -> None:
+        for kwargs in pending:
+            started = time.perf_counter()
+            try:
+                response = await client.request(scenario.method, **kwargs)
+            except Exception as e:
+                errors[type(e).__name__] += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+            if scenario.on_response:
+                scenario.on_response(response)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, statuses, errors, time.perf_counter() - started)
+
+
+def print_row(name: str, stats: dict) -> None:
+    if stats["p50_ms"] is None:
+        print(f"  {name:<48} no responses {stats['errors']}")
+        return
+    statuses = " ".join(f"{status}x{count}" for status, count in stats["statuses"].items())
+    print(
+        f"  {name:<48} {stats['rps']:>8.1f} req/s"
+        f" | p50 {stats['p50_ms']:8.2f} | p95 {stats['p95_ms']:8.2f}"
+        f" | p99 {stats['p99_ms']:8.2f} ms | {statuses}"
+    )
+
+
+async def build_database(size: int, contributions: int, seed: int, chunk_size: int) -> float:
+    from sqlalchemy import insert
+
+    from data.database import AsyncSessionLocal, engine
+    from data.schema import upgrade_schema
+    from models.contributions import ContributionStatus, UserContribution
+    from services.bulk_import_service import import_sites, iterate_rows
+    from services.search_index import search_index
+
+    started = time.perf_counter()
+    await upgrade_schema()
+    async with engine.begin() as conn:
+        await search_index.setup(conn)
+    generator = SiteGenerator(seed)
+    async with AsyncSessionLocal() as session:
+        report = await import_sites(
+            session, iterate_rows(generator.sites(size)), chunk_size, render_images=False
+        )
+    if report.failed:
+        raise SystemExit(f"Generated sites failed to import: {report.errors[:5]}")
+    async with AsyncSessionLocal() as session:
+        batch = []
+        for row in generator.contributions(contributions, size):
+            batch.append({**row, "status": ContributionStatus(row["status"])})
+            if len(batch) >= chunk_size:
+                await session.execute(insert(UserContribution), batch)
+                batch = []
+        if batch:
+            await session.execute(insert(UserContribution), batch)
+        await session.commit()
+    return time.perf_counter() - started
+
+
+def isolate_static_files(root: Path) -> None:
+    """
+    Serve static and media files from ``root``, a copy of the static tree,
+    so the media file and the image variants the benchmark writes never
+    land in the real one. Call before the app starts.
+    """
+    from services import image_pipeline, media
+    from services.static_assets import static_assets
+
+    shutil.copytree(
+        image_pipeline.STATIC_DIR, root, ignore=shutil.ignore_patterns("derived")
+    )
+    media.MEDIA_DIR = root
+    image_pipeline.STATIC_DIR = root
+    image_pipeline.DERIVED_DIR = root / "derived"
+    static_assets.root = root.resolve()
+
+
+async def run_worker(args) -> dict:
+    """
+    Runs inside the per-size process, with DATABASE_URL already set.
+    """
+    size = args.worker
+    database = Path(args.database)
+    build_seconds = None
+    if not database.exists():
+        print(f"Generating {size} sites and {int(size * args.contributions)} contributions...")
+        build_seconds = await build_database(
+            size, int(size * args.contributions), args.seed, args.chunk_size
+        )
+        print(f"Built {database.name} in {build_seconds:.1f}s")
+
+    # Imported late: the app binds its database when imported
+    import httpx
+    from sqlalchemy import func, select
+
+    from data.database import AsyncSessionLocal
+    from main import app
+    from models.contributions import UserContribution
+    from models.historical_site import HistoricalSite
+
+    static_root = Path(tempfile.mkdtemp(prefix="harlem-benchmark-")) / "static"
+    isolate_static_files(static_root)
+    media_file = static_root / "audio" / "benchmark.mp3"
+    media_file.parent.mkdir(parents=True, exist_ok=True)
+    media_file.write_bytes(random.Random(args.seed).randbytes(1024 * 1024))
+    rng = random.Random(args.seed)
+    endpoints: Dict[str, dict] = {}
+    try:
+        started = time.perf_counter()
+        async with app.router.lifespan_context(app):
+            startup_seconds = time.perf_counter() - started
+            async with AsyncSessionLocal() as session:
+                sites = (await session.execute(select(func.max(HistoricalSite.id)))).scalar()
+                contributions = (
+                    await session.execute(select(func.max(UserContribution.id)))
+                ).scalar()
+            catalog = Catalog(sites or 1, contributions or 1, run_id=f"{time.time_ns()}")
+            print(f"{size} sites, started in {startup_seconds:.2f}s")
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+                media_path = media_file.relative_to(static_root).as_posix()
+                for scenario in scenarios(catalog, args.requests, media_path):
+                    count = scenario.requests or args.requests
+                    concurrency = min(count, scenario.concurrency or args.concurrency)
+                    if scenario.method == "GET" and args.warmup:
+                        await measure(client, scenario, rng, args.warmup, concurrency)
+                    stats = await measure(client, scenario, rng, count, concurrency)
+                    endpoints[scenario.name] = stats
+                    print_row(scenario.name, stats)
+    finally:
+        shutil.rmtree(static_root.parent, ignore_errors=True)
+    return {
+        "sites": size,
+        "contributions": int(size * args.contributions),
+        "build_seconds": round(build_seconds, 3) if build_seconds is not None else None,
+        "startup_seconds": round(startup_seconds, 3),
+        "endpoints": endpoints,
+    }
+
+
+def run_size(size: int, args) -> dict:
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    database = DATA_DIR / f"sites-{size}-c{args.contributions:g}-seed{args.seed}.db"
+    if args.rebuild:
+        for path in DATA_DIR.glob(f"{database.name}*"):
+            path.unlink()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite+aiosqlite:///{database}",
+        "DB_PROFILE": args.db_profile,
+        "ADMISSION_CONTROL": "off",
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / "result.json"
+        command = [
+            sys.executable, "-m", "benchmarks.api_benchmark",
+            "--worker", str(size),
+            "--database", str(database),
+            "--worker-output", str(output),
+            "--requests", str(args.requests),
+            "--concurrency", str(args.concurrency),
+            "--warmup", str(args.warmup),
+            "--contributions", str(args.contributions),
+            "--seed", str(args.seed),
+            "--chunk-size", str(args.chunk_size),
+        ]
+        subprocess.run(command, env=env, check=True, cwd=BENCHMARKS_DIR.parent)
+        return orjson.loads(output.read_bytes())
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=BENCHMARKS_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous: dict, current: dict, threshold: float) -> int:
+    """
+    Print p95 and throughput next to an earlier run; returns the number of
+    endpoints whose p95 grew by more than ``threshold``.
+    """
+    before = {
+        (scale["sites"], name): stats
+        for scale in previous["scales"]
+        for name, stats in scale["endpoints"].items()
+    }
+    regressions = 0
+    print(f"\nCompared with {previous['meta'].get('commit')} ({previous['meta']['timestamp']}):")
+    for scale in current["scales"]:
+        print(f"{scale['sites']} sites")
+        for name, stats in scale["endpoints"].items():
+            old = before.get((scale["sites"], name))
+            if not old or not old["p95_ms"] or stats["p95_ms"] is None:
+                continue
+            change = stats["p95_ms"] / old["p95_ms"] - 1
+            flag = ""
+            if change > threshold:
+                regressions += 1
+                flag = "  REGRESSION"
+            print(
+                f"  {name:<48} p95 {old['p95_ms']:8.2f} -> {stats['p95_ms']:8.2f} ms ({change:+7.1%})"
+                f" | {old['rps']:8.1f} -> {stats['rps']:8.1f} req/s{flag}"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--requests", type=int, default=200, help="per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=10, help="untimed GETs per endpoint")
+    parser.add_argument("--contributions", type=float, default=0.5, help="per site")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--db-profile", default="prod")
+    parser.add_argument("--rebuild", action="store_true", help="regenerate the databases")
+    parser.add_argument("--output", help="defaults to benchmarks/results/api-<time>.json")
+    parser.add_argument("--compare", help="results of an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.2, help="p95 growth flagged")
+    # Used by the per-size processes
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--database", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = asyncio.run(run_worker(args))
+        Path(args.worker_output).write_bytes(orjson.dumps(result))
+        return
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {
+                name: getattr(args, name)
+                for name in ("requests", "concurrency", "warmup", "contributions", "seed", "db_profile")
+            },
+        },
+        "scales": [run_size(size, args) for size in args.sizes],
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"api-{time.strftime('%Y%m%dT%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_bytes(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+    print(f"\nResults written to {output}")
+    if args.compare:
+        previous = orjson.loads(Path(args.compare).read_bytes())
+        if compare(previous, results, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Synthetic historical sites and contributions for benchmarks.
+
+Sites are scattered around a few Manhattan and Brooklyn neighbourhoods,
+Harlem weighted heaviest, so spatial queries see the dense clusters and
+empty stretches of the real catalog. Output depends only on the seed.
+
+Run from backend/app to write NDJSON for ``data.seed_database --import``:
+
+    python -m benchmarks.datagen --sites 100000 > sites.ndjson
+"""
+import argparse
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import Iterator, List, Tuple
+
+import orjson
+from faker import Faker
+
+# (name, latitude, longitude, spread in degrees, weight)
+NEIGHBOURHOODS = [
+    ("Harlem", 40.8116, -73.9465, 0.010, 0.35),
+    ("Washington Heights", 40.8417, -73.9394, 0.008, 0.12),
+    ("Upper West Side", 40.7870, -73.9754, 0.008, 0.13),
+    ("Midtown", 40.7549, -73.9840, 0.007, 0.18),
+    ("Lower Manhattan", 40.7075, -74.0113, 0.006, 0.14),
+    ("Brooklyn Heights", 40.6960, -73.9933, 0.006, 0.08),
+]
+
+KINDS = [
+    "Church", "Theater", "Brownstone", "Jazz Club", "Library", "School",
+    "Park", "Ballroom", "Mansion", "Station", "Market", "Hospital",
+    "Armory", "Gallery", "Monument", "Tenement", "Hotel", "Bridge",
+]
+ERAS = [
+    "17th Century", "18th Century", "Early 19th Century", "Mid 19th Century",
+    "Late 19th Century", "Early 20th Century", "Harlem Renaissance",
+    "Mid 20th Century", "Late 20th Century", "21st Century",
+]
+TAGS = [
+    "NYC", "architecture", "music", "jazz", "church", "literature", "civil-rights",
+    "landmark", "theater", "park", "museum", "art", "education", "dance",
+    "sports", "food", "politics", "memorial", "residential", "commercial",
+    "engineering", "immigration", "religion", "nightlife", "film", "photography",
+    "transit", "waterfront", "market", "library",
+]
+IMAGES = [
+    "/static/images/central_park.jpg",
+    "/static/images/empire_state_building.jpg",
+    "/static/images/metropolitan_museum.jpg",
+    "/static/images/stpatrickscathedral.png",
+    "/static/images/yankeestadium.png",
+]
+# Contribution statuses as a real moderation queue sees them
+STATUS_WEIGHTS = [("approved", 0.6), ("pending", 0.3), ("rejected", 0.1)]
+
+EARLIEST = datetime(1650, 1, 1)
+LATEST = datetime(2020, 12, 31)
+
+# Faker is slow per call; draw from pools built once per seed instead
+POOL_SIZE = 2000
+
+
+class SiteGenerator:
+    def __init__(self, seed: int = 0):
+        self.rng = random.Random(seed)
+        faker = Faker("en_US")
+        faker.seed_instance(seed)
+        self.surnames = [faker.last_name() for _ in range(POOL_SIZE)]
+        self.streets = [faker.street_name() for _ in range(POOL_SIZE)]
+        self.sentences = [faker.sentence(nb_words=12) for _ in range(POOL_SIZE)]
+        self.people = [faker.name() for _ in range(POOL_SIZE)]
+        # Zipf-like: a few tags are on most sites, most tags on a few
+        self.tag_weights = [1 / (rank + 1) for rank in range(len(TAGS))]
+        self.neighbourhood_weights = [n[4] for n in NEIGHBOURHOODS]
+
+    def _point(self) -> Tuple[str, float, float]:
+        name, lat, lon, spread, _ = self.rng.choices(
+            NEIGHBOURHOODS, self.neighbourhood_weights
+        )[0]
+        return (
+            name,
+            round(self.rng.gauss(lat, spread), 6),
+            round(self.rng.gauss(lon, spread * 1.3), 6),
+        )
+
+    def _tags(self) -> List[str]:
+        count = self.rng.randint(1, 5)
+        return sorted(set(self.rng.choices(TAGS, self.tag_weights, k=count)))
+
+    def _established(self) -> datetime:
+        span = (LATEST - EARLIEST).days
+        return EARLIEST + timedelta(days=self.rng.randrange(span))
+
+    def site(self, index: int) -> dict:
+        rng = self.rng
+        neighbourhood, latitude, longitude = self._point()
+        kind = rng.choice(KINDS)
+        # The index keeps names unique, as the catalog requires
+        name = f"{rng.choice(self.surnames)} {kind} #{index}"
+        return {
+            "name": name,
+            "description": " ".join(rng.sample(self.sentences, rng.randint(2, 5)))
+            + f" A {kind.lower()} in {neighbourhood}.",
+            "latitude": latitude,
+            "longitude": longitude,
+            "address": f"{rng.randint(1, 2999)} {rng.choice(self.streets)}, New York, NY",
+            "era": rng.choice(ERAS),
+            "tags": self._tags(),
+            "images": rng.sample(IMAGES, rng.randint(0, 2)),
+            "audio_guide_url": (
+                f"https://example.com/audio/{index}.mp3" if rng.random() < 0.2 else None
+            ),
+            "verified": rng.random() < 0.7,
+            "date_established": self._established().isoformat(),
+        }
+
+    def sites(self, count: int) -> Iterator[dict]:
+        for index in range(count):
+            yield self.site(index)
+
+    def contribution(self, site_count: int) -> dict:
+        rng = self.rng
+        status = rng.choices(*zip(*STATUS_WEIGHTS))[0]
+        return {
+            # Site ids are assigned in insertion order from 1
+            "historical_site_id": rng.randint(1, site_count),
+            "contributor_name": rng.choice(self.people),
+            "contribution_details": " ".join(rng.sample(self.sentences, rng.randint(1, 3))),
+            "images": [
+                f"http://localhost{path}" for path in rng.sample(IMAGES, rng.randint(0, 2))
+            ],
+            "audio": None,
+            "verified": status == "approved",
+            "status": status,
+        }
+
+    def contributions(self, count: int, site_count: int) -> Iterator[dict]:
+        for _ in range(count):
+            yield self.contribution(site_count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sites", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    out = sys.stdout.buffer
+    for site in SiteGenerator(args.seed).sites(args.sites):
+        out.write(orjson.dumps(site) + b"\n")
+
+
+if __name__ == "__main__":
+    main()
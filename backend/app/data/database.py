@@ -1,6 +1,11 @@
 import os
+import time
+from dataclasses import asdict, dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlmodel import SQLModel
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
@@ -9,7 +14,147 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+# Engine settings per deployment profile; each can be overridden with the
+# matching DB_* environment variable (DB_ECHO=1 logs every statement).
+ENGINE_PROFILES = {
+    "dev": {
+        "echo": False,
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        "pool_recycle": -1,
+        "pool_pre_ping": False,
+        "query_cache_size": 500,
+    },
+    "prod": {
+        "echo": False,
+        "pool_size": 20,
+        "max_overflow": 20,
+        "pool_timeout": 10,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "query_cache_size": 1200,
+    },
+}
+
+DB_PROFILE = os.getenv("DB_PROFILE", "dev")
+
+SQLITE_PRAGMAS = {
+    # Readers no longer block on the writer (and vice versa)
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    # Durable at checkpoints; safe from corruption in WAL mode
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Negative values are KiB
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),
+    "temp_store": "MEMORY",
+}
+
+
+def _setting(name: str, default):
+    value = os.getenv(f"DB_{name.upper()}")
+    if value is None:
+        return default
+    if isinstance(default, bool):
+        return value.lower() in ("1", "true", "yes", "on")
+    return type(default)(value)
+
+
+def engine_settings(profile: str = DB_PROFILE) -> dict:
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {profile!r}, expected one of {list(ENGINE_PROFILES)}")
+    return {name: _setting(name, default) for name, default in ENGINE_PROFILES[profile].items()}
+
+
+@dataclass
+class PoolStats:
+    checkouts: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+    def observe(self, wait: float) -> None:
+        self.checkouts += 1
+        self.wait_seconds_total += wait
+        self.wait_seconds_max = max(self.wait_seconds_max, wait)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+pool_stats = PoolStats()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool recording how long each checkout waited for a connection.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_stats.observe(time.perf_counter() - start)
+
+
+def build_engine(url: str, profile: str = DB_PROFILE):
+    settings = engine_settings(profile)
+    url = make_url(url)
+    is_sqlite = url.get_backend_name() == "sqlite"
+    in_memory = is_sqlite and url.database in (None, "", ":memory:")
+
+    options = {
+        "echo": settings["echo"],
+        "query_cache_size": settings["query_cache_size"],
+    }
+    if not in_memory:
+        options.update(
+            poolclass=TimedQueuePool,
+            pool_size=settings["pool_size"],
+            max_overflow=settings["max_overflow"],
+            pool_timeout=settings["pool_timeout"],
+            pool_recycle=settings["pool_recycle"],
+            pool_pre_ping=settings["pool_pre_ping"],
+        )
+    if url.get_driver_name() == "asyncpg":
+        # Server-side prepared statements, reused per connection
+        url = url.update_query_dict(
+            {"prepared_statement_cache_size": str(settings["query_cache_size"])}
+        )
+
+    engine = create_async_engine(url, **options)
+
+    if is_sqlite:
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma, value in SQLITE_PRAGMAS.items():
+                if in_memory and pragma in ("journal_mode", "mmap_size"):
+                    continue
+                cursor.execute(f"PRAGMA {pragma}={value}")
+            cursor.close()
+
+    return engine
+
+
+engine = build_engine(DATABASE_URL)
+
+
+
+def pool_status() -> dict:
+    pool = engine.pool
+    status = {"pool": type(pool).__name__, **pool_stats.as_dict()}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            idle=pool.checkedin(),
+        )
+    return status
+
 
 AsyncSessionLocal = sessionmaker(
     autoflush=False,
@@ -19,15 +164,6 @@ AsyncSessionLocal = sessionmaker(
 )
 
 
-async def create_tables():
-    async with engine.begin() as conn:
-        try:
-            await conn.run_sync(SQLModel.metadata.drop_all)
-            await conn.run_sync(SQLModel.metadata.create_all)
-        except Exception as e:
-            print("An error occurred while creating tables:", e)
-
-
 async def get_session() -> AsyncSession:
     async with AsyncSessionLocal() as session:
         yield session
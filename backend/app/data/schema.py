@@ -0,0 +1,171 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Optional, Tuple
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from data.database import engine
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+# Arbitrary key shared by every worker taking the Postgres migration lock
+MIGRATION_LOCK_ID = 0x48617266
+
+# The revision matching the schema create_all() used to build on every boot
+BASELINE_REVISION = "0001"
+# Its tables' columns; an unversioned database is only adopted if it has these
+BASELINE_COLUMNS = {
+    "historicalsite": {
+        "id", "name", "description", "latitude", "longitude", "address", "era",
+        "tags", "images", "audio_guide_url", "verified", "date_established",
+    },
+    "usercontribution": {
+        "id", "images", "audio", "verified", "contributor_name",
+        "contribution_details", "historical_site_id", "status",
+    },
+}
+
+
+def alembic_config() -> Config:
+    config = Config(str(ALEMBIC_INI))
+    config.attributes["configure_logging"] = False
+    return config
+
+
+def head_revision() -> str:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def _current_revision(connection) -> Optional[str]:
+    return MigrationContext.configure(connection).get_current_revision()
+
+
+def _is_unversioned(connection) -> bool:
+    """
+    A database created before migrations existed: tables but no revision.
+    """
+    tables = inspect(connection).get_table_names()
+    return "historicalsite" in tables and "alembic_version" not in tables
+
+
+def _check_baseline(connection) -> None:
+    """
+    Refuse to stamp a database whose tables differ from the baseline: the
+    migrations after it would assume columns that are not there.
+    """
+    inspector = inspect(connection)
+    for table, expected in BASELINE_COLUMNS.items():
+        columns = set()
+        if inspector.has_table(table):
+            columns = {column["name"] for column in inspector.get_columns(table)}
+        if columns != expected:
+            raise RuntimeError(
+                f"Cannot adopt unversioned database: {table} has columns "
+                f"{sorted(columns)}, expected {sorted(expected)}. Bring it to the "
+                f"revision {BASELINE_REVISION} schema and run 'alembic stamp "
+                f"{BASELINE_REVISION}' first."
+            )
+
+
+def _upgrade(connection, config: Config, revision: str) -> None:
+    config.attributes["connection"] = connection
+    if _is_unversioned(connection):
+        _check_baseline(connection)
+        logger.warning(f"Adopting unversioned database at revision {BASELINE_REVISION}")
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, revision)
+
+
+def _downgrade(connection, config: Config, revision: str) -> None:
+    config.attributes["connection"] = connection
+    command.downgrade(config, revision)
+
+
+async def schema_status() -> Tuple[Optional[str], str]:
+    """
+    ``(current, head)`` revisions of the database.
+    """
+    async with engine.connect() as conn:
+        current = await conn.run_sync(_current_revision)
+    return current, head_revision()
+
+
+def _lock_file(path: Path):
+    handle = open(path, "a")
+    fcntl.flock(handle, fcntl.LOCK_EX)
+    return handle
+
+
+@asynccontextmanager
+async def _migration_lock(conn: AsyncConnection):
+    """
+    Serialize migrations across workers and hosts: an advisory lock on
+    Postgres (released with the transaction), a lock file next to the
+    database on SQLite.
+    """
+    if conn.dialect.name == "postgresql":
+        await conn.execute(
+            text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID}
+        )
+        yield
+        return
+
+    database = make_url(str(engine.url)).database
+    if conn.dialect.name != "sqlite" or fcntl is None or database in (None, "", ":memory:"):
+        yield
+        return
+    handle = await asyncio.to_thread(_lock_file, Path(database + ".migrate.lock"))
+    try:
+        yield
+    finally:
+        handle.close()
+
+
+async def upgrade_schema() -> bool:
+    """
+    Bring the database to the head revision. Checking an up-to-date database is
+    a single read; otherwise the first worker to take the migration lock
+    applies the pending migrations and the others find nothing left to do.
+    Returns whether any migration ran.
+    """
+    current, head = await schema_status()
+    if current == head:
+        return False
+
+    async with engine.connect() as conn:
+        async with _migration_lock(conn):
+            if await conn.run_sync(_current_revision) == head:
+                await conn.commit()
+                return False
+            logger.info(f"Migrating database from {current} to {head}")
+            await conn.run_sync(_upgrade, alembic_config(), "head")
+            await conn.commit()
+    return True
+
+
+async def reset_schema() -> None:
+    """
+    Drop everything and migrate from scratch. Destroys all data.
+    """
+    config = alembic_config()
+    async with engine.connect() as conn:
+        async with _migration_lock(conn):
+            if await conn.run_sync(_current_revision) is not None:
+                await conn.run_sync(_downgrade, config, "base")
+            await conn.run_sync(_upgrade, config, "head")
+            await conn.commit()
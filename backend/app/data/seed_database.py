@@ -1,43 +1,102 @@
-from sqlmodel import SQLModel
-from sqlalchemy import text
-from data.database import AsyncSessionLocal, create_tables
-from models.historical_site import HistoricalSite
+import argparse
+
+from data.database import AsyncSessionLocal, engine
+from data.schema import reset_schema, upgrade_schema
 from data.seed_data import historical_sites
+from services.bulk_import_service import (
+    BULK_IMPORT_CHUNK_SIZE,
+    FORMATS,
+    import_sites,
+    iterate_rows,
+    parse_rows,
+)
+from services import image_pipeline
+from services.search_index import search_index
+
+READ_CHUNK_SIZE = 1024 * 1024
 
 
 async def seed_historical_sites():
+    # Seed rows are upserted on name and unchanged sites are skipped, so
+    # seeding twice changes nothing
     async with AsyncSessionLocal() as session:
-        async with session.begin():
-            # Check if data already exists to avoid duplicates
-            existing_count = await session.execute(
-                text("SELECT COUNT(*) FROM historicalsite")
-            )
-            if existing_count.scalars().first() > 0:
-                return "Data already seeded!"
-
-            for site in historical_sites:
-                new_site = HistoricalSite(**site)
-                session.add(new_site)
-
-            # Commit once after all inserts are done
-            await session.commit()
+        report = await import_sites(
+            session, iterate_rows(historical_sites), render_images=False
+        )
+    if report.failed:
+        return f"Seeded {report.imported} sites, {report.failed} failed: {report.errors}"
     return "Data seeded successfully!"
 
 
-async def main():
+async def read_file(path: str):
+    with open(path, "rb") as source:
+        while chunk := source.read(READ_CHUNK_SIZE):
+            yield chunk
+
+
+async def import_file(path: str, format: str, chunk_size: int):
+    async with AsyncSessionLocal() as session:
+        report = await import_sites(
+            session, parse_rows(read_file(path), format), chunk_size, render_images=False
+        )
+    print(
+        f"Imported {report.imported} of {report.received} rows, {report.failed} failed"
+    )
+    for error in report.errors:
+        print(f"  row {error.row}: {error.error}")
+
+
+async def main(args):
     try:
-        print("Creating tables...")
-        await create_tables()
-        print("Tables created!")
+        if args.reset:
+            print("Resetting database...")
+            await reset_schema()
+        else:
+            print("Applying migrations...")
+            await upgrade_schema()
+
+        async with engine.begin() as conn:
+            await search_index.setup(conn)
+
+        if args.import_path:
+            print(f"Importing {args.import_path}...")
+            await import_file(args.import_path, args.format, args.chunk_size)
+        else:
+            print("Seeding data...")
+            message = await seed_historical_sites()
+            print(message)
 
-        print("Seeding data...")
-        message = await seed_historical_sites()
-        print(message)
+        print("Rendering image variants...")
+        print(f"Updated {await image_pipeline.backfill_image_variants()} rows")
     except Exception as e:
         print("An error occurred:", e)
+    finally:
+        image_pipeline.shutdown()
+        await engine.dispose()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Seed or bulk load historical sites")
+    parser.add_argument(
+        "--import",
+        dest="import_path",
+        help="JSON, NDJSON or CSV file to load instead of the built-in seed data",
+    )
+    parser.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=BULK_IMPORT_CHUNK_SIZE)
+    parser.add_argument(
+        "--reset", action="store_true", help="drop all tables and data first"
+    )
+    args = parser.parse_args()
+    if args.import_path and not args.format:
+        extension = args.import_path.rsplit(".", 1)[-1].lower()
+        args.format = {"jsonl": "ndjson"}.get(extension, extension)
+        if args.format not in FORMATS:
+            parser.error("cannot infer --format from the file extension")
+    return args
 
 
 if __name__ == "__main__":
     import asyncio
 
-    asyncio.run(main())
+    asyncio.run(main(parse_args()))
@@ -1,36 +1,69 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import time
+from fastapi import Depends, FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
+from api.admission import AdmissionControl, AdmissionLimits, AdmissionMiddleware
 from api.historical_site_router import router as historical_site_router
+from api.instrumentation import MetricsMiddleware, instrument_engine
+from api.metrics_router import router as metrics_router
+from api.profiling import ProfilingMiddleware, profiling_enabled
 from api.contributions_router import router as contributions_router
-from data.database import create_tables
-from pathlib import Path
+from api.health_router import router as health_router
+from api.media_router import router as media_router
+from api.static_router import router as static_router
+from data.database import AsyncSessionLocal, engine
+from data.schema import upgrade_schema
+from services.cluster_index import cluster_index
+from services import image_pipeline
+from services.catalog_version import get_catalog_version, stop_reload
+from services.job_queue import job_queue
+from services.pagination import NEXT_CURSOR_HEADER
+from services.search_index import search_index
+from services.static_assets import static_assets
 
+logger = logging.getLogger(__name__)
 
-# Assuming you have a hypothetical function to load and unload resources
-def load_resources():
-    print("Loading resources...")
-    # Code to load your resources, e.g. database connections, etc.
 
+async def load_resources():
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        await search_index.setup(conn)
+    async with AsyncSessionLocal() as session:
+        # Changes from here on are caught by the version check
+        await get_catalog_version(session)
+        await cluster_index.refresh(session)
+        await search_index.load(session)
+    # Hashing and precompressing is CPU-bound, keep it off the event loop
+    await asyncio.to_thread(static_assets.load)
+    await job_queue.start()
+    logger.info(f"Resources loaded in {time.perf_counter() - started:.2f}s")
 
-def unload_resources():
-    print("Unloading resources...")
-    # Code to unload/cleanup resources
+
+async def unload_resources():
+    logger.info("Unloading resources")
+    await job_queue.stop()
+    await stop_reload()
+    image_pipeline.shutdown()
+    # Close pooled connections (aiosqlite keeps a thread per connection)
+    await engine.dispose()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await create_tables()
-    load_resources()
+    app.state.ready = False
+    await upgrade_schema()
+    await load_resources()
+    app.state.ready = True
     yield
-    unload_resources()
-
+    app.state.ready = False
+    await unload_resources()
 
-app = FastAPI(lifespan=lifespan)
 
-BASE_DIR = Path(__file__).resolve().parent
-app.mount("/static", StaticFiles(directory=BASE_DIR / "static"), name="static")
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+instrument_engine(engine)
 
 origins = [
     "http://localhost:3000",  # React app address
@@ -43,11 +76,57 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "Content-Range", "Accept-Ranges"],
 )
+app.add_middleware(AdmissionMiddleware)
+if profiling_enabled():
+    app.add_middleware(ProfilingMiddleware)
+# Outermost, so its timings include every other middleware
+app.add_middleware(MetricsMiddleware)
 
+# Admission control. Search, exports and writes compete with cheap cached
+# reads for the database pool; past these limits they queue briefly and are
+# then shed (503, or 429 per client), so /sites/{id} and /sites/nearby stay
+# fast during bursts. Routes not listed are not limited.
+WRITE_LIMITS = AdmissionLimits(max_concurrent=8, max_queued=32, rate=2, burst=30)
+EXPORT_LIMITS = AdmissionLimits(max_concurrent=2, max_queued=4, rate=0.1, burst=3)
 
+site_admission = AdmissionControl(
+    "sites",
+    routes={
+        "/sites/search": AdmissionLimits(
+            max_concurrent=16, max_queued=64, queue_timeout=0.5, rate=10, burst=50
+        ),
+        "/sites/export": EXPORT_LIMITS,
+        "POST /sites/bulk": AdmissionLimits(max_concurrent=1, max_queued=2, queue_timeout=10),
+        "POST /sites/": WRITE_LIMITS,
+        "PUT /sites/{site_id}": WRITE_LIMITS,
+        "DELETE /sites/{site_id}": WRITE_LIMITS,
+    },
+)
+contribution_admission = AdmissionControl(
+    "contributions",
+    routes={
+        "/contributions/export": EXPORT_LIMITS,
+        "POST /contributions/": WRITE_LIMITS,
+        "PUT /contributions/{id}": WRITE_LIMITS,
+        "DELETE /contributions/{id}": WRITE_LIMITS,
+    },
+)
 
-app.include_router(historical_site_router, prefix="/sites", tags=["Historical Site"])
+app.include_router(health_router, prefix="/health", tags=["Health"])
+app.include_router(metrics_router)
+app.include_router(media_router, prefix="/media", tags=["Media"])
+app.include_router(static_router, prefix="/static", include_in_schema=False)
+app.include_router(
+    historical_site_router,
+    prefix="/sites",
+    tags=["Historical Site"],
+    dependencies=[Depends(site_admission)],
+)
 app.include_router(
-    contributions_router, prefix="/contributions", tags=["Contributions"]
+    contributions_router,
+    prefix="/contributions",
+    tags=["Contributions"],
+    dependencies=[Depends(contribution_admission)],
 )
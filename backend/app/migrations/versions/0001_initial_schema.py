@@ -0,0 +1,66 @@
+"""initial schema
+
+The tables as SQLModel.metadata.create_all() built them before migrations
+existed. Unversioned databases are stamped at this revision (see
+data/schema.py), so it must not change.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "historicalsite",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=True),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("latitude", sa.Float(), nullable=True),
+        sa.Column("longitude", sa.Float(), nullable=True),
+        sa.Column("address", sa.String(), nullable=True),
+        sa.Column("era", sa.String(), nullable=True),
+        sa.Column("tags", sa.JSON(), nullable=True),
+        sa.Column("images", sa.JSON(), nullable=True),
+        sa.Column("audio_guide_url", sa.String(), nullable=True),
+        sa.Column("verified", sa.Boolean(), nullable=True),
+        sa.Column("date_established", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_historicalsite_name", "historicalsite", ["name"], unique=True)
+
+    op.create_table(
+        "usercontribution",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("images", sa.JSON(), nullable=True),
+        sa.Column("audio", sa.String(), nullable=True),
+        sa.Column("verified", sa.Boolean(), nullable=True),
+        sa.Column("contributor_name", sa.String(), nullable=False),
+        sa.Column("contribution_details", sa.String(), nullable=False),
+        sa.Column("historical_site_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("pending", "approved", "rejected", name="contributionstatus"),
+            nullable=True,
+        ),
+        sa.ForeignKeyConstraint(["historical_site_id"], ["historicalsite.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("usercontribution")
+    sa.Enum(name="contributionstatus").drop(op.get_bind(), checkfirst=True)
+    op.drop_index("ix_historicalsite_name", table_name="historicalsite")
+    op.drop_table("historicalsite")
@@ -0,0 +1,179 @@
+"""spatial, tag and text indexes and the catalog version
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 5000
+FTS_TABLE = "historicalsite_fts"
+
+SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+
+# The backfill uses copies of the application's helpers as of this revision,
+# so later changes to services/ cannot change what it writes.
+GEOHASH_PRECISION = 9
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def _geohash_for(latitude, longitude):
+    if latitude is None or longitude is None:
+        return None
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < GEOHASH_PRECISION:
+        value, interval = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (interval[0] + interval[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            interval[0] = mid
+        else:
+            bits <<= 1
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def _normalize_tags(tags):
+    normalized = []
+    for tag in tags or []:
+        tag = tag.strip().lower()
+        if tag and tag not in normalized:
+            normalized.append(tag)
+    return normalized
+
+
+def _has_fts5(bind) -> bool:
+    return bool(
+        bind.execute(sa.text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar()
+    )
+
+
+def _backfill(bind) -> None:
+    # Sites written before this revision have no geohash or tag rows
+    sites = sa.table(
+        "historicalsite",
+        sa.column("id", sa.Integer),
+        sa.column("latitude", sa.Float),
+        sa.column("longitude", sa.Float),
+        sa.column("tags", sa.JSON),
+        sa.column("geohash", sa.String),
+    )
+    site_tags = sa.table("sitetag", sa.column("tag", sa.String), sa.column("site_id", sa.Integer))
+    set_geohash = (
+        sites.update()
+        .where(sites.c.id == sa.bindparam("site_id"))
+        .values(geohash=sa.bindparam("value"))
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(sites.c.id, sites.c.latitude, sites.c.longitude, sites.c.tags)
+            .where(sites.c.id > last_id)
+            .order_by(sites.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            set_geohash,
+            [{"site_id": row.id, "value": _geohash_for(row.latitude, row.longitude)} for row in rows],
+        )
+        tags = [
+            {"tag": tag, "site_id": row.id}
+            for row in rows
+            for tag in _normalize_tags(row.tags if isinstance(row.tags, list) else [])
+        ]
+        if tags:
+            bind.execute(site_tags.insert(), tags)
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    op.add_column("historicalsite", sa.Column("geohash", sa.String(length=12), nullable=True))
+    op.add_column(
+        "historicalsite",
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+    )
+    op.create_index("ix_historicalsite_geohash", "historicalsite", ["geohash"])
+    op.create_index(
+        "ix_historicalsite_lat_lon", "historicalsite", ["latitude", "longitude"]
+    )
+    op.create_index(
+        "ix_usercontribution_status_id", "usercontribution", ["status", "id"]
+    )
+
+    op.create_table(
+        "sitetag",
+        sa.Column("tag", sa.String(), nullable=False),
+        sa.Column("site_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["site_id"], ["historicalsite.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("tag", "site_id"),
+    )
+    op.create_index("ix_sitetag_site_id", "sitetag", ["site_id"])
+
+    op.create_table(
+        "catalogversion",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.execute("INSERT INTO catalogversion (id, version) VALUES (1, 0)")
+
+    bind = op.get_bind()
+    _backfill(bind)
+
+    # Full-text search, see services/search_index.py
+    if bind.dialect.name == "sqlite" and _has_fts5(bind):
+        op.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            "name, description, content='historicalsite', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')")
+    elif bind.dialect.name == "postgresql":
+        op.execute(
+            "CREATE INDEX ix_historicalsite_search "
+            f"ON historicalsite USING GIN (({SEARCH_DOCUMENT}))"
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        op.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif bind.dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_historicalsite_search")
+    op.drop_table("catalogversion")
+    op.drop_index("ix_sitetag_site_id", table_name="sitetag")
+    op.drop_table("sitetag")
+    op.drop_index("ix_usercontribution_status_id", table_name="usercontribution")
+    op.drop_index("ix_historicalsite_lat_lon", table_name="historicalsite")
+    op.drop_index("ix_historicalsite_geohash", table_name="historicalsite")
+    with op.batch_alter_table("historicalsite") as batch_op:
+        batch_op.drop_column("version")
+        batch_op.drop_column("geohash")
@@ -0,0 +1,29 @@
+"""image variants
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("historicalsite", sa.Column("image_variants", sa.JSON(), nullable=True))
+    op.add_column("usercontribution", sa.Column("image_variants", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("usercontribution") as batch_op:
+        batch_op.drop_column("image_variants")
+    with op.batch_alter_table("historicalsite") as batch_op:
+        batch_op.drop_column("image_variants")
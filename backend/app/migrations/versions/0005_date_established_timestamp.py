@@ -0,0 +1,94 @@
+"""date_established as an indexed timestamp
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00
+
+"""
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+BACKFILL_BATCH_SIZE = 5000
+INDEX_NAME = "ix_historicalsite_date_established"
+_YEAR_RE = re.compile(r"^\d{4}$")
+
+
+def _parse(value) -> Optional[datetime]:
+    # The column held whatever the driver made of a datetime: ISO 8601
+    # with a "T" or a space, sometimes with an offset
+    if value is None:
+        return None
+    text = str(value).strip()
+    if _YEAR_RE.match(text):
+        return datetime(int(text), 1, 1)
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def upgrade() -> None:
+    # Backfill a new column batch by batch, then swap it in: values that
+    # do not parse become NULL rather than failing the migration
+    op.add_column("historicalsite", sa.Column("date_established_ts", sa.DateTime(), nullable=True))
+    bind = op.get_bind()
+    sites = sa.table(
+        "historicalsite",
+        sa.column("id", sa.Integer),
+        sa.column("date_established_ts", sa.DateTime),
+    )
+    backfill = (
+        sites.update()
+        .where(sites.c.id == sa.bindparam("site_id"))
+        .values(date_established_ts=sa.bindparam("value"))
+    )
+    last_id, unparsed = 0, 0
+    while True:
+        rows = bind.execute(
+            sa.text(
+                "SELECT id, date_established FROM historicalsite "
+                "WHERE id > :last_id AND date_established IS NOT NULL "
+                "ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": BACKFILL_BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        values = [{"site_id": site_id, "value": _parse(raw)} for site_id, raw in rows]
+        unparsed += sum(1 for value in values if value["value"] is None)
+        bind.execute(backfill, values)
+        last_id = rows[-1][0]
+    if unparsed:
+        logger.warning(f"{unparsed} date_established values could not be parsed and were cleared")
+
+    with op.batch_alter_table("historicalsite") as batch_op:
+        batch_op.drop_column("date_established")
+        batch_op.alter_column("date_established_ts", new_column_name="date_established")
+    op.create_index(INDEX_NAME, "historicalsite", ["date_established"])
+
+
+def downgrade() -> None:
+    op.drop_index(INDEX_NAME, table_name="historicalsite")
+    with op.batch_alter_table("historicalsite") as batch_op:
+        batch_op.alter_column(
+            "date_established",
+            type_=sa.String(),
+            existing_type=sa.DateTime(),
+            postgresql_using="date_established::text",
+        )
@@ -1,8 +1,15 @@
 # models/__init__.py
 from .historical_site import HistoricalSite
 from .contributions import UserContribution
+from .site_tag import SiteTag
+from .catalog_version import CatalogVersion
+from .job import Job, JobStatus
 
 __all__ = [
     "HistoricalSite",
-    "UserContribution"
+    "UserContribution",
+    "SiteTag",
+    "CatalogVersion",
+    "Job",
+    "JobStatus",
 ]
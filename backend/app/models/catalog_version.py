@@ -0,0 +1,8 @@
+from sqlmodel import SQLModel, Field
+
+
+# Single row (id=1) bumped in the same transaction as every site write; its
+# version identifies a state of the whole catalog (see services/catalog_version.py).
+class CatalogVersion(SQLModel, table=True):
+    id: int = Field(default=1, primary_key=True)
+    version: int = Field(default=0)
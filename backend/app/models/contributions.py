@@ -1,5 +1,5 @@
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, JSON, Enum
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, JSON, Enum, Index
 from datetime import datetime
 from typing import List, Optional
 import enum
@@ -13,9 +13,14 @@ class ContributionStatus(enum.Enum):
 
 # Import JSON type
 class UserContribution(SQLModel, table=True):
+    __table_args__ = (Index("ix_usercontribution_status_id", "status", "id"),)
+
     id: int = Field(default=None, primary_key=True)
     # New fields
     images: List[str] = Field(default=[], sa_column=Column(JSON))  # Store image URLs
+    image_variants: Optional[dict] = Field(
+        default=None, sa_column=Column(JSON, nullable=True)
+    )  # Derivatives per image URL, see services/image_pipeline.py
     audio: Optional[str] = Field(
         default=None, sa_column=Column(String)
     )  # URL to audio file
@@ -1,10 +1,12 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, JSON
+from sqlalchemy import Column, DateTime, Integer, String, Float, Boolean, JSON, Index
 from datetime import datetime
 from sqlmodel import SQLModel, Field, Relationship
 from typing import List, Optional
 
 
 class HistoricalSite(SQLModel, table=True):
+    __table_args__ = (Index("ix_historicalsite_lat_lon", "latitude", "longitude"),)
+
     id: int = Field(default=None, primary_key=True)
     name: str = Field(sa_column=Column(String, unique=True, index=True))
     description: str = Field(sa_column=Column(String))
@@ -24,7 +26,17 @@ class HistoricalSite(SQLModel, table=True):
         default=None, sa_column=Column(String, nullable=True)
     )
     verified: bool = Field(default=False, sa_column=Column(Boolean))
-    date_established: datetime = Field(
-        default=datetime.now(), sa_column=Column(String)
-    )
-    contributions: List["UserContribution"] = Relationship(back_populates="historical_site")
\ No newline at end of file
+    date_established: Optional[datetime] = Field(
+        default=None, sa_column=Column(DateTime, nullable=True, index=True)
+    )  # Range scans for /sites/dates and /sites/timeline
+    geohash: Optional[str] = Field(
+        default=None, sa_column=Column(String(12), index=True)
+    )  # Derived from latitude/longitude, see services/spatial_index.py
+    version: int = Field(default=1, sa_column=Column(Integer, nullable=False, default=1))
+    image_variants: Optional[dict] = Field(
+        default=None, sa_column=Column(JSON, nullable=True)
+    )  # Derivatives per image URL, see services/image_pipeline.py
+    contributions: List["UserContribution"] = Relationship(
+        back_populates="historical_site",
+        sa_relationship_kwargs={"order_by": "UserContribution.id"},
+    )
\ No newline at end of file
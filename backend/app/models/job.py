@@ -0,0 +1,35 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, Enum, Index, JSON, Text
+from datetime import datetime
+from typing import Optional
+import enum
+
+
+class JobStatus(enum.Enum):
+    pending = "pending"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+# Durable record of background work (see services/job_queue.py). Pending rows
+# survive a restart and are picked up again; running rows whose lease has
+# expired belonged to a worker that died and are retried.
+class Job(SQLModel, table=True):
+    __table_args__ = (Index("ix_job_status_run_at", "status", "run_at"),)
+
+    id: int = Field(default=None, primary_key=True)
+    kind: str
+    payload: dict = Field(default={}, sa_column=Column(JSON))
+    status: JobStatus = Field(
+        sa_column=Column(Enum(JobStatus), default=JobStatus.pending, nullable=False)
+    )
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=5)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Not picked up before this time; pushed back on every retry
+    run_at: datetime = Field(default_factory=datetime.utcnow)
+    locked_until: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    last_error: Optional[str] = Field(default=None, sa_column=Column(Text))
+    result: Optional[dict] = Field(default=None, sa_column=Column(JSON, nullable=True))
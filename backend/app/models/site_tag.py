@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from sqlmodel import SQLModel, Field
+
+
+# Normalized copy of HistoricalSite.tags, one row per (tag, site). The primary
+# key doubles as the tag -> sites index; ix_sitetag_site_id serves rewrites.
+class SiteTag(SQLModel, table=True):
+    __table_args__ = (Index("ix_sitetag_site_id", "site_id"),)
+
+    tag: str = Field(sa_column=Column(String, primary_key=True))
+    site_id: int = Field(
+        sa_column=Column(
+            Integer,
+            ForeignKey("historicalsite.id", ondelete="CASCADE"),
+            primary_key=True,
+        )
+    )
@@ -1,5 +1,13 @@
 from pydantic import BaseModel, HttpUrl, validator
-from typing import Optional, List
+from typing import Dict, Optional, List
+
+
+# Schema for one resized copy of an image
+class ImageVariant(BaseModel):
+    width: int
+    height: int
+    format: str
+    url: str
 
 
 class ContributionCreate(BaseModel):
@@ -30,6 +38,7 @@ class ContributionRead(BaseModel):
     contributor_name: str
     contribution_details: str
     images: List[HttpUrl]
+    image_variants: Optional[Dict[str, List[ImageVariant]]] = None
     audio: Optional[HttpUrl]
     verified: bool
 
@@ -1,7 +1,9 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
+from schemas.contributions import ContributionRead, ImageVariant
+
 
 # Schema for client inputs on creating a new historical site
 class HistoricalSiteCreate(BaseModel):
@@ -24,12 +26,63 @@ class HistoricalSiteCreate(BaseModel):
 # Schema for responses, which might include additional fields like creation date or other auto-generated data
 class HistoricalSiteRead(HistoricalSiteCreate):
     id: int
+    version: int = 1
+    # Variants of each entry of images, smallest first; filled in shortly
+    # after the site is written
+    image_variants: Optional[Dict[str, List[ImageVariant]]] = None
 
     class Config:
         arbirary_types_allowed = True
         from_attributes = True
 
 
+# Schema for nearby search results, sorted by distance from the requested point
+class HistoricalSiteNearbyRead(HistoricalSiteRead):
+    distance_m: float
+
+
+# Schema for a site with its approved contributions and contribution counts by status
+class HistoricalSiteDetail(HistoricalSiteRead):
+    contributions: List[ContributionRead] = []
+    contribution_counts: Dict[str, int] = {}
+
+
+# Schema for a map marker: a cluster of sites (with the zoom at which it
+# splits) or a single site
+class MapCluster(BaseModel):
+    latitude: float
+    longitude: float
+    count: int
+    expansion_zoom: Optional[int] = None
+    site_id: Optional[int] = None
+
+
+# Schema for tag facet counts
+class TagFacet(BaseModel):
+    tag: str
+    count: int
+
+
+# Schema for site counts per period of date_established
+class TimelineBucket(BaseModel):
+    start_year: int
+    end_year: int
+    count: int
+
+
+# Schemas for the outcome of a bulk import
+class BulkImportError(BaseModel):
+    row: int
+    error: str
+
+
+class BulkImportReport(BaseModel):
+    received: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: List[BulkImportError] = []
+
+
 # Schema for updates, usually includes optional fields as not all fields need to be updated
 class HistoricalSiteUpdate(BaseModel):
     name: Optional[str] = None
@@ -0,0 +1,400 @@
+import codecs
+import csv
+import json
+import logging
+import os
+from typing import AsyncIterator, Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
+
+from pydantic import ValidationError
+from sqlalchemy import JSON, Text, bindparam, cast, or_, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from models.historical_site import HistoricalSite
+from schemas.historical_site import (
+    BulkImportError,
+    BulkImportReport,
+    HistoricalSiteCreate,
+)
+from services.cache import site_cache
+from services.catalog_version import bump_catalog_version
+from services.cluster_index import cluster_index
+from services.image_pipeline import schedule_site_images
+from services.search_index import search_index
+from services.spatial_index import geohash_for
+from services.tag_index import sync_tags_many
+
+logger = logging.getLogger(__name__)
+
+BULK_IMPORT_CHUNK_SIZE = int(os.getenv("BULK_IMPORT_CHUNK_SIZE", "1000"))
+MAX_REPORTED_ERRORS = 1000
+FORMATS = ("json", "ndjson", "csv")
+
+# Columns an imported row may overwrite when the site already exists
+# (matched by name); only the ones the row supplies are written
+UPSERT_COLUMNS = (
+    "description",
+    "latitude",
+    "longitude",
+    "address",
+    "era",
+    "tags",
+    "images",
+    "audio_guide_url",
+    "verified",
+    "date_established",
+)
+
+# A parsed row, or the reason it could not be parsed
+Row = Tuple[int, Union[dict, str]]
+# A validated row: its number, the values to insert and the columns it supplied
+ChunkRow = Tuple[int, dict, FrozenSet[str]]
+
+
+def format_from_content_type(content_type: Optional[str]) -> str:
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        return "ndjson"
+    if content_type in ("text/csv", "application/csv"):
+        return "csv"
+    return "json"
+
+
+async def _decode(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    pending = ""
+    async for text in _decode(chunks):
+        lines = (pending + text).split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+async def _ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Row]:
+    row_number = 0
+    async for line in _lines(chunks):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            yield row_number, json.loads(line)
+        except ValueError as e:
+            yield row_number, f"Invalid JSON: {e}"
+
+
+async def _json_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Row]:
+    """
+    Rows of a top-level JSON array, decoded one element at a time as the
+    body arrives instead of loading the whole document.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = finished = False
+    row_number = 0
+    async for text in _decode(chunks):
+        buffer = buffer[position:] + text
+        position = 0
+        while not finished:
+            while position < len(buffer) and (
+                buffer[position].isspace() or (started and buffer[position] == ",")
+            ):
+                position += 1
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != "[":
+                    yield row_number + 1, "Expected a JSON array of sites"
+                    return
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                finished = True
+                break
+            try:
+                value, position = decoder.raw_decode(buffer, position)
+            except ValueError:
+                break  # incomplete element, wait for more data
+            row_number += 1
+            yield row_number, value
+    if not finished and buffer[position:].strip():
+        yield row_number + 1, "Invalid JSON: unexpected end of document"
+
+
+def _list_value(value: str):
+    value = value.strip()
+    if not value:
+        return []
+    if value.startswith("["):
+        return json.loads(value)
+    return [item.strip() for item in value.split("|") if item.strip()]
+
+
+async def _csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Row]:
+    """
+    Rows of a CSV file with a header line. ``tags`` and ``images`` hold a
+    JSON array or ``|``-separated values; empty cells are treated as unset.
+    """
+    header = None
+    row_number = 0
+    record = []
+    quotes = 0
+    async for line in _lines(chunks):
+        # A record ends at a newline outside quotes, i.e. once it holds an
+        # even number of quote characters.
+        record.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        text = "\n".join(record)
+        record = []
+        quotes = 0
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row_number += 1
+        if len(values) != len(header):
+            yield row_number, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        row = {name: value for name, value in zip(header, values) if value != ""}
+        try:
+            for name in ("tags", "images"):
+                if name in row:
+                    row[name] = _list_value(row[name])
+        except ValueError as e:
+            yield row_number, f"Invalid list value: {e}"
+            continue
+        yield row_number, row
+    if record:
+        yield row_number + 1, "Unterminated quoted field"
+
+
+def parse_rows(chunks: AsyncIterator[bytes], format: str) -> AsyncIterator[Row]:
+    """
+    Stream ``(row_number, row)`` pairs out of a JSON array, NDJSON or CSV
+    body; rows that cannot be parsed carry an error message instead.
+    """
+    if format == "ndjson":
+        return _ndjson_rows(chunks)
+    if format == "csv":
+        return _csv_rows(chunks)
+    if format == "json":
+        return _json_rows(chunks)
+    raise ValueError(f"Unsupported format {format!r}, expected one of {FORMATS}")
+
+
+async def iterate_rows(rows: Iterable[dict]) -> AsyncIterator[Row]:
+    for row_number, row in enumerate(rows, start=1):
+        yield row_number, row
+
+
+def _fail(report: BulkImportReport, row_number: int, error: str) -> None:
+    report.failed += 1
+    if len(report.errors) < MAX_REPORTED_ERRORS:
+        report.errors.append(BulkImportError(row=row_number, error=error))
+
+
+def _upsert_statement(dialect: str, columns: FrozenSet[str]):
+    """
+    Insert rows, or update the ``columns`` of the existing site with the same
+    name. Sites whose values would not change are left alone, so their
+    version is not bumped.
+    """
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise ValueError(f"Bulk import is not supported on {dialect}")
+    table = HistoricalSite.__table__
+    stmt = insert(table)
+    columns = [column for column in UPSERT_COLUMNS if column in columns]
+    if not columns:
+        return stmt.on_conflict_do_nothing(index_elements=[table.c.name])
+    updated = {column: stmt.excluded[column] for column in columns}
+    updated["version"] = table.c.version + 1
+    changed = [
+        # JSON has no equality operator on Postgres, compare the text
+        cast(table.c[column], Text).is_distinct_from(cast(stmt.excluded[column], Text))
+        if isinstance(table.c[column].type, JSON)
+        else table.c[column].is_distinct_from(stmt.excluded[column])
+        for column in columns
+    ]
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.name], set_=updated, where=or_(*changed)
+    )
+
+
+async def _write_chunk(
+    db: AsyncSession,
+    chunk: Dict[str, ChunkRow],
+    report: BulkImportReport,
+    render_images: bool,
+) -> None:
+    """
+    Upsert ``chunk`` in one transaction. If the database rejects it, each row
+    is retried on its own so only the offending rows are reported.
+    """
+    names = list(chunk)
+    try:
+        existing = {
+            row.name: row
+            for row in await db.execute(
+                select(
+                    HistoricalSite.id,
+                    HistoricalSite.name,
+                    HistoricalSite.description,
+                    HistoricalSite.version,
+                ).where(HistoricalSite.name.in_(names))
+            )
+        }
+
+        # One statement per set of supplied columns
+        groups: Dict[FrozenSet[str], List[dict]] = {}
+        for _, values, columns in chunk.values():
+            groups.setdefault(columns, []).append(values)
+        for columns, rows in groups.items():
+            await db.execute(_upsert_statement(db.bind.dialect.name, columns), rows)
+
+        saved = (
+            await db.execute(
+                select(
+                    HistoricalSite.id,
+                    HistoricalSite.name,
+                    HistoricalSite.description,
+                    HistoricalSite.latitude,
+                    HistoricalSite.longitude,
+                    HistoricalSite.images,
+                    HistoricalSite.tags,
+                    HistoricalSite.geohash,
+                    HistoricalSite.version,
+                ).where(HistoricalSite.name.in_(names))
+            )
+        ).all()
+        changed = [
+            row
+            for row in saved
+            if row.name not in existing or row.version != existing[row.name].version
+        ]
+        if changed:
+            changed_ids = {row.id for row in changed}
+            await search_index.remove_many(
+                db,
+                [
+                    (site.id, site.name, site.description)
+                    for site in existing.values()
+                    if site.id in changed_ids
+                ],
+            )
+            await search_index.add_many(
+                db, [(row.id, row.name, row.description) for row in changed]
+            )
+            await sync_tags_many(db, {row.id: row.tags or [] for row in changed})
+            # A row may supply only one coordinate; hash what was stored
+            moved = [
+                {"site_id": row.id, "value": geohash_for(row.latitude, row.longitude)}
+                for row in changed
+                if geohash_for(row.latitude, row.longitude) != row.geohash
+            ]
+            if moved:
+                await db.execute(
+                    update(HistoricalSite.__table__)
+                    .where(HistoricalSite.__table__.c.id == bindparam("site_id"))
+                    .values(geohash=bindparam("value")),
+                    moved,
+                )
+            await bump_catalog_version(db)
+            if render_images:
+                await schedule_site_images(db, [row.id for row in changed if row.images])
+        await db.commit()
+    except SQLAlchemyError as e:
+        await db.rollback()
+        if len(chunk) > 1:
+            logger.warning(
+                f"Bulk import chunk of {len(chunk)} rows failed, writing rows one by one: {e}"
+            )
+            for name, item in chunk.items():
+                await _write_chunk(db, {name: item}, report, render_images)
+            return
+        row_number = next(iter(chunk.values()))[0]
+        logger.warning(f"Bulk import row {row_number} failed: {e}")
+        _fail(report, row_number, str(getattr(e, "orig", e)))
+        return
+
+    report.imported += len(chunk)
+    if not changed:
+        return
+    for row in changed:
+        cluster_index.upsert(row.id, row.latitude, row.longitude)
+    site_cache.invalidate_site()
+
+
+async def import_sites(
+    db: AsyncSession,
+    rows: AsyncIterator[Row],
+    chunk_size: int = BULK_IMPORT_CHUNK_SIZE,
+    render_images: bool = True,
+) -> BulkImportReport:
+    """
+    Validate rows and upsert them on ``name`` in chunks of ``chunk_size``,
+    one transaction per chunk. Existing sites only get the columns a row
+    supplies, and sites a row would not change are not rewritten. Derived
+    data (geohash, tags, search index) is written in the same transaction.
+    Rows that fail validation or that the database rejects are listed in
+    the report. Image variants are rendered in the background
+    unless ``render_images`` is off (see ``backfill_image_variants``).
+    """
+    report = BulkImportReport()
+    chunk: Dict[str, ChunkRow] = {}
+    async for row_number, row in rows:
+        report.received += 1
+        if isinstance(row, str):
+            _fail(report, row_number, row)
+            continue
+        if not isinstance(row, dict):
+            _fail(report, row_number, "Expected an object")
+            continue
+        try:
+            site = HistoricalSiteCreate(**row)
+        except ValidationError as e:
+            _fail(report, row_number, str(e))
+            continue
+        values = site.dict()
+        columns = frozenset(site.dict(exclude_unset=True))
+        values["tags"] = values["tags"] or []
+        values["images"] = values["images"] or []
+        values["geohash"] = geohash_for(values["latitude"], values["longitude"])
+
+        # The same name twice in one statement would conflict with itself;
+        # write what we have so the later row wins.
+        if values["name"] in chunk:
+            await _write_chunk(db, chunk, report, render_images)
+            chunk = {}
+        chunk[values["name"]] = (row_number, values, columns)
+        if len(chunk) >= chunk_size:
+            await _write_chunk(db, chunk, report, render_images)
+            chunk = {}
+    if chunk:
+        await _write_chunk(db, chunk, report, render_images)
+    logger.info(
+        f"Bulk import: {report.imported} imported, {report.failed} failed "
+        f"of {report.received} rows"
+    )
+    return report
@@ -0,0 +1,143 @@
+import os
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Optional, Protocol
+
+SITE_CACHE_MAX_ENTRIES = int(os.getenv("SITE_CACHE_MAX_ENTRIES", "1024"))
+SITE_CACHE_TTL = float(os.getenv("SITE_CACHE_TTL", "300"))
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class CacheBackend(Protocol):
+    """
+    Storage behind ``SiteCache``. The in-process ``LRUCache`` is the default;
+    a shared backend (e.g. one talking to Redis or memcached) only has to
+    provide these operations, and its values must be picklable.
+    """
+
+    stats: CacheStats
+
+    def get(self, key: str) -> Optional[Any]: ...
+
+    def set(self, key: str, value: Any) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+    def delete_prefix(self, prefix: str) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class LRUCache:
+    """
+    Size-bounded in-process cache: least recently used entries are evicted
+    past ``max_entries`` and every entry expires ``ttl`` seconds after it was
+    stored.
+    """
+
+    def __init__(
+        self, max_entries: int = SITE_CACHE_MAX_ENTRIES, ttl: float = SITE_CACHE_TTL
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def delete(self, key: str) -> None:
+        if self._entries.pop(key, None) is not None:
+            self.stats.invalidations += 1
+
+    def delete_prefix(self, prefix: str) -> None:
+        for key in [key for key in self._entries if key.startswith(prefix)]:
+            del self._entries[key]
+            self.stats.invalidations += 1
+
+    def clear(self) -> None:
+        self.stats.invalidations += len(self._entries)
+        self._entries.clear()
+
+
+class SiteCache:
+    """
+    Read-through cache of site read models. Single sites live under
+    ``site:<id>``; list and search pages under ``sites:...``, which any site
+    write may change. Writes by other processes are noticed through the
+    catalog version (see services/catalog_version.py).
+    """
+
+    SITE_PREFIX = "site:"
+    COLLECTION_PREFIX = "sites:"
+
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        self.backend = backend or LRUCache()
+
+    def configure_backend(self, backend: CacheBackend) -> None:
+        self.backend = backend
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.backend.stats
+
+    def site_key(self, site_id: int) -> str:
+        return f"{self.SITE_PREFIX}{site_id}"
+
+    def collection_key(self, name: str, *params) -> str:
+        return self.COLLECTION_PREFIX + name + ":" + repr(params)
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.backend.get(key)
+
+    def set(self, key: str, value: Any) -> None:
+        self.backend.set(key, value)
+
+    def invalidate_site(self, site_id: Optional[int] = None) -> None:
+        """
+        Drop everything a write to ``site_id`` (or a new site, when ``None``)
+        can make stale.
+        """
+        if site_id is not None:
+            self.backend.delete(self.site_key(site_id))
+        self.backend.delete_prefix(self.COLLECTION_PREFIX)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+site_cache = SiteCache()
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+from typing import Optional, Set
+
+from sqlalchemy import event, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+
+from data.database import AsyncSessionLocal
+from models.catalog_version import CatalogVersion
+from services.cache import site_cache
+from services.cluster_index import cluster_index
+from services.search_index import search_index
+
+logger = logging.getLogger(__name__)
+
+# Session.info key of the versions a transaction produced, until it commits
+PRODUCED_KEY = "catalog_version.produced"
+
+# Catalog version the contents of site_cache correspond to
+_last_seen_version: Optional[int] = None
+
+# Versions this process's own commits produced and it has not yet seen;
+# its writes invalidate what they touch themselves, so reaching one of
+# these is no reason to drop the whole cache.
+_produced: Set[int] = set()
+
+# Background reload of the in-process indexes, and whether another outside
+# change arrived since it read the catalog
+_reload: Optional[asyncio.Task] = None
+_reload_requested = False
+
+
+@event.listens_for(Session, "after_commit")
+def _record_produced(session: Session) -> None:
+    _produced.update(session.info.pop(PRODUCED_KEY, ()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_produced(session: Session) -> None:
+    session.info.pop(PRODUCED_KEY, None)
+
+
+def _changed_elsewhere(last: int, version: int) -> bool:
+    if version < last:
+        # The catalog was reset
+        return True
+    return any(v not in _produced for v in range(last + 1, version + 1))
+
+
+async def _reload_indexes() -> None:
+    global _reload_requested
+    while _reload_requested:
+        _reload_requested = False
+        try:
+            async with AsyncSessionLocal() as db:
+                await cluster_index.refresh(db)
+                await search_index.load(db)
+        except Exception:
+            logger.exception("Reloading the in-process indexes failed")
+
+
+def _schedule_reload() -> None:
+    """
+    Rebuild the indexes this process keeps in memory from the database,
+    once at a time; changes arriving meanwhile trigger one more pass.
+    """
+    global _reload, _reload_requested
+    _reload_requested = True
+    if _reload is None or _reload.done():
+        _reload = asyncio.get_running_loop().create_task(_reload_indexes())
+
+
+async def stop_reload() -> None:
+    global _reload
+    if _reload is not None and not _reload.done():
+        _reload.cancel()
+        await asyncio.gather(_reload, return_exceptions=True)
+    _reload = None
+
+
+async def get_catalog_version(db: AsyncSession) -> int:
+    """
+    Current catalog version, read from the database on every call: other
+    workers write to the catalog too. When another process moved it since
+    this one last looked, everything this process cached may be stale: the
+    site cache is dropped and the in-process indexes are reloaded.
+    """
+    global _last_seen_version
+    result = await db.execute(
+        select(CatalogVersion.version).where(CatalogVersion.id == 1)
+    )
+    version = result.scalar() or 0
+    last = _last_seen_version
+    if version != last:
+        if last is not None and _changed_elsewhere(last, version):
+            site_cache.clear()
+            _schedule_reload()
+        if last is not None and version < last:
+            _produced.clear()
+        else:
+            _produced.difference_update([v for v in _produced if v <= version])
+        _last_seen_version = version
+    return version
+
+
+async def bump_catalog_version(db: AsyncSession) -> None:
+    """
+    Mark the catalog as changed; call inside the transaction doing the write.
+    """
+    result = await db.execute(
+        update(CatalogVersion)
+        .where(CatalogVersion.id == 1)
+        .values(version=CatalogVersion.version + 1)
+        .returning(CatalogVersion.version)
+    )
+    version = result.scalar()
+    if version is None:
+        version = 1
+        await db.execute(insert(CatalogVersion).values(id=1, version=version))
+    db.sync_session.info.setdefault(PRODUCED_KEY, []).append(version)
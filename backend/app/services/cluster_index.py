@@ -0,0 +1,427 @@
+import asyncio
+import logging
+import math
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from models.historical_site import HistoricalSite
+
+logger = logging.getLogger(__name__)
+
+# Clusters are computed for zooms 0..CLUSTER_MAX_ZOOM; above it every site is
+# returned on its own.
+CLUSTER_MAX_ZOOM = int(os.getenv("CLUSTER_MAX_ZOOM", "16"))
+
+# Writes kept beside the arrays before they are folded back in by a rebuild
+CLUSTER_COMPACT_THRESHOLD = int(os.getenv("CLUSTER_COMPACT_THRESHOLD", "10000"))
+
+# Grid cells per tile side: with 512px tiles a cell is 64px wide at every zoom.
+# It is a power of two so that each cell splits into exactly four cells one
+# zoom level down.
+CELLS_PER_TILE = 8
+
+# Cells are numbered ``cx * n + cy`` with ``n`` cells per side, so the cells
+# of one column are a contiguous range of numbers.
+Cell = int
+# (count, sum of x, sum of y, sum of site ids); for a single site the id sum
+# is its id.
+AGGREGATE_WIDTH = 4
+# (latitude, longitude, x, y)
+Point = Tuple[float, float, float, float]
+
+
+def project(latitude, longitude):
+    """
+    Web Mercator coordinates in [0, 1] (x east, y south); works on scalars
+    and NumPy arrays.
+    """
+    x = np.asarray(longitude, dtype=np.float64) / 360.0 + 0.5
+    sin = np.sin(np.radians(latitude))
+    with np.errstate(divide="ignore"):
+        y = 0.5 - 0.25 * np.log((1 + sin) / (1 - sin)) / np.pi
+    return x, np.clip(y, 0.0, 1.0)
+
+
+def unproject(x: float, y: float) -> Tuple[float, float]:
+    longitude = (x - 0.5) * 360.0
+    latitude = math.degrees(2 * math.atan(math.exp(math.pi * (1 - 2 * y)))) - 90.0
+    return latitude, longitude
+
+
+def parse_bbox(bbox: str) -> Tuple[float, float, float, float]:
+    """
+    ``"min_lon,min_lat,max_lon,max_lat"`` (west, south, east, north); west
+    greater than east means the box crosses the antimeridian.
+    """
+    try:
+        west, south, east, north = (float(value) for value in bbox.split(","))
+    except ValueError:
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat")
+    if not (-180 <= west <= 180 and -180 <= east <= 180):
+        raise ValueError("bbox longitudes must be between -180 and 180")
+    if not -90 <= south <= north <= 90:
+        raise ValueError("bbox latitudes must satisfy -90 <= min_lat <= max_lat <= 90")
+    return west, south, east, north
+
+
+class _Level:
+    """
+    One zoom level: the occupied cells in sorted arrays as loaded, plus the
+    aggregate changes written since, per cell.
+    """
+
+    def __init__(self, cells: np.ndarray, aggregates: np.ndarray):
+        self.cells = cells
+        self.aggregates = aggregates
+        self.changes: Dict[Cell, List[float]] = {}
+
+    def lookup(self, cells: np.ndarray) -> np.ndarray:
+        """
+        Aggregates of ``cells`` (zeros for empty cells).
+        """
+        found = np.zeros((len(cells), AGGREGATE_WIDTH))
+        if len(self.cells):
+            positions = np.minimum(np.searchsorted(self.cells, cells), len(self.cells) - 1)
+            hit = self.cells[positions] == cells
+            found[hit] = self.aggregates[positions[hit]]
+        if self.changes:
+            for i, cell in enumerate(cells.tolist()):
+                change = self.changes.get(cell)
+                if change is not None:
+                    found[i] += change
+        return found
+
+    def in_columns(self, first: int, last: int, n: int) -> np.ndarray:
+        """
+        Cells in columns ``first..last``, loaded or written since.
+        """
+        low, high = np.searchsorted(self.cells, [first * n, (last + 1) * n])
+        cells = self.cells[low:high]
+        if self.changes:
+            changed = [cell for cell in self.changes if first <= cell // n <= last]
+            cells = np.union1d(cells, np.array(changed, dtype=np.int64))
+        return cells
+
+
+class ClusterIndex:
+    """
+    Hierarchical grid clustering of site coordinates, one level per zoom.
+
+    At zoom ``z`` the Mercator plane is cut into ``CELLS_PER_TILE * 2**z``
+    cells per side and the sites of a cell form one cluster, shown at their
+    centroid. Levels nest exactly, so a cluster's children are the (up to
+    four) occupied cells below it. Unlike supercluster's greedy radius
+    clustering, every level is a plain aggregate that a site write updates
+    in O(number of zooms) without rebuilding anything.
+
+    Loaded sites and levels are kept in NumPy arrays; writes made after
+    loading are kept in small dicts beside them until the next rebuild,
+    which runs once ``CLUSTER_COMPACT_THRESHOLD`` of them piled up.
+    """
+
+    def __init__(self, max_zoom: int = CLUSTER_MAX_ZOOM):
+        self.max_zoom = max_zoom
+        self._lock = asyncio.Lock()
+        # Writes made while a rebuild runs, replayed onto its result
+        self._journal: Optional[List[Tuple[int, Optional[float], Optional[float]]]] = None
+        self._compaction: Optional[asyncio.Task] = None
+        self.load([])
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _cells_per_side(zoom: int) -> int:
+        return CELLS_PER_TILE << zoom
+
+    def _cell(self, x: float, y: float, zoom: int) -> Cell:
+        n = self._cells_per_side(zoom)
+        return min(int(x * n), n - 1) * n + min(int(y * n), n - 1)
+
+    def _build(self, rows: Iterable[Tuple[int, float, float]]) -> tuple:
+        """
+        Arrays for ``(site_id, latitude, longitude)`` rows, every level in
+        one vectorized pass. Touches no state, so it can run in a thread.
+        """
+        rows = [row for row in rows if row[1] is not None and row[2] is not None]
+        table = np.array(rows, dtype=np.float64).reshape(-1, 3)
+        order = np.argsort(table[:, 0], kind="stable")
+        ids = table[order, 0].astype(np.int64)
+        lats, lons = table[order, 1], table[order, 2]
+        xs, ys = project(lats, lons)
+
+        levels = []
+        for zoom in range(self.max_zoom + 1):
+            n = self._cells_per_side(zoom)
+            cx = np.minimum((xs * n).astype(np.int64), n - 1)
+            cy = np.minimum((ys * n).astype(np.int64), n - 1)
+            cells, inverse = np.unique(cx * n + cy, return_inverse=True)
+            aggregates = np.empty((len(cells), AGGREGATE_WIDTH))
+            aggregates[:, 0] = np.bincount(inverse, minlength=len(cells))
+            aggregates[:, 1] = np.bincount(inverse, weights=xs, minlength=len(cells))
+            aggregates[:, 2] = np.bincount(inverse, weights=ys, minlength=len(cells))
+            aggregates[:, 3] = np.bincount(inverse, weights=ids, minlength=len(cells))
+            levels.append(_Level(cells, aggregates))
+        # Sites ordered by their cell at max_zoom, for zooms past clustering
+        leaf_order = np.argsort(cx * n + cy, kind="stable")
+        return (
+            ids,
+            np.column_stack([lats, lons, xs, ys]),
+            levels,
+            (cx * n + cy)[leaf_order],
+            leaf_order,
+            {},
+            len(ids),
+        )
+
+    def _install(self, state: tuple) -> None:
+        # Swap everything in at once, then redo what was written meanwhile
+        (
+            self._ids,
+            self._coordinates,
+            self._levels,
+            self._leaf_cells,
+            self._leaf_order,
+            self._moved,
+            self._size,
+        ) = state
+        journal, self._journal = self._journal, None
+        for site_id, latitude, longitude in journal or ():
+            self.upsert(site_id, latitude, longitude)
+
+    def load(self, rows: Iterable[Tuple[int, float, float]]) -> None:
+        """
+        Rebuild from ``(site_id, latitude, longitude)`` rows.
+        """
+        self._install(self._build(rows))
+
+    async def _rebuild(self, rows) -> None:
+        # Building the levels takes seconds for large catalogs
+        self._install(await asyncio.to_thread(self._build, rows))
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """
+        Rebuild from the database. Writes applied while it runs are
+        journaled before the rows are read and replayed once it is done.
+        """
+        async with self._lock:
+            self._journal = []
+            try:
+                result = await db.execute(
+                    select(HistoricalSite.id, HistoricalSite.latitude, HistoricalSite.longitude)
+                )
+                await self._rebuild(result.all())
+            finally:
+                self._journal = None
+
+    def _rows(self) -> List[Tuple[int, float, float]]:
+        """
+        ``(site_id, latitude, longitude)`` of every site, with later writes.
+        """
+        rows = [
+            (site_id, lat, lon)
+            for site_id, (lat, lon) in zip(
+                self._ids.tolist(), self._coordinates[:, :2].tolist()
+            )
+            if site_id not in self._moved
+        ]
+        rows += [
+            (site_id, point[0], point[1])
+            for site_id, point in self._moved.items()
+            if point is not None
+        ]
+        return rows
+
+    async def compact(self) -> None:
+        """
+        Fold the writes kept in dicts back into the arrays.
+        """
+        async with self._lock:
+            if len(self._moved) <= CLUSTER_COMPACT_THRESHOLD:
+                return
+            self._journal = []
+            try:
+                await self._rebuild(self._rows())
+            finally:
+                self._journal = None
+
+    def _compacted(self, task: asyncio.Task) -> None:
+        self._compaction = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Compacting the cluster index failed", exc_info=task.exception())
+
+    def _maybe_compact(self) -> None:
+        if len(self._moved) <= CLUSTER_COMPACT_THRESHOLD or self._compaction is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Not serving requests, nothing to block
+            self.load(self._rows())
+            return
+        self._compaction = loop.create_task(self.compact())
+        self._compaction.add_done_callback(self._compacted)
+
+    def _point(self, site_id: int) -> Optional[Point]:
+        if site_id in self._moved:
+            return self._moved[site_id]
+        position = int(np.searchsorted(self._ids, site_id))
+        if position < len(self._ids) and self._ids[position] == site_id:
+            return tuple(self._coordinates[position].tolist())
+        return None
+
+    def _apply(self, site_id: int, x: float, y: float, sign: int) -> None:
+        for zoom, level in enumerate(self._levels):
+            cell = self._cell(x, y, zoom)
+            change = level.changes.get(cell)
+            if change is None:
+                change = level.changes[cell] = [0, 0.0, 0.0, 0]
+            change[0] += sign
+            change[1] += sign * x
+            change[2] += sign * y
+            change[3] += sign * site_id
+
+    def upsert(
+        self, site_id: int, latitude: Optional[float], longitude: Optional[float]
+    ) -> None:
+        if self._journal is not None:
+            self._journal.append((site_id, latitude, longitude))
+        self._remove(site_id)
+        if latitude is not None and longitude is not None:
+            x, y = project(latitude, longitude)
+            x, y = float(x), float(y)
+            self._moved[site_id] = (latitude, longitude, x, y)
+            self._size += 1
+            self._apply(site_id, x, y, 1)
+        self._maybe_compact()
+
+    def remove(self, site_id: int) -> None:
+        self.upsert(site_id, None, None)
+
+    def _remove(self, site_id: int) -> None:
+        point = self._point(site_id)
+        if point is not None:
+            self._moved[site_id] = None
+            self._size -= 1
+            self._apply(site_id, point[2], point[3], -1)
+
+    def _expansion_zooms(self, cells: np.ndarray, zoom: int) -> np.ndarray:
+        """
+        First zoom at which each cluster of ``cells`` splits in two or more.
+        """
+        expansion = np.full(len(cells), self.max_zoom + 1, dtype=np.int64)
+        pending = np.arange(len(cells))
+        cells = cells.copy()
+        while zoom < self.max_zoom and len(pending):
+            n = self._cells_per_side(zoom)
+            zoom += 1
+            cx, cy = cells // n, cells % n
+            children = np.stack(
+                [
+                    (2 * cx + dx) * (2 * n) + 2 * cy + dy
+                    for dx in (0, 1)
+                    for dy in (0, 1)
+                ],
+                axis=1,
+            )
+            counts = self._levels[zoom].lookup(children.ravel())[:, 0]
+            occupied = counts.reshape(-1, 4) >= 0.5
+            split = occupied.sum(axis=1) > 1
+            expansion[pending[split]] = zoom
+            pending = pending[~split]
+            cells = children[~split][occupied[~split]]
+        return expansion
+
+    def _columns(self, n: int, x0: float, y0: float, x1: float, y1: float):
+        return (
+            int(x0 * n),
+            int(y0 * n),
+            min(int(x1 * n), n - 1),
+            min(int(y1 * n), n - 1),
+        )
+
+    def _sites(
+        self, west: float, south: float, east: float, north: float, x0, y0, x1, y1
+    ) -> List[dict]:
+        n = self._cells_per_side(self.max_zoom)
+        cx0, cy0, cx1, cy1 = self._columns(n, x0, y0, x1, y1)
+        low, high = np.searchsorted(self._leaf_cells, [cx0 * n, (cx1 + 1) * n])
+        rows = self._leaf_order[low:high]
+        cy = self._leaf_cells[low:high] % n
+        rows = rows[(cy >= cy0) & (cy <= cy1)]
+        if self._moved:
+            rows = rows[~np.isin(self._ids[rows], list(self._moved))]
+        points = [
+            (int(site_id), lat, lon)
+            for site_id, (lat, lon, _, _) in zip(
+                self._ids[rows].tolist(), self._coordinates[rows].tolist()
+            )
+        ]
+        points += [
+            (site_id, point[0], point[1])
+            for site_id, point in self._moved.items()
+            if point is not None
+        ]
+        return [
+            {"latitude": lat, "longitude": lon, "count": 1, "site_id": site_id}
+            for site_id, lat, lon in points
+            if south <= lat <= north and west <= lon <= east
+        ]
+
+    def clusters(
+        self, west: float, south: float, east: float, north: float, zoom: int
+    ) -> List[dict]:
+        """
+        Clusters (and single sites) whose position lies in the box at
+        ``zoom``. Clusters carry ``count`` and ``expansion_zoom``; single sites
+        carry ``site_id``.
+        """
+        if west > east:
+            return self.clusters(west, south, 180.0, north, zoom) + self.clusters(
+                -180.0, south, east, north, zoom
+            )
+        x0, y1 = (float(value) for value in project(south, west))
+        x1, y0 = (float(value) for value in project(north, east))
+        if zoom > self.max_zoom:
+            return self._sites(west, south, east, north, x0, y0, x1, y1)
+
+        level = self._levels[zoom]
+        n = self._cells_per_side(zoom)
+        cx0, cy0, cx1, cy1 = self._columns(n, x0, y0, x1, y1)
+        cells = level.in_columns(cx0, cx1, n)
+        cells = cells[(cells % n >= cy0) & (cells % n <= cy1)]
+        aggregates = level.lookup(cells)
+        occupied = aggregates[:, 0] >= 0.5
+        cells, aggregates = cells[occupied], aggregates[occupied]
+        counts = np.rint(aggregates[:, 0]).astype(np.int64)
+        clustered = counts > 1
+        expansion = np.zeros(len(cells), dtype=np.int64)
+        expansion[clustered] = self._expansion_zooms(cells[clustered], zoom)
+
+        features = []
+        for count, (_, sum_x, sum_y, sum_ids), expansion_zoom in zip(
+            counts.tolist(), aggregates.tolist(), expansion.tolist()
+        ):
+            if count == 1:
+                site_id = int(round(sum_ids))
+                lat, lon, _, _ = self._point(site_id)
+                feature = {"latitude": lat, "longitude": lon, "count": 1, "site_id": site_id}
+            else:
+                lat, lon = unproject(sum_x / count, sum_y / count)
+                feature = {
+                    "latitude": lat,
+                    "longitude": lon,
+                    "count": count,
+                    "expansion_zoom": expansion_zoom,
+                }
+            if south <= lat <= north and west <= lon <= east:
+                features.append(feature)
+        return features
+
+
+# Process-wide index, loaded at startup and kept in sync by the site service.
+cluster_index = ClusterIndex()
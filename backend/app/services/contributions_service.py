@@ -2,12 +2,16 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.exc import SQLAlchemyError
 from fastapi import HTTPException
+from typing import Optional
 
 from models.contributions import UserContribution, ContributionStatus
 from schemas.contributions import (
     ContributionCreate,
     ContributionUpdate,
 )
+from services.image_pipeline import schedule_contribution_images
+from services.media_checks import schedule_media_check
+from services.pagination import DEFAULT_PAGE_SIZE, Page, keyset_page
 
 
 async def create_contribution(
@@ -21,6 +25,11 @@ async def create_contribution(
     )
     db.add(new_contribution)
     try:
+        await db.flush()
+        if new_contribution.images:
+            await schedule_contribution_images(db, [new_contribution.id])
+        if new_contribution.images or new_contribution.audio:
+            await schedule_media_check(db, new_contribution.id)
         await db.commit()
         await db.refresh(new_contribution)
         return new_contribution
@@ -29,13 +38,15 @@ async def create_contribution(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def get_all_contributions(db: AsyncSession) -> list[UserContribution]:
+async def get_all_contributions(
+    db: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None
+) -> Page:
     """
-    Retrieve all contributions from the database.
+    Retrieve one page of contributions from the database.
     """
     try:
-        result = await db.execute(select(UserContribution))
-        return result.scalars().all()
+        stmt = select(UserContribution)
+        return await keyset_page(db, stmt, [UserContribution.id], limit, cursor)
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -62,10 +73,16 @@ async def update_contribution(
     Update an existing contribution.
     """
     contribution = await get_contribution_by_id(db, contribution_id)
-    for var, value in update_data.dict(exclude_unset=True).items():
+    changes = update_data.dict(exclude_unset=True)
+    for var, value in changes.items():
         setattr(contribution, var, value)
     try:
+        if "images" in changes:
+            await schedule_contribution_images(db, [contribution.id])
+        if "images" in changes or "audio" in changes:
+            await schedule_media_check(db, contribution.id)
         await db.commit()
+        await db.refresh(contribution)
         return contribution
     except SQLAlchemyError as e:
         await db.rollback()
@@ -89,10 +106,14 @@ async def delete_contribution(db: AsyncSession, contribution_id: int) -> bool:
         raise HTTPException(status_code=404, detail="Contribution not found")
 
 
-async def list_contributions_by_status(db: AsyncSession, status: ContributionStatus):
+async def list_contributions_by_status(
+    db: AsyncSession,
+    status: ContributionStatus,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> Page:
     query = select(UserContribution).filter(UserContribution.status == status)
-    result = await db.execute(query)
-    return result.scalars().all()
+    return await keyset_page(db, query, [UserContribution.id], limit, cursor)
 
 
 async def update_contribution_status(
@@ -108,4 +129,5 @@ async def update_contribution_status(
     contribution.status = new_status
     db.add(contribution)
     await db.commit()
+    await db.refresh(contribution)
     return contribution
@@ -0,0 +1,23 @@
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_many(latitude: float, longitude: float, lats, lons) -> np.ndarray:
+    """
+    Distances in km from one point to every point in ``lats``/``lons``
+    (degrees), in a single vectorized pass.
+    """
+    lat1 = np.radians(latitude)
+    lon1 = np.radians(longitude)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    lon2 = np.radians(np.asarray(lons, dtype=np.float64))
+    return _haversine_radians(lat1, lon1, lat2, lon2)
+
+
+def _haversine_radians(lat1, lon1, lat2, lon2) -> np.ndarray:
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
@@ -0,0 +1,102 @@
+import csv
+import enum
+import io
+import json
+import os
+from datetime import datetime
+from typing import AsyncIterator, Sequence
+
+from sqlalchemy.future import select
+
+from data.database import AsyncSessionLocal
+from models.contributions import UserContribution
+from models.historical_site import HistoricalSite
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+SITE_EXPORT_COLUMNS = (
+    "id",
+    "name",
+    "description",
+    "latitude",
+    "longitude",
+    "address",
+    "era",
+    "tags",
+    "images",
+    "audio_guide_url",
+    "verified",
+    "date_established",
+    "version",
+)
+
+CONTRIBUTION_EXPORT_COLUMNS = (
+    "id",
+    "historical_site_id",
+    "contributor_name",
+    "contribution_details",
+    "images",
+    "audio",
+    "verified",
+    "status",
+)
+
+
+def _json_value(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _csv_value(value):
+    value = _json_value(value)
+    if isinstance(value, (list, dict)):
+        # Same encoding the CSV bulk import accepts
+        return json.dumps(value)
+    return "" if value is None else value
+
+
+def _encode(rows: Sequence, columns: Sequence[str], format: str) -> bytes:
+    if format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerows([[_csv_value(getattr(row, c)) for c in columns] for row in rows])
+        return buffer.getvalue().encode()
+    return "".join(
+        json.dumps({c: _json_value(getattr(row, c)) for c in columns}) + "\n"
+        for row in rows
+    ).encode()
+
+
+async def _stream(model, columns: Sequence[str], format: str) -> AsyncIterator[bytes]:
+    """
+    Encode every row of ``model`` in id order, ``EXPORT_CHUNK_SIZE`` rows at
+    a time, reading through a server-side cursor so memory use does not
+    depend on the table size. The stream owns its session because it
+    outlives the request handler.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unsupported format {format!r}, expected one of {FORMATS}")
+    if format == "csv":
+        yield (",".join(columns) + "\n").encode()
+    async with AsyncSessionLocal() as session:
+        stmt = (
+            select(model)
+            .order_by(model.id)
+            .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+        )
+        result = await session.stream_scalars(stmt)
+        async for rows in result.partitions():
+            yield _encode(rows, columns, format)
+
+
+def stream_sites(format: str) -> AsyncIterator[bytes]:
+    return _stream(HistoricalSite, SITE_EXPORT_COLUMNS, format)
+
+
+def stream_contributions(format: str) -> AsyncIterator[bytes]:
+    return _stream(UserContribution, CONTRIBUTION_EXPORT_COLUMNS, format)
@@ -1,23 +1,47 @@
 from fastapi import HTTPException
+from sqlalchemy import Integer, cast, extract
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError, NoResultFound, SQLAlchemyError
-from sqlalchemy.future import select
-from sqlalchemy.sql import or_
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql import func
+from collections import Counter
 from datetime import datetime
-from math import radians, sin, cos, sqrt, asin
-from sqlmodel import Session, select
-from typing import List, Optional
+from sqlmodel import select
+from typing import Dict, List, Optional, Tuple
 import logging
 
 
+from models.contributions import ContributionStatus, UserContribution
 from models.historical_site import HistoricalSite
-from schemas.historical_site import HistoricalSiteCreate, HistoricalSiteUpdate
-
-
 from schemas.historical_site import (
     HistoricalSiteCreate,
+    HistoricalSiteDetail,
+    HistoricalSiteRead,
     HistoricalSiteUpdate,
 )
+from services.cache import site_cache
+from services.catalog_version import bump_catalog_version
+from services.cluster_index import cluster_index
+from services.distance_engine import haversine_many
+from services.image_pipeline import schedule_site_images
+from services.pagination import (
+    DEFAULT_PAGE_SIZE,
+    Page,
+    decode_cursor,
+    encode_cursor,
+    keyset_page,
+)
+from services.search_index import MEMORY_BATCH_SIZE, search_index
+from services.serialization import EncodedSite, dump_columns, dump_sites, encode_site
+from services.tag_index import remove_site_tags, sync_site_tags, tag_facets, tag_filter
+from services.spatial_index import (
+    boxes_filter,
+    candidate_filter,
+    geohash_for,
+    validate_bounds,
+    validate_coordinates,
+    viewport_boxes,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -27,12 +51,21 @@ async def create_historical_site(
 ) -> HistoricalSite:
     try:
         site = HistoricalSite(**site_create.dict())
+        site.geohash = geohash_for(site.latitude, site.longitude)
         db.add(site)
         logger.info(f"Creating historical site: {site_create.name}")
+        await db.flush()
+        await search_index.add(db, site)
+        await sync_site_tags(db, site.id, site.tags)
+        await bump_catalog_version(db)
+        if site.images:
+            await schedule_site_images(db, [site.id])
         await db.commit()
         logger.info(f"Successfully created historical site: {site_create.name}")
         await db.refresh(site)
         logger.info(f"Refreshing historical site: {site_create.name}")
+        cluster_index.upsert(site.id, site.latitude, site.longitude)
+        site_cache.invalidate_site()
         return site
     except IntegrityError:
         await db.rollback()
@@ -42,26 +75,44 @@ async def create_historical_site(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def get_historical_site(db: AsyncSession, site_id: int) -> HistoricalSite:
+async def get_historical_site(db: AsyncSession, site_id: int) -> EncodedSite:
+    """
+    Cached as the encoded body and its digest, so a revalidation or a hit
+    is answered without serializing the site again.
+    """
+    key = site_cache.site_key(site_id)
+    cached = site_cache.get(key)
+    if cached is not None:
+        return cached
     try:
         stmt = select(HistoricalSite).where(HistoricalSite.id == site_id)
         result = await db.execute(stmt)
         site = result.scalars().first()
         if site is None:
             raise HTTPException(status_code=404, detail="Historical site not found")
-        return site
+        encoded = encode_site(HistoricalSiteRead.model_validate(site))
+        site_cache.set(key, encoded)
+        return encoded
     except NoResultFound:
         raise HTTPException(status_code=404, detail="Historical site not found")
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def get_all_historical_sites(db: AsyncSession) -> List[HistoricalSite]:
+async def get_all_historical_sites(
+    db: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None
+) -> Page:
+    key = site_cache.collection_key("all", limit, cursor)
+    cached = site_cache.get(key)
+    if cached is not None:
+        return cached
     try:
         stmt = select(HistoricalSite)
-        result = await db.execute(stmt)
-        sites = result.scalars().all()
-        return sites
+        page = _read_page(
+            await keyset_page(db, stmt, [HistoricalSite.id], limit, cursor)
+        )
+        site_cache.set(key, page)
+        return page
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -75,11 +126,23 @@ async def update_historical_site(
         site = result.scalars().first()
         if site is None:
             raise HTTPException(status_code=404, detail="Historical site not found")
-        for field, value in site_update.dict(exclude_unset=True).items():
+        await search_index.remove(db, site.id, site.name, site.description)
+        changes = site_update.dict(exclude_unset=True)
+        for field, value in changes.items():
             setattr(site, field, value)
+        site.geohash = geohash_for(site.latitude, site.longitude)
+        site.version = (site.version or 0) + 1
         db.add(site)
+        await db.flush()
+        await search_index.add(db, site)
+        await sync_site_tags(db, site.id, site.tags)
+        await bump_catalog_version(db)
+        if "images" in changes:
+            await schedule_site_images(db, [site.id])
         await db.commit()
         await db.refresh(site)
+        cluster_index.upsert(site.id, site.latitude, site.longitude)
+        site_cache.invalidate_site(site_id)
         return site
     except NoResultFound:
         raise HTTPException(status_code=404, detail="Historical site not found")
@@ -88,16 +151,24 @@ async def update_historical_site(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def delete_historical_site(db: AsyncSession, site_id: int) -> bool:
+async def delete_historical_site(
+    db: AsyncSession, site_id: int
+) -> HistoricalSiteRead:
     try:
         stmt = select(HistoricalSite).where(HistoricalSite.id == site_id)
         result = await db.execute(stmt)
         site = result.scalars().first()
         if site is None:
             raise HTTPException(status_code=404, detail="Historical site not found")
-        db.delete(site)
+        deleted = HistoricalSiteRead.model_validate(site)
+        await search_index.remove(db, site.id, site.name, site.description)
+        await remove_site_tags(db, site.id)
+        await db.delete(site)
+        await bump_catalog_version(db)
         await db.commit()
-        return True
+        cluster_index.remove(site_id)
+        site_cache.invalidate_site(site_id)
+        return deleted
     except NoResultFound:
         raise HTTPException(status_code=404, detail="Historical site not found")
     except SQLAlchemyError as e:
@@ -105,65 +176,205 @@ async def delete_historical_site(db: AsyncSession, site_id: int) -> bool:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _read_page(page: Page) -> Page:
+    """
+    The page with its sites encoded as a JSON array of ``HistoricalSiteRead``,
+    ready to be cached and served as is.
+    """
+    return Page(items=dump_sites(page.items), next_cursor=page.next_cursor)
+
+
+def _search_statement(
+    query_string: Optional[str], tags: Optional[List[str]], match_all_tags: bool
+):
+    """
+    The filtered select of ``HistoricalSite`` and its ordering keys.
+    """
+    query = select(HistoricalSite)
+    keys = [HistoricalSite.id]
+    if query_string:
+        query, rank = search_index.apply(query, query_string)
+        if rank is not None:
+            keys.insert(0, rank)
+
+    if tags:
+        query = query.where(tag_filter(tags, match_all=match_all_tags))
+    return query, keys
+
+
+async def _ranked_page(
+    db: AsyncSession,
+    ranking: List[int],
+    tags: Optional[List[str]],
+    match_all_tags: bool,
+    limit: int,
+    cursor: Optional[str],
+) -> Page:
+    """
+    ``keyset_page`` for matches ranked by the in-process search index: the
+    cursor holds the last site's position in ``ranking`` (and its id, like a
+    keyset cursor), and matches are read ``MEMORY_BATCH_SIZE`` ids at a time.
+    """
+    position = 0
+    if cursor:
+        last, _ = decode_cursor(cursor, 2)
+        if not isinstance(last, int) or last < 0:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        position = last + 1
+    found = []
+    while position < len(ranking) and len(found) <= limit:
+        batch = ranking[position : position + MEMORY_BATCH_SIZE]
+        query, _ = _search_statement(None, tags, match_all_tags)
+        result = await db.execute(query.where(HistoricalSite.id.in_(batch)))
+        sites = {site.id: site for site in result.scalars().all()}
+        found.extend(
+            (position + offset, sites[site_id])
+            for offset, site_id in enumerate(batch)
+            if site_id in sites
+        )
+        position += len(batch)
+    next_cursor = None
+    if len(found) > limit:
+        found = found[:limit]
+        next_cursor = encode_cursor([found[-1][0], found[-1][1].id])
+    return Page(items=[site for _, site in found], next_cursor=next_cursor)
+
+
 async def search_historical_sites(
     db: AsyncSession,
     query_string: Optional[str] = None,
     tags: Optional[List[str]] = None,
-) -> List[HistoricalSite]:
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    match_all_tags: bool = False,
+) -> Page:
+    """
+    Sites matching ``query_string`` (full-text, best match first) and
+    carrying any (or, with ``match_all_tags``, every) one of ``tags``, one
+    page at a time.
+    """
+    key = site_cache.collection_key(
+        "search", query_string, tuple(tags or ()), limit, cursor, match_all_tags
+    )
+    cached = site_cache.get(key)
+    if cached is not None:
+        return cached
     try:
-        query = select(HistoricalSite)
-        if query_string:
-            query = query.filter(
-                or_(
-                    HistoricalSite.name.ilike(f"%{query_string}%"),
-                    HistoricalSite.description.ilike(f"%{query_string}%"),
-                )
+        ranking = search_index.ranking(query_string) if query_string else None
+        if ranking is not None:
+            page = await _ranked_page(db, ranking, tags, match_all_tags, limit, cursor)
+        else:
+            query, keys = _search_statement(query_string, tags, match_all_tags)
+            page = await keyset_page(db, query, keys, limit, cursor)
+        page = _read_page(page)
+        site_cache.set(key, page)
+        return page
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def get_tag_facets(
+    db: AsyncSession,
+    query_string: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    match_all_tags: bool = False,
+) -> List[Tuple[str, int]]:
+    """
+    Tag counts over the sites matched by the same filters as
+    ``search_historical_sites``.
+    """
+    try:
+        if not query_string and not tags:
+            return await tag_facets(db)
+        ranking = search_index.ranking(query_string) if query_string else None
+        if ranking is None:
+            query, _ = _search_statement(query_string, tags, match_all_tags)
+            return await tag_facets(db, query)
+        counts = Counter()
+        query, _ = _search_statement(None, tags, match_all_tags)
+        for start in range(0, len(ranking), MEMORY_BATCH_SIZE):
+            batch = ranking[start : start + MEMORY_BATCH_SIZE]
+            counts.update(
+                dict(await tag_facets(db, query.where(HistoricalSite.id.in_(batch))))
             )
+        return sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        if tags:
-            query = query.filter(HistoricalSite.tags.any(tag.in_(tags)))
 
-        result = await db.execute(query)
-        sites = result.scalars().all()
-        return sites
+# Radius of the first kNN probe; each further probe widens it by KNN_GROWTH.
+KNN_INITIAL_RADIUS_KM = 0.5
+KNN_GROWTH = 4
+# Half the earth's circumference, i.e. every point on the globe.
+MAX_SEARCH_RADIUS_KM = 20038.0
 
-        if tags:
-            query = query.filter(HistoricalSite.tags.any(tag.in_(tags)))
 
-        result = await db.execute(query)
-        sites = result.scalars().all()
-        return sites
-    except SQLAlchemyError as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def _sites_within(
+    db: AsyncSession, latitude: float, longitude: float, radius: float
+) -> List[Tuple[HistoricalSite, float]]:
+    """
+    Sites within ``radius`` km of the point with their distance in metres,
+    closest first.
+    """
+    # Only fetch sites in the geohash cells / bounding box around the point
+    stmt = select(HistoricalSite).where(candidate_filter(latitude, longitude, radius))
+    result = await db.execute(stmt)
+
+    candidates = result.scalars().all()
+    if not candidates:
+        return []
+
+    # Exact distance check on all candidates in one vectorized call
+    distances = haversine_many(
+        latitude,
+        longitude,
+        [site.latitude for site in candidates],
+        [site.longitude for site in candidates],
+    )
+    matches = [
+        (site, float(distance) * 1000)
+        for site, distance in zip(candidates, distances)
+        if distance <= radius
+    ]
+    matches.sort(key=lambda match: (match[1], match[0].id))
+    return matches
 
 
 async def search_nearby_sites(
-    db: AsyncSession, latitude: float, longitude: float, radius: float
-) -> List[HistoricalSite]:
+    db: AsyncSession,
+    latitude: float,
+    longitude: float,
+    radius: Optional[float] = None,
+    limit: Optional[int] = None,
+) -> List[Tuple[HistoricalSite, float]]:
+    """
+    Sites sorted by distance (in metres) from the given point. With ``limit``
+    this is a k-nearest-neighbour search, optionally capped at ``radius`` km;
+    without it every site within ``radius`` is returned.
+    """
+    validate_coordinates(latitude, longitude)
+    if radius is None and limit is None:
+        raise ValueError("Either max_distance or limit is required")
+    if radius is not None and radius < 0:
+        raise ValueError("max_distance must not be negative")
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be at least 1")
     try:
-        # Fetch all sites
-        stmt = select(HistoricalSite)
-        result = await db.execute(stmt)
-        all_sites = result.scalars().all()
-
-        # Filter sites based on distance
-        sites = []
-        for site in all_sites:
-            # Calculate distance between site and given point
-            lon1, lat1, lon2, lat2 = map(
-                radians, [longitude, latitude, site.longitude, site.latitude]
-            )
-            dlon = lon2 - lon1
-            dlat = lat2 - lat1
-            a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-            c = 2 * asin(sqrt(a))
-            distance = 6371 * c  # Radius of earth in kilometers
-
-            # If distance is within radius, add site to list
-            if distance <= radius:
-                sites.append(site)
+        if limit is None:
+            return await _sites_within(db, latitude, longitude, radius)
 
-        return sites
+        # Best-first search: probe a small area around the point and widen it
+        # until it holds k sites. Every site within the probe radius is
+        # fetched, so the k closest of them are the k nearest overall.
+        max_radius = MAX_SEARCH_RADIUS_KM
+        if radius is not None:
+            max_radius = min(radius, MAX_SEARCH_RADIUS_KM)
+        probe_radius = min(KNN_INITIAL_RADIUS_KM, max_radius)
+        while True:
+            matches = await _sites_within(db, latitude, longitude, probe_radius)
+            if len(matches) >= limit or probe_radius >= max_radius:
+                return matches[:limit]
+            probe_radius = min(probe_radius * KNN_GROWTH, max_radius)
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -172,15 +383,201 @@ async def get_sites_by_date_range(
     db: AsyncSession,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-) -> List[HistoricalSite]:
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> Page:
     try:
-        query = select(HistoricalSite)
+        query = select(HistoricalSite).where(
+            HistoricalSite.date_established.is_not(None)
+        )
         if start_date:
             query = query.where(HistoricalSite.date_established >= start_date)
         if end_date:
             query = query.where(HistoricalSite.date_established <= end_date)
+        keys = [HistoricalSite.date_established, HistoricalSite.id]
+        return _read_page(await keyset_page(db, query, keys, limit, cursor))
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Width in years of each timeline bucket
+TIMELINE_BUCKETS = {"year": 1, "decade": 10, "century": 100}
+
+
+async def get_site_timeline(
+    db: AsyncSession,
+    bucket: str = "decade",
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> List[Tuple[int, int]]:
+    """
+    ``(first year, site count)`` per bucket of ``date_established``, oldest
+    first. Counted in SQL from the date index, which also bounds the scan
+    to the requested range.
+    """
+    width = TIMELINE_BUCKETS.get(bucket)
+    if width is None:
+        raise ValueError(f"bucket must be one of {list(TIMELINE_BUCKETS)}")
+    established = HistoricalSite.date_established
+    start_year = (cast(extract("year", established), Integer) // width) * width
+    query = select(start_year, func.count()).where(established.is_not(None))
+    if start_date:
+        query = query.where(established >= start_date)
+    if end_date:
+        query = query.where(established <= end_date)
+    query = query.group_by(start_year).order_by(start_year)
+    try:
         result = await db.execute(query)
-        sites = result.scalars().all()
-        return sites
+        return [(year, count) for year, count in result.all()]
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _with_approved_contributions(stmt):
+    # One extra SELECT ... WHERE historical_site_id IN (...) per batch of
+    # sites rather than a lazy load per site
+    return stmt.options(
+        selectinload(
+            HistoricalSite.contributions.and_(
+                UserContribution.status == ContributionStatus.approved
+            )
+        )
+    )
+
+
+async def _contribution_counts(
+    db: AsyncSession, site_ids: List[int]
+) -> Dict[int, Dict[str, int]]:
+    """
+    ``{site_id: {status: count}}`` in one grouped query.
+    """
+    counts: Dict[int, Dict[str, int]] = {}
+    if not site_ids:
+        return counts
+    result = await db.execute(
+        select(
+            UserContribution.historical_site_id,
+            UserContribution.status,
+            func.count(),
+        )
+        .where(UserContribution.historical_site_id.in_(site_ids))
+        .group_by(UserContribution.historical_site_id, UserContribution.status)
+    )
+    for site_id, status, count in result.all():
+        counts.setdefault(site_id, {})[status.value] = count
+    return counts
+
+
+async def _details(db: AsyncSession, sites: List[HistoricalSite]) -> List[HistoricalSiteDetail]:
+    counts = await _contribution_counts(db, [site.id for site in sites])
+    details = []
+    for site in sites:
+        detail = HistoricalSiteDetail.model_validate(site)
+        detail.contribution_counts = counts.get(site.id, {})
+        details.append(detail)
+    return details
+
+
+async def get_site_detail(db: AsyncSession, site_id: int) -> HistoricalSiteDetail:
+    """
+    A site with its approved contributions and contribution counts, in three
+    queries.
+    """
+    try:
+        stmt = _with_approved_contributions(
+            select(HistoricalSite).where(HistoricalSite.id == site_id)
+        )
+        site = (await db.execute(stmt)).scalars().first()
+        if site is None:
+            raise HTTPException(status_code=404, detail="Historical site not found")
+        return (await _details(db, [site]))[0]
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def get_site_details_in_viewport(
+    db: AsyncSession,
+    min_latitude: float,
+    min_longitude: float,
+    max_latitude: float,
+    max_longitude: float,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> Page:
+    """
+    One page of the sites inside a map viewport, each with its approved
+    contributions and contribution counts. The query count does not depend
+    on the page size.
+    """
+    validate_bounds(min_latitude, min_longitude, max_latitude, max_longitude)
+    try:
+        boxes = viewport_boxes(min_latitude, min_longitude, max_latitude, max_longitude)
+        stmt = _with_approved_contributions(
+            select(HistoricalSite).where(boxes_filter(boxes))
+        )
+        page = await keyset_page(db, stmt, [HistoricalSite.id], limit, cursor)
+        return Page(items=await _details(db, page.items), next_cursor=page.next_cursor)
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Columns the in-bounds endpoint can project; ``id`` is always included
+DEFAULT_PROJECTION = ("id", "name", "latitude", "longitude")
+PROJECTABLE_FIELDS = tuple(HistoricalSite.__table__.columns.keys())
+
+
+def _projection(fields: Optional[List[str]]) -> List[str]:
+    fields = list(dict.fromkeys(["id", *(fields or DEFAULT_PROJECTION)]))
+    unknown = [field for field in fields if field not in PROJECTABLE_FIELDS]
+    if unknown:
+        raise ValueError(
+            f"Unknown fields {unknown}, expected any of {list(PROJECTABLE_FIELDS)}"
+        )
+    return fields
+
+
+async def get_site_columns_in_bounds(
+    db: AsyncSession,
+    min_latitude: float,
+    min_longitude: float,
+    max_latitude: float,
+    max_longitude: float,
+    fields: Optional[List[str]] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    format: str = "json",
+) -> Page:
+    """
+    One page of the sites inside a bounding box, selecting only ``fields``
+    and encoded column by column (see ``dump_columns``).
+    """
+    validate_bounds(min_latitude, min_longitude, max_latitude, max_longitude)
+    fields = _projection(fields)
+    key = site_cache.collection_key(
+        "in-bounds",
+        min_latitude,
+        min_longitude,
+        max_latitude,
+        max_longitude,
+        tuple(fields),
+        limit,
+        cursor,
+        format,
+    )
+    cached = site_cache.get(key)
+    if cached is not None:
+        return cached
+    try:
+        boxes = viewport_boxes(min_latitude, min_longitude, max_latitude, max_longitude)
+        columns = [HistoricalSite.__table__.c[field] for field in fields]
+        stmt = select(*columns).where(boxes_filter(boxes))
+        page = await keyset_page(db, stmt, [HistoricalSite.id], limit, cursor)
+        rows = page.items if len(fields) > 1 else [(value,) for value in page.items]
+        page = Page(
+            items=dump_columns(fields, rows, format),
+            next_cursor=page.next_cursor,
+        )
+        site_cache.set(key, page)
+        return page
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from data.database import AsyncSessionLocal
+from models.contributions import UserContribution
+from models.historical_site import HistoricalSite
+from services.cache import site_cache
+from services.catalog_version import bump_catalog_version
+from services.image_variants import render_variants
+from services.job_queue import job_queue
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+STATIC_URL = "/static"
+DERIVED_DIR = STATIC_DIR / "derived"
+DERIVED_URL = f"{STATIC_URL}/derived"
+
+IMAGE_VARIANT_WIDTHS = tuple(
+    int(width) for width in os.getenv("IMAGE_VARIANT_WIDTHS", "160,480,960,1600").split(",")
+)
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+BACKFILL_BATCH_SIZE = 100
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _executor
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def resolve_source(image: str) -> Optional[Path]:
+    """
+    The file behind an image URL served from ``/static`` (absolute or
+    relative URL), or ``None`` for anything else.
+    """
+    path = urlparse(image).path
+    if not path.startswith(STATIC_URL + "/") or path.startswith(DERIVED_URL + "/"):
+        return None
+    source = (STATIC_DIR / path[len(STATIC_URL) + 1 :]).resolve()
+    if STATIC_DIR.resolve() not in source.parents or not source.is_file():
+        return None
+    return source
+
+
+async def build_variants(images: List[str]) -> Dict[str, List[dict]]:
+    """
+    Derivatives of every local image, keyed by the image URL as stored.
+    Images are rendered in parallel in the worker processes.
+    """
+    loop = asyncio.get_running_loop()
+    jobs = {}
+    for image in dict.fromkeys(images or []):
+        source = resolve_source(image)
+        if source is None:
+            continue
+        jobs[image] = loop.run_in_executor(
+            _pool(),
+            render_variants,
+            str(source),
+            str(DERIVED_DIR),
+            DERIVED_URL,
+            IMAGE_VARIANT_WIDTHS,
+        )
+    variants = {}
+    for image, job in jobs.items():
+        try:
+            variants[image] = await job
+        except Exception as e:
+            logger.warning(f"Could not render variants of {image}: {e}")
+    return variants
+
+
+async def _render_all(rows: list) -> list:
+    """
+    ``build_variants`` for the images of every ``(id, images, current)``
+    row at once; returns the ``(id, variants)`` that changed.
+    """
+    rendered = await asyncio.gather(*(build_variants(images) for _, images, _ in rows))
+    return [
+        (row_id, variants)
+        for (row_id, _, current), variants in zip(rows, rendered)
+        if variants != (current or {})
+    ]
+
+
+async def process_site_images(site_ids: List[int]) -> int:
+    """
+    Render and store the variants of the sites' images. A site whose
+    variants change gets a new version, like any other write. Returns the
+    number of sites updated.
+
+    Rendering happens outside any transaction, and the results are written
+    in one short one afterwards, so other writers never wait on the
+    process pool. A site edited meanwhile is skipped; its edit queued a
+    render of its own.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(
+                HistoricalSite.id,
+                HistoricalSite.images,
+                HistoricalSite.image_variants,
+                HistoricalSite.version,
+            ).where(HistoricalSite.id.in_(site_ids))
+        )
+        rows = result.all()
+    versions = {site_id: version for site_id, _, _, version in rows}
+    changed = await _render_all([row[:3] for row in rows])
+    if not changed:
+        return 0
+
+    updated = []
+    async with AsyncSessionLocal() as db:
+        for site_id, variants in changed:
+            result = await db.execute(
+                update(HistoricalSite)
+                .where(HistoricalSite.id == site_id, HistoricalSite.version == versions[site_id])
+                .values(image_variants=variants, version=HistoricalSite.version + 1)
+            )
+            if result.rowcount:
+                updated.append(site_id)
+        if updated:
+            await bump_catalog_version(db)
+        await db.commit()
+    for site_id in updated:
+        site_cache.invalidate_site(site_id)
+    return len(updated)
+
+
+async def process_contribution_images(contribution_ids: List[int]) -> int:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(
+                UserContribution.id, UserContribution.images, UserContribution.image_variants
+            ).where(UserContribution.id.in_(contribution_ids))
+        )
+        rows = result.all()
+    changed = await _render_all(rows)
+    if not changed:
+        return 0
+    async with AsyncSessionLocal() as db:
+        for contribution_id, variants in changed:
+            await db.execute(
+                update(UserContribution)
+                .where(UserContribution.id == contribution_id)
+                .values(image_variants=variants)
+            )
+        await db.commit()
+    return len(changed)
+
+
+@job_queue.handler("site.image_variants")
+async def _site_images_job(payload: dict) -> dict:
+    return {"updated": await process_site_images(payload["site_ids"])}
+
+
+@job_queue.handler("contribution.image_variants")
+async def _contribution_images_job(payload: dict) -> dict:
+    return {"updated": await process_contribution_images(payload["contribution_ids"])}
+
+
+async def schedule_site_images(db: AsyncSession, site_ids: List[int]) -> None:
+    """
+    Queue rendering of the sites' variants in ``db``'s transaction; it runs
+    once that commits, after the response.
+    """
+    if site_ids:
+        await job_queue.add(db, "site.image_variants", {"site_ids": list(site_ids)})
+
+
+async def schedule_contribution_images(
+    db: AsyncSession, contribution_ids: List[int]
+) -> None:
+    if contribution_ids:
+        await job_queue.add(
+            db, "contribution.image_variants", {"contribution_ids": list(contribution_ids)}
+        )
+
+
+async def backfill_image_variants() -> int:
+    """
+    Render variants for every site and contribution with images but no
+    variants yet. Returns the number of rows updated.
+    """
+    updated = 0
+    for model, process in (
+        (HistoricalSite, process_site_images),
+        (UserContribution, process_contribution_images),
+    ):
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(model.id).where(model.image_variants.is_(None)).order_by(model.id)
+            )
+            ids = result.scalars().all()
+        for start in range(0, len(ids), BACKFILL_BATCH_SIZE):
+            updated += await process(ids[start : start + BACKFILL_BATCH_SIZE])
+    return updated
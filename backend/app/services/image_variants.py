@@ -0,0 +1,84 @@
+"""
+Pillow work for the image pipeline. Kept free of database imports: these
+functions run in worker processes (see services/image_pipeline.py).
+"""
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+from PIL import Image, ImageOps
+
+try:
+    import pillow_avif  # noqa: F401  registers the AVIF plugin
+except ImportError:  # optional, AVIF variants are skipped without it
+    pass
+
+WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+AVIF_QUALITY = int(os.getenv("IMAGE_AVIF_QUALITY", "60"))
+
+
+def output_formats() -> List[str]:
+    formats = ["webp"]
+    if "AVIF" in Image.SAVE:
+        formats.append("avif")
+    return formats
+
+
+def content_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()[:20]
+
+
+def _save(image: Image.Image, path: Path, format: str) -> None:
+    # Write beside the target and rename, so readers never see half a file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + ".part")
+    if format == "avif":
+        image.save(partial, "AVIF", quality=AVIF_QUALITY)
+    else:
+        image.save(partial, "WEBP", quality=WEBP_QUALITY, method=4)
+    os.replace(partial, path)
+
+
+def render_variants(
+    source: str, output_dir: str, url_prefix: str, widths: Sequence[int]
+) -> List[Dict]:
+    """
+    Resize ``source`` to each of ``widths`` (never upscaling; an image
+    narrower than all of them gets one variant at its own width) in every
+    available format. Files are named after the source's content hash, so
+    identical sources share derivatives and existing files are reused.
+    Returns ``{"width", "height", "format", "url"}`` dicts, smallest first.
+    """
+    source_path = Path(source)
+    digest = content_hash(source_path)
+    directory = Path(output_dir) / digest[:2]
+    variants = []
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        targets = sorted({min(width, image.width) for width in widths})
+        for width in targets:
+            height = max(1, round(image.height * width / image.width))
+            resized = None
+            for format in output_formats():
+                name = f"{digest}-{width}w.{format}"
+                path = directory / name
+                if not path.exists():
+                    if resized is None:
+                        resized = image.resize((width, height), Image.LANCZOS)
+                    _save(resized, path, format)
+                variants.append(
+                    {
+                        "width": width,
+                        "height": height,
+                        "format": format,
+                        "url": f"{url_prefix}/{digest[:2]}/{name}",
+                    }
+                )
+    return variants
@@ -0,0 +1,383 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import event, func, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+
+from data.database import AsyncSessionLocal
+from models.job import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "1000"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "2"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "600"))
+JOB_TIMEOUT_SECONDS = float(os.getenv("JOB_TIMEOUT_SECONDS", "300"))
+# A job still running this long after it was claimed lost its worker
+JOB_LEASE_SECONDS = JOB_TIMEOUT_SECONDS + 60
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "5"))
+
+# Session.info key of the jobs a transaction added, offered once it commits
+PENDING_KEY = "job_queue.pending"
+
+Handler = Callable[[dict], Awaitable[Optional[dict]]]
+
+
+@dataclass
+class JobStats:
+    enqueued: int = 0
+    # Enqueued while the queue was full; left in the table for the poller
+    overflowed: int = 0
+    succeeded: int = 0
+    retried: int = 0
+    failed: int = 0
+    # From when a job was due to when a worker started it
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+    run_seconds_total: float = 0.0
+    run_seconds_max: float = 0.0
+
+    def observe(self, wait: float, run: float) -> None:
+        self.wait_seconds_total += wait
+        self.wait_seconds_max = max(self.wait_seconds_max, wait)
+        self.run_seconds_total += run
+        self.run_seconds_max = max(self.run_seconds_max, run)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def retry_delay(attempts: int) -> float:
+    """
+    Exponential backoff with jitter: about 2s, 4s, 8s... capped at
+    JOB_RETRY_MAX_SECONDS, each randomly shortened by up to half so that
+    jobs failing together do not retry together.
+    """
+    delay = min(JOB_RETRY_MAX_SECONDS, JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class JobQueue:
+    """
+    In-process background work backed by the ``job`` table.
+
+    ``add`` writes the job in the caller's transaction, so it exists
+    exactly when the write it follows up does, and offers its id to a
+    bounded asyncio queue drained by worker tasks once that commits; a
+    request only pays for one insert. Nothing is lost when the queue is full or the process dies: a
+    poller re-offers due pending jobs and jobs whose lease expired. A
+    worker claims a job with a conditional UPDATE, so several processes
+    can share the table without running a job twice.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, maxsize: int = JOB_QUEUE_SIZE):
+        self.workers = workers
+        self.maxsize = maxsize
+        self.stats = JobStats()
+        self._handlers: Dict[str, Handler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._queued: Set[int] = set()
+        self._active: Set[int] = set()
+        self._tasks: List[asyncio.Task] = []
+        # Set by stop(): asyncio.wait_for in 3.11 drops a cancellation that
+        # arrives as the job finishes, so workers also check this
+        self._stopping = False
+
+    def handler(self, kind: str) -> Callable[[Handler], Handler]:
+        """
+        Register the coroutine run for jobs of ``kind``; it receives the
+        job's payload and may return a JSON-able result to store.
+        """
+
+        def register(func: Handler) -> Handler:
+            self._handlers[kind] = func
+            return func
+
+        return register
+
+    async def add(
+        self,
+        db: AsyncSession,
+        kind: str,
+        payload: dict,
+        delay: float = 0.0,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+    ) -> int:
+        """
+        Add a job to ``db``'s transaction; the workers get it once that
+        commits, and never if it rolls back.
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind {kind!r}")
+        job = Job(
+            kind=kind,
+            payload=payload,
+            status=JobStatus.pending,
+            max_attempts=max_attempts,
+            run_at=datetime.utcnow() + timedelta(seconds=delay),
+        )
+        db.add(job)
+        await db.flush()
+        db.sync_session.info.setdefault(PENDING_KEY, []).append((self, job.id, delay))
+        return job.id
+
+    async def enqueue(
+        self,
+        kind: str,
+        payload: dict,
+        delay: float = 0.0,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+    ) -> int:
+        """
+        Add a job in a transaction of its own.
+        """
+        async with AsyncSessionLocal() as db:
+            job_id = await self.add(db, kind, payload, delay, max_attempts)
+            await db.commit()
+        return job_id
+
+    def _committed(self, job_id: int, delay: float) -> None:
+        self.stats.enqueued += 1
+        if delay > 0:
+            self._offer_later(job_id, delay)
+        else:
+            self._offer(job_id)
+
+    def _offer(self, job_id: int) -> bool:
+        if self._queue is None or job_id in self._queued:
+            return False
+        try:
+            self._queue.put_nowait(job_id)
+        except asyncio.QueueFull:
+            self.stats.overflowed += 1
+            return False
+        self._queued.add(job_id)
+        return True
+
+    def _offer_later(self, job_id: int, delay: float) -> None:
+        if self._queue is not None:
+            asyncio.get_running_loop().call_later(delay, self._offer, job_id)
+
+    async def _claim(self, job_id: int) -> Optional[dict]:
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JobStatus.pending, Job.run_at <= now)
+                .values(
+                    status=JobStatus.running,
+                    attempts=Job.attempts + 1,
+                    locked_until=now + timedelta(seconds=JOB_LEASE_SECONDS),
+                )
+            )
+            if result.rowcount != 1:
+                # Done, claimed elsewhere or not due yet
+                await db.rollback()
+                return None
+            job = (await db.execute(select(Job).where(Job.id == job_id))).scalar_one()
+            claimed = {
+                "kind": job.kind,
+                "payload": job.payload,
+                "attempts": job.attempts,
+                "max_attempts": job.max_attempts,
+                "run_at": job.run_at,
+            }
+            await db.commit()
+        return claimed
+
+    async def _finish(self, job_id: int, **values) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JobStatus.running)
+                .values(locked_until=None, **values)
+            )
+            await db.commit()
+
+    async def _run(self, job_id: int) -> None:
+        job = await self._claim(job_id)
+        if job is None:
+            return
+        self._active.add(job_id)
+        started = time.perf_counter()
+        wait = max(0.0, (datetime.utcnow() - job["run_at"]).total_seconds())
+        try:
+            handler = self._handlers.get(job["kind"])
+            if handler is None:
+                raise LookupError(f"No handler for job kind {job['kind']!r}")
+            result = await asyncio.wait_for(handler(job["payload"]), JOB_TIMEOUT_SECONDS)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:2000]
+            if job["attempts"] >= job["max_attempts"]:
+                logger.error(f"Job {job_id} ({job['kind']}) failed for good: {error}")
+                self.stats.failed += 1
+                await self._finish(
+                    job_id,
+                    status=JobStatus.failed,
+                    finished_at=datetime.utcnow(),
+                    last_error=error,
+                )
+            else:
+                delay = retry_delay(job["attempts"])
+                logger.warning(f"Job {job_id} ({job['kind']}) failed, retrying in {delay:.1f}s: {error}")
+                self.stats.retried += 1
+                await self._finish(
+                    job_id,
+                    status=JobStatus.pending,
+                    run_at=datetime.utcnow() + timedelta(seconds=delay),
+                    last_error=error,
+                )
+                self._offer_later(job_id, delay)
+        else:
+            self.stats.succeeded += 1
+            await self._finish(
+                job_id,
+                status=JobStatus.succeeded,
+                finished_at=datetime.utcnow(),
+                result=result,
+            )
+        finally:
+            self._active.discard(job_id)
+            self.stats.observe(wait, time.perf_counter() - started)
+
+    async def _work(self) -> None:
+        while not self._stopping:
+            job_id = await self._queue.get()
+            self._queued.discard(job_id)
+            try:
+                await self._run(job_id)
+            except Exception:
+                logger.exception(f"Job {job_id} could not be run")
+            finally:
+                self._queue.task_done()
+
+    async def recover(self) -> int:
+        """
+        Return jobs whose lease expired to the queue (or fail them when out
+        of attempts) and offer due pending jobs up to the free queue space.
+        Returns the number of jobs offered.
+        """
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            expired = (Job.status == JobStatus.running, Job.locked_until < now)
+            await db.execute(
+                update(Job)
+                .where(*expired, Job.attempts >= Job.max_attempts)
+                .values(
+                    status=JobStatus.failed,
+                    locked_until=None,
+                    finished_at=now,
+                    last_error="Lease expired",
+                )
+            )
+            await db.execute(
+                update(Job).where(*expired).values(status=JobStatus.pending, locked_until=None)
+            )
+            await db.commit()
+            if self._queue is None:
+                return 0
+            free = self.maxsize - self._queue.qsize()
+            if free <= 0:
+                return 0
+            result = await db.execute(
+                select(Job.id)
+                .where(Job.status == JobStatus.pending, Job.run_at <= now)
+                .order_by(Job.run_at)
+                .limit(free)
+            )
+            ids = result.scalars().all()
+        return sum(self._offer(job_id) for job_id in ids)
+
+    async def _poll(self) -> None:
+        while not self._stopping:
+            try:
+                await self.recover()
+            except Exception:
+                logger.exception("Job recovery failed")
+            await asyncio.sleep(JOB_POLL_SECONDS)
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._stopping = False
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(loop.create_task(self._poll()))
+
+    async def stop(self) -> None:
+        """
+        Cancel the workers and hand the jobs they were running back to the
+        table, to be retried by the next process.
+        """
+        self._stopping = True
+        active = set(self._active)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._queued.clear()
+        if not active:
+            return
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(Job)
+                    .where(Job.id.in_(active), Job.status == JobStatus.running)
+                    .values(status=JobStatus.pending, locked_until=None)
+                )
+                await db.commit()
+        except SQLAlchemyError as e:
+            # A cancelled worker may still hold the database; the jobs are
+            # retried anyway once their lease expires
+            logger.warning(f"Could not hand back {len(active)} running jobs: {e}")
+
+    async def drain(self) -> None:
+        """
+        Wait until every queued job has been run.
+        """
+        if self._queue is not None:
+            await self._queue.join()
+
+    def status(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.maxsize,
+            "in_flight": len(self._active),
+            "workers": self.workers,
+            **self.stats.as_dict(),
+        }
+
+
+@event.listens_for(Session, "after_commit")
+def _offer_pending(session: Session) -> None:
+    for queue, job_id, delay in session.info.pop(PENDING_KEY, []):
+        queue._committed(job_id, delay)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(PENDING_KEY, None)
+
+
+async def job_counts(db: AsyncSession) -> Dict[str, int]:
+    result = await db.execute(select(Job.status, func.count()).group_by(Job.status))
+    counts = {status.value: 0 for status in JobStatus}
+    counts.update({status.value: count for status, count in result.all()})
+    return counts
+
+
+# Process-wide queue, started with the app.
+job_queue = JobQueue()
@@ -0,0 +1,82 @@
+import hashlib
+import mimetypes
+import os
+from email.utils import formatdate
+from pathlib import Path
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+
+MEDIA_DIR = Path(__file__).resolve().parent.parent / "static"
+MEDIA_TYPE_PREFIXES = ("audio/", "video/")
+
+# Media files are never edited in place: a new recording gets a new name,
+# so clients and CDNs may keep what they have for a year.
+MEDIA_CACHE_CONTROL = os.getenv(
+    "MEDIA_CACHE_CONTROL", "public, max-age=31536000, immutable"
+)
+
+mimetypes.add_type("audio/mp4", ".m4a")
+mimetypes.add_type("audio/ogg", ".opus")
+mimetypes.add_type("audio/webm", ".weba")
+
+
+class MediaFile:
+    def __init__(self, path: Path, stat_result: os.stat_result, media_type: str):
+        self.path = path
+        self.size = stat_result.st_size
+        self.media_type = media_type
+        self.last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+        digest = hashlib.sha1(
+            f"{path}:{stat_result.st_mtime_ns}:{stat_result.st_size}".encode()
+        ).hexdigest()
+        self.etag = f'"media-{digest[:20]}"'
+
+
+def resolve_media(relative_path: str) -> MediaFile:
+    """
+    The audio or video file at ``relative_path`` under the media directory;
+    404 for anything else, including paths escaping the directory.
+    """
+    root = MEDIA_DIR.resolve()
+    path = (root / relative_path).resolve()
+    media_type, _ = mimetypes.guess_type(path.name)
+    if root not in path.parents or not (media_type or "").startswith(MEDIA_TYPE_PREFIXES):
+        raise HTTPException(status_code=404, detail="Media not found")
+    try:
+        stat_result = path.stat()
+    except OSError:
+        raise HTTPException(status_code=404, detail="Media not found")
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Media not found")
+    return MediaFile(path, stat_result, media_type)
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    The inclusive ``(first, last)`` byte positions asked for by a Range
+    header, or ``None`` to send the whole file. Only single ranges are
+    honoured; multiple ranges are answered with the whole file, which RFC
+    9110 allows. Raises ValueError for a range that lies past the end.
+    """
+    if not header:
+        return None
+    unit, _, ranges = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    first, dash, last = ranges.strip().partition("-")
+    if not dash or not (first or last).isdigit() or not (last or "0").isdigit():
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("Range not satisfiable")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size:
+        raise ValueError("Range not satisfiable")
+    if end < start:
+        return None
+    return start, min(end, size - 1)
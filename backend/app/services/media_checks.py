@@ -0,0 +1,167 @@
+import asyncio
+import ipaddress
+import logging
+import os
+import socket
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from data.database import AsyncSessionLocal
+from models.contributions import UserContribution
+from services.job_queue import job_queue
+from services.media import resolve_media
+from services.static_assets import STATIC_URL, static_assets
+
+logger = logging.getLogger(__name__)
+
+# URLs on these hosts (or without a host) are checked against our own files
+LOCAL_MEDIA_HOSTS = set(os.getenv("LOCAL_MEDIA_HOSTS", "localhost,127.0.0.1").split(","))
+MEDIA_CHECK_TIMEOUT = float(os.getenv("MEDIA_CHECK_TIMEOUT", "10"))
+# Remote hosts that may be checked, e.g. "cdn.example.com,example.org";
+# empty for any host with only public addresses
+MEDIA_CHECK_ALLOWED_HOSTS = {
+    host.strip().lower()
+    for host in os.getenv("MEDIA_CHECK_ALLOWED_HOSTS", "").split(",")
+    if host.strip()
+}
+MEDIA_CHECK_MAX_REDIRECTS = int(os.getenv("MEDIA_CHECK_MAX_REDIRECTS", "5"))
+MEDIA_URL = "/media"
+
+
+def local_path(url: str) -> Optional[str]:
+    parsed = urlparse(url)
+    if parsed.hostname and parsed.hostname not in LOCAL_MEDIA_HOSTS:
+        return None
+    return parsed.path
+
+
+async def local_media_exists(path: str) -> bool:
+    if path.startswith(STATIC_URL + "/"):
+        return await static_assets.lookup(path[len(STATIC_URL) + 1 :]) is not None
+    if path.startswith(MEDIA_URL + "/"):
+        try:
+            resolve_media(path[len(MEDIA_URL) + 1 :])
+        except HTTPException:
+            return False
+        return True
+    return False
+
+
+class BlockedURL(Exception):
+    """
+    A user-supplied URL the checker will not fetch: it points at a private
+    network, or at a host or scheme that is not allowed.
+    """
+
+
+async def public_address(host: str, port: int) -> str:
+    """
+    An address of ``host`` to connect to, provided every address it
+    resolves to is public; loopback, private, link-local (cloud metadata
+    services) and reserved ranges are refused.
+    """
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            host, port, type=socket.SOCK_STREAM
+        )
+    except socket.gaierror as e:
+        raise httpx.ConnectError(f"Cannot resolve {host}: {e}")
+    addresses = sorted({info[4][0] for info in infos})
+    for address in addresses:
+        if not ipaddress.ip_address(address.split("%")[0]).is_global:
+            raise BlockedURL(f"{host} resolves to non-public address {address}")
+    return addresses[0]
+
+
+async def fetch(
+    client: httpx.AsyncClient, method: str, url: str, headers: Optional[dict] = None
+) -> httpx.Response:
+    """
+    Request ``url`` and follow redirects by hand, vetting every hop. The
+    connection goes to the address that was vetted, so the host cannot
+    resolve somewhere else between the check and the request.
+    """
+    target = httpx.URL(url)
+    for _ in range(MEDIA_CHECK_MAX_REDIRECTS + 1):
+        if target.scheme not in ("http", "https") or not target.host:
+            raise BlockedURL(f"Unsupported URL {target}")
+        if MEDIA_CHECK_ALLOWED_HOSTS and target.host.lower() not in MEDIA_CHECK_ALLOWED_HOSTS:
+            raise BlockedURL(f"Host {target.host} is not allowed")
+        port = target.port or (443 if target.scheme == "https" else 80)
+        address = await public_address(target.host, port)
+        response = await client.request(
+            method,
+            target.copy_with(host=address),
+            headers={**(headers or {}), "Host": target.netloc.decode("ascii")},
+            extensions={"sni_hostname": target.host},
+        )
+        if not response.is_redirect:
+            return response
+        target = target.join(response.headers["location"])
+    raise BlockedURL(f"More than {MEDIA_CHECK_MAX_REDIRECTS} redirects from {url}")
+
+
+async def url_resolves(client: httpx.AsyncClient, url: str) -> bool:
+    """
+    Whether ``url`` serves something. Server errors and timeouts raise, so
+    the job is retried later instead of flagging the URL.
+    """
+    path = local_path(url)
+    if path is not None:
+        return await local_media_exists(path)
+    response = await fetch(client, "HEAD", url)
+    if response.status_code in (405, 501):
+        # No HEAD support; ask for a single byte instead
+        response = await fetch(client, "GET", url, {"Range": "bytes=0-0"})
+    if response.status_code == 429 or response.status_code >= 500:
+        response.raise_for_status()
+    return response.status_code < 400
+
+
+async def check_urls(urls: List[str]) -> Dict[str, List[str]]:
+    """
+    The entries of ``urls`` that answer with an error (``broken``), whose
+    host cannot be reached at all (``unreachable``) or that may not be
+    fetched (``blocked``, see ``fetch``).
+    """
+    report = {"broken": [], "unreachable": [], "blocked": []}
+    async with httpx.AsyncClient(timeout=MEDIA_CHECK_TIMEOUT) as client:
+        for url in dict.fromkeys(urls):
+            try:
+                if not await url_resolves(client, url):
+                    report["broken"].append(url)
+            except httpx.ConnectError:
+                report["unreachable"].append(url)
+            except BlockedURL as e:
+                logger.warning(f"Not checking {url}: {e}")
+                report["blocked"].append(url)
+    return report
+
+
+@job_queue.handler("contribution.check_media")
+async def _check_contribution_media(payload: dict) -> dict:
+    async with AsyncSessionLocal() as db:
+        contribution = await db.get(UserContribution, payload["contribution_id"])
+        if contribution is None:
+            return {"checked": 0, "broken": [], "unreachable": [], "blocked": []}
+        urls = list(contribution.images or [])
+        if contribution.audio:
+            urls.append(contribution.audio)
+    report = await check_urls(urls)
+    if any(report.values()):
+        logger.warning(
+            f"Contribution {payload['contribution_id']} links to missing media: {report}"
+        )
+    return {"checked": len(urls), **report}
+
+
+async def schedule_media_check(db: AsyncSession, contribution_id: int) -> None:
+    """
+    Queue a check that the contribution's image and audio URLs resolve, in
+    ``db``'s transaction; the outcome is stored as the job's result.
+    """
+    await job_queue.add(db, "contribution.check_media", {"contribution_id": contribution_id})
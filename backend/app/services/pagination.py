@@ -0,0 +1,104 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Sequence, Union
+
+from fastapi import HTTPException
+from sqlalchemy import DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import and_, or_
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Response header carrying the token for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class Page(NamedTuple):
+    # Rows, or their encoded JSON array once serialized for caching
+    items: Union[list, bytes]
+    next_cursor: Optional[str]
+
+
+def _cursor_default(value):
+    # JSON has no timestamps; cursors carry them as ISO 8601 strings
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def encode_cursor(values: Sequence) -> str:
+    payload = json.dumps(list(values), separators=(",", ":"), default=_cursor_default)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def _typed(keys: Sequence, values: Sequence) -> List:
+    """
+    Cursor values converted back to what the key columns compare against.
+    """
+    typed = []
+    for key, value in zip(keys, values):
+        if isinstance(value, str) and isinstance(key.type, DateTime):
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        typed.append(value)
+    return typed
+
+
+def _after(keys: Sequence, values: Sequence):
+    """
+    ``(keys) > (values)`` in lexicographic order, spelled so that the leading
+    key is a plain range predicate the planner can use on an index.
+    """
+    first, value = keys[0], values[0]
+    if len(keys) == 1:
+        return first > value
+    return and_(
+        first >= value,
+        or_(first > value, and_(first == value, _after(keys[1:], values[1:]))),
+    )
+
+
+async def keyset_page(
+    db: AsyncSession,
+    stmt,
+    keys: Sequence,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> Page:
+    """
+    One page of ``stmt`` ordered by ``keys``, which must end with a unique
+    column. The next page starts strictly after the last row's key values,
+    carried in ``next_cursor``, so every page costs an index seek no matter
+    how deep it is.
+
+    Items are the selected values when ``stmt`` selects one entity or
+    column, and tuples of them otherwise.
+    """
+    width = len(stmt.column_descriptions)
+    if cursor:
+        stmt = stmt.where(_after(keys, _typed(keys, decode_cursor(cursor, len(keys)))))
+    stmt = stmt.add_columns(*keys).order_by(None).order_by(*keys).limit(limit + 1)
+    rows = (await db.execute(stmt)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][width:])
+    if width == 1:
+        return Page(items=[row[0] for row in rows], next_cursor=next_cursor)
+    return Page(items=[tuple(row[:width]) for row in rows], next_cursor=next_cursor)
@@ -0,0 +1,346 @@
+import asyncio
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, func, literal_column, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import column, table
+
+from models.historical_site import HistoricalSite
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "historicalsite_fts"
+
+# Matches of the in-process index are read from the database this many ids
+# at a time.
+MEMORY_BATCH_SIZE = 1000
+
+# Session.info key of the in-process index changes waiting for a commit
+PENDING_KEY = "search_index.pending"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall(value.lower()) if value else []
+
+
+class SqliteSearchBackend:
+    """
+    External-content FTS5 table over ``historicalsite(name, description)``,
+    ranked with bm25 (name matches weigh more than description matches).
+    """
+
+    name = "sqlite-fts5"
+
+    _fts = table(FTS_TABLE, column("rowid"))
+
+    async def setup(self, conn: AsyncConnection) -> None:
+        # Normally created by the initial migration
+        exists = await conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE},
+        )
+        if exists.scalar():
+            return
+        await conn.execute(
+            text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                "name, description, content='historicalsite', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+        )
+        # Index whatever the content table already holds
+        await conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')"))
+
+    async def load(self, db: AsyncSession) -> None:
+        pass
+
+    async def add(self, db: AsyncSession, rows: List[Tuple[int, str, str]]):
+        await db.execute(
+            text(
+                f"INSERT INTO {FTS_TABLE}(rowid, name, description) "
+                "VALUES (:id, :name, :description)"
+            ),
+            [{"id": i, "name": n, "description": d} for i, n, d in rows],
+        )
+
+    async def remove(self, db: AsyncSession, rows: List[Tuple[int, str, str]]):
+        await db.execute(
+            text(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) "
+                "VALUES ('delete', :id, :name, :description)"
+            ),
+            [{"id": i, "name": n, "description": d} for i, n, d in rows],
+        )
+
+    def apply(self, stmt, tokens: List[str]):
+        match = " ".join(f'"{token}"*' for token in tokens)
+        fts = literal_column(FTS_TABLE)
+        stmt = stmt.join(self._fts, self._fts.c.rowid == HistoricalSite.id).where(
+            fts.op("MATCH")(match)
+        )
+        return stmt, func.bm25(fts, 10.0, 1.0)
+
+
+class PostgresSearchBackend:
+    """
+    ``tsvector`` expression with a GIN index, ranked with ``ts_rank``. The
+    index is maintained by Postgres, so writes need no extra statements.
+    """
+
+    name = "postgres-tsvector"
+
+    _document = (
+        "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+    )
+
+    async def setup(self, conn: AsyncConnection) -> None:
+        await conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_historicalsite_search "
+                f"ON historicalsite USING GIN (({self._document}))"
+            )
+        )
+
+    async def load(self, db: AsyncSession) -> None:
+        pass
+
+    async def add(self, db: AsyncSession, rows: List[Tuple[int, str, str]]):
+        pass
+
+    async def remove(self, db: AsyncSession, rows: List[Tuple[int, str, str]]):
+        pass
+
+    def apply(self, stmt, tokens: List[str]):
+        document = literal_column(f"({self._document})")
+        query = func.plainto_tsquery("english", " ".join(tokens))
+        return stmt.where(document.op("@@")(query)), -func.ts_rank(document, query)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session) -> None:
+    for change in session.info.pop(PENDING_KEY, []):
+        change()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(PENDING_KEY, None)
+
+
+class MemorySearchBackend:
+    """
+    In-process inverted index (token -> {site_id: term frequency}) scored
+    with BM25. Used when the database has no full-text support; matches
+    whole words only.
+
+    Writes are held on the session and applied once its transaction
+    commits, so a rolled back write never reaches the index. ``load``
+    builds a new index in a worker thread and swaps it in; writes applied
+    meanwhile are journaled and replayed onto it.
+    """
+
+    name = "memory"
+
+    K1 = 1.2
+    B = 0.75
+    NAME_WEIGHT = 3
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._lengths: Dict[int, int] = {}
+        self._total_length = 0
+        self._lock = asyncio.Lock()
+        # Writes applied while a load runs, replayed onto its result
+        self._journal: Optional[List[Callable[[], None]]] = None
+
+    async def setup(self, conn: AsyncConnection) -> None:
+        pass
+
+    @classmethod
+    def _build(cls, rows: List[Tuple[int, str, str]]) -> "MemorySearchBackend":
+        built = cls()
+        for site_id, name, description in rows:
+            built._index(site_id, name or "", description or "")
+        return built
+
+    async def load(self, db: AsyncSession) -> None:
+        async with self._lock:
+            self._journal = []
+            try:
+                result = await db.execute(
+                    select(HistoricalSite.id, HistoricalSite.name, HistoricalSite.description)
+                )
+                built = await asyncio.to_thread(self._build, result.all())
+                self._postings, self._lengths, self._total_length = (
+                    built._postings,
+                    built._lengths,
+                    built._total_length,
+                )
+                journal, self._journal = self._journal, None
+                for change in journal:
+                    change()
+            finally:
+                self._journal = None
+
+    def _terms(self, name: str, description: str) -> Counter:
+        terms = Counter(tokenize(description))
+        for token in tokenize(name):
+            terms[token] += self.NAME_WEIGHT
+        return terms
+
+    def _index(self, site_id: int, name: str, description: str) -> None:
+        terms = self._terms(name, description)
+        for token, frequency in terms.items():
+            self._postings[token][site_id] = frequency
+        length = sum(terms.values())
+        # Replayed writes may index a site twice
+        self._total_length += length - self._lengths.get(site_id, 0)
+        self._lengths[site_id] = length
+
+    def _apply(self, change: Callable[[], None]) -> None:
+        if self._journal is not None:
+            self._journal.append(change)
+        change()
+
+    def _after_commit(self, db: AsyncSession, change: Callable[[], None]) -> None:
+        db.sync_session.info.setdefault(PENDING_KEY, []).append(partial(self._apply, change))
+
+    async def add(self, db: AsyncSession, rows: List[Tuple[int, str, str]]):
+        self._after_commit(db, partial(self._add, rows))
+
+    async def remove(self, db: AsyncSession, rows: List[Tuple[int, str, str]]):
+        self._after_commit(db, partial(self._remove, rows))
+
+    def _add(self, rows: List[Tuple[int, str, str]]) -> None:
+        for site_id, name, description in rows:
+            self._index(site_id, name, description)
+
+    def _remove(self, rows: List[Tuple[int, str, str]]) -> None:
+        for site_id, name, description in rows:
+            for token in self._terms(name, description):
+                postings = self._postings.get(token)
+                if postings is not None:
+                    postings.pop(site_id, None)
+                    if not postings:
+                        del self._postings[token]
+            self._total_length -= self._lengths.pop(site_id, 0)
+
+    def rank(self, tokens: List[str]) -> List[Tuple[int, float]]:
+        """
+        ``(site_id, score)`` of the sites containing every token, best first.
+        """
+        postings = [self._postings.get(token, {}) for token in tokens]
+        if not postings or not all(postings):
+            return []
+        postings.sort(key=len)
+        matches = set(postings[0]).intersection(*postings[1:])
+        documents = len(self._lengths)
+        average_length = self._total_length / documents
+        scores = []
+        for site_id in matches:
+            norm = self.K1 * (1 - self.B + self.B * self._lengths[site_id] / average_length)
+            score = 0.0
+            for token_postings in postings:
+                frequency = token_postings[site_id]
+                idf = math.log(1 + (documents - len(token_postings) + 0.5) / (len(token_postings) + 0.5))
+                score += idf * frequency * (self.K1 + 1) / (frequency + norm)
+            scores.append((site_id, score))
+        scores.sort(key=lambda item: (-item[1], item[0]))
+        return scores
+
+
+class SearchIndex:
+    """
+    Full-text index over site names and descriptions. The backend is chosen
+    from the database dialect at startup: FTS5 on SQLite, tsvector on
+    Postgres, and an in-process inverted index otherwise.
+
+    The site service keeps it in sync: ``add``/``remove`` run inside the
+    writing transaction. The SQL backends filter and rank in the query
+    (``apply``); the in-process one ranks every match itself
+    (``ranking``) and the caller reads them ``MEMORY_BATCH_SIZE`` at a time.
+    """
+
+    def __init__(self):
+        self.backend = MemorySearchBackend()
+
+    async def setup(self, conn: AsyncConnection) -> None:
+        dialect = conn.dialect.name
+        backend = MemorySearchBackend()
+        if dialect == "sqlite":
+            result = await conn.execute(
+                text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            )
+            if result.scalar():
+                backend = SqliteSearchBackend()
+        elif dialect == "postgresql":
+            backend = PostgresSearchBackend()
+        await backend.setup(conn)
+        self.backend = backend
+        logger.info(f"Using {backend.name} search index")
+
+    async def load(self, db: AsyncSession) -> None:
+        await self.backend.load(db)
+
+    async def add(self, db: AsyncSession, site: HistoricalSite) -> None:
+        await self.add_many(db, [(site.id, site.name, site.description)])
+
+    async def remove(
+        self, db: AsyncSession, site_id: int, name: Optional[str], description: Optional[str]
+    ) -> None:
+        await self.remove_many(db, [(site_id, name, description)])
+
+    async def add_many(
+        self, db: AsyncSession, rows: List[Tuple[int, Optional[str], Optional[str]]]
+    ) -> None:
+        """
+        Index ``(site_id, name, description)`` rows.
+        """
+        if rows:
+            await self.backend.add(db, [(i, n or "", d or "") for i, n, d in rows])
+
+    async def remove_many(
+        self, db: AsyncSession, rows: List[Tuple[int, Optional[str], Optional[str]]]
+    ) -> None:
+        """
+        Unindex ``(site_id, name, description)`` rows; the values must be the
+        ones that were indexed.
+        """
+        if rows:
+            await self.backend.remove(db, [(i, n or "", d or "") for i, n, d in rows])
+
+    def ranking(self, query_string: str) -> Optional[List[int]]:
+        """
+        Ids of the sites matching every word of ``query_string``, best match
+        first, if the backend ranks in process; ``None`` if ``apply`` should
+        be used instead.
+        """
+        if not isinstance(self.backend, MemorySearchBackend):
+            return None
+        return [site_id for site_id, _ in self.backend.rank(tokenize(query_string))]
+
+    def apply(self, stmt, query_string: str):
+        """
+        Restrict ``stmt`` (a select of ``HistoricalSite``) to the sites
+        matching every word of ``query_string``. Returns the statement and a
+        rank expression that sorts the best match first (``None`` when
+        nothing can match). Not available for the in-process backend, see
+        ``ranking``.
+        """
+        tokens = tokenize(query_string)
+        if not tokens:
+            return stmt.where(HistoricalSite.id.is_(None)), None
+        return self.backend.apply(stmt, tokens)
+
+
+search_index = SearchIndex()
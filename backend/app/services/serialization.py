@@ -0,0 +1,89 @@
+import hashlib
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple, Sequence, Tuple, Type
+
+import orjson
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import msgpack
+except ImportError:  # optional, only needed for MessagePack responses
+    msgpack = None
+
+from models.historical_site import HistoricalSite
+from schemas.historical_site import HistoricalSiteNearbyRead, HistoricalSiteRead
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+
+def dump_list(schema: Type[BaseModel], items: Iterable) -> bytes:
+    """
+    Encode ``items`` (ORM rows or instances of ``schema``) as a JSON array
+    of ``schema``. Rows are converted once, straight from their attributes,
+    and encoded without building intermediate dicts.
+    """
+    adapter = _list_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(list(items), from_attributes=True))
+
+
+class EncodedSite(NamedTuple):
+    # A site's JSON body and the digest its ETag is built from
+    body: bytes
+    digest: str
+
+
+def encode_site(site: HistoricalSiteRead) -> EncodedSite:
+    body = site.model_dump_json().encode()
+    return EncodedSite(body, hashlib.sha1(body).hexdigest()[:16])
+
+
+def dump_sites(sites: Iterable[HistoricalSite]) -> bytes:
+    return dump_list(HistoricalSiteRead, sites)
+
+
+def nearby_reads(
+    results: Iterable[Tuple[HistoricalSite, float]]
+) -> List[HistoricalSiteNearbyRead]:
+    fields = HistoricalSiteRead.model_fields
+    return [
+        HistoricalSiteNearbyRead.model_validate(
+            {**{name: getattr(site, name) for name in fields}, "distance_m": distance}
+        )
+        for site, distance in results
+    ]
+
+
+COLUMNAR_FORMATS = {"json": "application/json", "msgpack": "application/msgpack"}
+
+
+def msgpack_available() -> bool:
+    return msgpack is not None
+
+
+def _msgpack_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} as MessagePack")
+
+
+def dump_columns(
+    fields: Sequence[str], rows: Sequence[tuple], format: str = "json"
+) -> bytes:
+    """
+    Encode rows as parallel arrays, ``{"count": n, "columns": {field:
+    [values...]}}``, so field names are written once per page instead of
+    once per row.
+    """
+    columns = {field: [] for field in fields}
+    for field, values in zip(fields, zip(*rows)):
+        columns[field] = list(values)
+    payload = {"count": len(rows), "columns": columns}
+    if format == "msgpack":
+        if msgpack is None:
+            raise ValueError("MessagePack support is not installed")
+        return msgpack.packb(payload, use_bin_type=True, default=_msgpack_default)
+    return orjson.dumps(payload)
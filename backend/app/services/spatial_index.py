@@ -0,0 +1,191 @@
+from math import radians, degrees, sin, cos, asin
+from typing import List, Optional, Tuple
+
+from sqlalchemy.sql import and_, or_
+
+from models.historical_site import HistoricalSite
+from services.distance_engine import EARTH_RADIUS_KM
+
+# Precision stored on every site (~4.8m x 4.8m cells).
+GEOHASH_PRECISION = 9
+
+# Upper bound on the number of geohash cells used to cover a search area.
+MAX_COVER_CELLS = 16
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# (min_lat, min_lon, max_lat, max_lon)
+BoundingBox = Tuple[float, float, float, float]
+
+
+def validate_coordinates(latitude: float, longitude: float) -> None:
+    if not -90 <= latitude <= 90:
+        raise ValueError("latitude must be between -90 and 90")
+    if not -180 <= longitude <= 180:
+        raise ValueError("longitude must be between -180 and 180")
+
+
+def encode_geohash(
+    latitude: float, longitude: float, precision: int = GEOHASH_PRECISION
+) -> str:
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, interval = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (interval[0] + interval[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            interval[0] = mid
+        else:
+            bits <<= 1
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def geohash_for(latitude: Optional[float], longitude: Optional[float]) -> Optional[str]:
+    """
+    Geohash stored in the indexed ``HistoricalSite.geohash`` column.
+    """
+    if latitude is None or longitude is None:
+        return None
+    return encode_geohash(latitude, longitude)
+
+
+def _cell_size(precision: int) -> Tuple[float, float]:
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = (5 * precision) // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def bounding_boxes(latitude: float, longitude: float, radius_km: float) -> List[BoundingBox]:
+    """
+    Boxes enclosing every point within ``radius_km`` of the given point.
+    The area is split in two when it crosses the antimeridian.
+    """
+    angular = radius_km / EARTH_RADIUS_KM
+    min_lat = latitude - degrees(angular)
+    max_lat = latitude + degrees(angular)
+    if min_lat <= -90 or max_lat >= 90 or angular >= 3.14159:
+        return [(max(min_lat, -90.0), -180.0, min(max_lat, 90.0), 180.0)]
+
+    dlon = degrees(asin(min(1.0, sin(angular) / cos(radians(latitude)))))
+    min_lon = longitude - dlon
+    max_lon = longitude + dlon
+    if min_lon < -180:
+        return [
+            (min_lat, min_lon + 360, max_lat, 180.0),
+            (min_lat, -180.0, max_lat, max_lon),
+        ]
+    if max_lon > 180:
+        return [
+            (min_lat, min_lon, max_lat, 180.0),
+            (min_lat, -180.0, max_lat, max_lon - 360),
+        ]
+    return [(min_lat, min_lon, max_lat, max_lon)]
+
+
+def _cells_in_box(box: BoundingBox, precision: int) -> List[str]:
+    min_lat, min_lon, max_lat, max_lon = box
+    cell_lat, cell_lon = _cell_size(precision)
+    lat_start = int((min_lat + 90) // cell_lat)
+    lat_end = int(min((max_lat + 90) // cell_lat, (180 / cell_lat) - 1))
+    lon_start = int((min_lon + 180) // cell_lon)
+    lon_end = int(min((max_lon + 180) // cell_lon, (360 / cell_lon) - 1))
+    if (lat_end - lat_start + 1) * (lon_end - lon_start + 1) > MAX_COVER_CELLS:
+        return []
+    cells = []
+    for i in range(lat_start, lat_end + 1):
+        for j in range(lon_start, lon_end + 1):
+            center_lat = -90 + (i + 0.5) * cell_lat
+            center_lon = -180 + (j + 0.5) * cell_lon
+            cells.append(encode_geohash(center_lat, center_lon, precision))
+    return cells
+
+
+def covering_cells(boxes: List[BoundingBox]) -> List[str]:
+    """
+    Smallest set of geohash prefixes (at the finest precision that needs no
+    more than ``MAX_COVER_CELLS`` cells) covering the boxes. An empty list
+    means the area is too large for cell pruning to help.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        cells = []
+        for box in boxes:
+            box_cells = _cells_in_box(box, precision)
+            if not box_cells:
+                break
+            cells.extend(box_cells)
+        else:
+            if len(cells) <= MAX_COVER_CELLS:
+                return sorted(set(cells))
+    return []
+
+
+def validate_bounds(
+    min_latitude: float, min_longitude: float, max_latitude: float, max_longitude: float
+) -> None:
+    validate_coordinates(min_latitude, min_longitude)
+    validate_coordinates(max_latitude, max_longitude)
+    if min_latitude > max_latitude:
+        raise ValueError("min_lat must not be greater than max_lat")
+
+
+def viewport_boxes(
+    min_latitude: float, min_longitude: float, max_latitude: float, max_longitude: float
+) -> List[BoundingBox]:
+    """
+    Boxes covering a map viewport; ``min_longitude > max_longitude`` means
+    the viewport crosses the antimeridian.
+    """
+    if min_longitude > max_longitude:
+        return [
+            (min_latitude, min_longitude, max_latitude, 180.0),
+            (min_latitude, -180.0, max_latitude, max_longitude),
+        ]
+    return [(min_latitude, min_longitude, max_latitude, max_longitude)]
+
+
+def boxes_filter(boxes: List[BoundingBox]):
+    """
+    SQL predicate selecting the sites inside any of the boxes: geohash prefix
+    ranges (index range scans on ``geohash``) combined with the exact
+    ``latitude``/``longitude`` bounds.
+    """
+    box_clauses = [
+        and_(
+            HistoricalSite.latitude.between(min_lat, max_lat),
+            HistoricalSite.longitude.between(min_lon, max_lon),
+        )
+        for min_lat, min_lon, max_lat, max_lon in boxes
+    ]
+    clause = or_(*box_clauses) if len(box_clauses) > 1 else box_clauses[0]
+
+    cells = covering_cells(boxes)
+    if cells:
+        # "~" sorts after every base32 character, so [cell, cell~) is the
+        # prefix range of the cell.
+        cell_clauses = [
+            and_(HistoricalSite.geohash >= cell, HistoricalSite.geohash < cell + "~")
+            for cell in cells
+        ]
+        clause = and_(or_(*cell_clauses), clause)
+    return clause
+
+
+def candidate_filter(latitude: float, longitude: float, radius_km: float):
+    """
+    SQL predicate selecting the sites that may lie within ``radius_km``, i.e.
+    those in its bounding boxes. Exact distance still has to be checked on
+    the returned rows.
+    """
+    return boxes_filter(bounding_boxes(latitude, longitude, radius_km))
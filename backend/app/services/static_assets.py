@@ -0,0 +1,224 @@
+import asyncio
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+from email.utils import formatdate
+from pathlib import Path, PurePosixPath
+from typing import Dict, Optional, Tuple
+
+from services.cache import LRUCache
+
+try:
+    import brotli
+except ImportError:  # optional, assets are only gzipped without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+STATIC_URL = "/static"
+# Files here are named after their content already (see image_pipeline)
+HASHED_DIRS = ("derived/",)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Unhashed names may change content, so clients revalidate them by ETag
+MUTABLE_CACHE_CONTROL = os.getenv("STATIC_CACHE_CONTROL", "public, no-cache")
+
+COMPRESSIBLE_TYPES = {
+    "application/javascript",
+    "application/json",
+    "application/manifest+json",
+    "application/wasm",
+    "application/xml",
+    "image/svg+xml",
+}
+# Paths found missing are not looked up on disk again for this long
+STATIC_MISS_TTL = float(os.getenv("STATIC_MISS_TTL", "10"))
+STATIC_MISS_MAX_ENTRIES = int(os.getenv("STATIC_MISS_MAX_ENTRIES", "10000"))
+
+COMPRESS_MIN_BYTES = 512
+COMPRESS_MAX_BYTES = int(os.getenv("STATIC_COMPRESS_MAX_BYTES", str(4 * 1024 * 1024)))
+
+mimetypes.add_type("application/javascript", ".mjs")
+mimetypes.add_type("application/manifest+json", ".webmanifest")
+
+
+def compressible(media_type: str) -> bool:
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES
+
+
+def encodings_available() -> Tuple[str, ...]:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def fingerprint(relative_path: str, digest: str) -> str:
+    """
+    ``images/a.jpg`` -> ``images/a.<digest>.jpg``
+    """
+    path = PurePosixPath(relative_path)
+    return str(path.with_name(f"{path.stem}.{digest}{path.suffix}"))
+
+
+class Asset:
+    def __init__(self, path: Path, relative_path: str, stat_result: os.stat_result):
+        self.path = path
+        self.relative_path = relative_path
+        self.stat_result = stat_result
+        self.media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        self.last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+        # Precompressed bodies by content coding, for text assets only
+        self.encoded: Dict[str, bytes] = {}
+
+        content = path.read_bytes() if self._compress_candidate() else None
+        digest = hashlib.sha256()
+        if content is not None:
+            digest.update(content)
+        else:
+            with open(path, "rb") as source:
+                for block in iter(lambda: source.read(1024 * 1024), b""):
+                    digest.update(block)
+        self.digest = digest.hexdigest()[:12]
+        self.etag = f'"{self.digest}"'
+        self.hashed_path = (
+            relative_path
+            if relative_path.startswith(HASHED_DIRS)
+            else fingerprint(relative_path, self.digest)
+        )
+        if content is not None:
+            self._precompress(content)
+
+    def _compress_candidate(self) -> bool:
+        return (
+            compressible(self.media_type)
+            and COMPRESS_MIN_BYTES <= self.stat_result.st_size <= COMPRESS_MAX_BYTES
+        )
+
+    def _precompress(self, content: bytes) -> None:
+        candidates = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            candidates["br"] = brotli.compress(content, quality=11)
+        for encoding, body in candidates.items():
+            # Not worth a Vary'd variant unless it saves a tenth
+            if len(body) < 0.9 * len(content):
+                self.encoded[encoding] = body
+
+
+class StaticManifest:
+    """
+    In-memory index of the static directory, built once at startup: content
+    hashes, fingerprinted names and precompressed bodies, so serving an
+    asset never reads the tree to decide what to send.
+
+    Every asset answers at its plain path (revalidated by ETag) and at its
+    fingerprinted path (cached for a year). Files added later, such as
+    rendered image variants, are indexed on their first request, in a
+    worker thread; paths that are not there are remembered for
+    ``STATIC_MISS_TTL`` seconds so repeated 404s do not hit the filesystem.
+    Files outside ``HASHED_DIRS`` may be rewritten in place, so they are
+    stat'ed on each request and re-indexed when they changed; their old
+    fingerprinted path then stops resolving.
+    """
+
+    def __init__(self, root: Path = STATIC_DIR):
+        self.root = root.resolve()
+        # URL path relative to /static -> (asset, served immutable)
+        self._entries: Dict[str, Tuple[Asset, bool]] = {}
+        self._misses = LRUCache(STATIC_MISS_MAX_ENTRIES, STATIC_MISS_TTL)
+
+    def __len__(self) -> int:
+        return len({id(asset) for asset, _ in self._entries.values()})
+
+    def load(self) -> None:
+        entries = {}
+        if self.root.is_dir():
+            for path in sorted(self.root.rglob("*")):
+                if path.is_file():
+                    self._add(entries, path)
+        self._entries = entries
+        self._misses.clear()
+        logger.info(f"Indexed {len(self)} static assets")
+
+    def _add(self, entries: Dict[str, Tuple[Asset, bool]], path: Path) -> Optional[Asset]:
+        relative_path = path.relative_to(self.root).as_posix()
+        if path.name.endswith(".part") or any(
+            part.startswith(".") for part in PurePosixPath(relative_path).parts
+        ):
+            return None
+        asset = Asset(path, relative_path, path.stat())
+        entries[relative_path] = (asset, relative_path.startswith(HASHED_DIRS))
+        entries[asset.hashed_path] = (asset, True)
+        return asset
+
+    async def _index(self, path: Path) -> Optional[Asset]:
+        # Hashing and precompressing is CPU-bound, keep it off the event loop
+        entries: Dict[str, Tuple[Asset, bool]] = {}
+        asset = await asyncio.to_thread(self._add, entries, path)
+        self._entries.update(entries)
+        return asset
+
+    def _forget(self, asset: Asset) -> None:
+        for relative_path in (asset.relative_path, asset.hashed_path):
+            entry = self._entries.get(relative_path)
+            if entry is not None and entry[0] is asset:
+                del self._entries[relative_path]
+
+    async def _revalidate(
+        self, relative_path: str, entry: Tuple[Asset, bool]
+    ) -> Optional[Tuple[Asset, bool]]:
+        asset = entry[0]
+        try:
+            stat_result = asset.path.stat()
+        except FileNotFoundError:
+            stat_result = None
+        if stat_result is not None and (
+            stat_result.st_mtime_ns == asset.stat_result.st_mtime_ns
+            and stat_result.st_size == asset.stat_result.st_size
+        ):
+            return entry
+        # Changed in place (or gone): its fingerprinted name is stale too
+        self._forget(asset)
+        if stat_result is None or await self._index(asset.path) is None:
+            self._misses.set(relative_path, True)
+            return None
+        return self._entries.get(relative_path)
+
+    async def lookup(self, relative_path: str) -> Optional[Tuple[Asset, bool]]:
+        entry = self._entries.get(relative_path)
+        if entry is not None:
+            if entry[0].relative_path.startswith(HASHED_DIRS):
+                return entry
+            return await self._revalidate(relative_path, entry)
+        if self._misses.get(relative_path) is not None:
+            return None
+        # Not indexed yet; only plain paths can name a new file
+        path = (self.root / relative_path).resolve()
+        if (
+            self.root not in path.parents
+            or not path.is_file()
+            or await self._index(path) is None
+        ):
+            self._misses.set(relative_path, True)
+            return None
+        return self._entries.get(relative_path)
+
+    def url_for(self, relative_path: str) -> str:
+        """
+        Fingerprinted URL of an asset, or its plain URL if it is unknown.
+        """
+        entry = self._entries.get(relative_path)
+        if entry is None:
+            return f"{STATIC_URL}/{relative_path}"
+        return f"{STATIC_URL}/{entry[0].hashed_path}"
+
+    def manifest(self) -> Dict[str, str]:
+        return {
+            relative_path: f"{STATIC_URL}/{asset.hashed_path}"
+            for relative_path, (asset, _) in self._entries.items()
+            if relative_path != asset.hashed_path
+        }
+
+
+# Process-wide manifest, loaded at startup.
+static_assets = StaticManifest()
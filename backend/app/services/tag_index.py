@@ -0,0 +1,82 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from models.historical_site import HistoricalSite
+from models.site_tag import SiteTag
+
+
+def normalize_tags(tags: Optional[Iterable[str]]) -> List[str]:
+    """
+    Lower-cased, stripped and de-duplicated tags, in their original order.
+    """
+    normalized = []
+    for tag in tags or []:
+        tag = tag.strip().lower()
+        if tag and tag not in normalized:
+            normalized.append(tag)
+    return normalized
+
+
+async def sync_site_tags(
+    db: AsyncSession, site_id: int, tags: Optional[Iterable[str]]
+) -> None:
+    """
+    Replace the ``SiteTag`` rows of a site with its current tags.
+    """
+    await db.execute(delete(SiteTag).where(SiteTag.site_id == site_id))
+    rows = [{"tag": tag, "site_id": site_id} for tag in normalize_tags(tags)]
+    if rows:
+        await db.execute(insert(SiteTag), rows)
+
+
+async def sync_tags_many(db: AsyncSession, site_tags: Dict[int, Iterable[str]]) -> None:
+    """
+    ``sync_site_tags`` for many sites at once (``{site_id: tags}``).
+    """
+    if not site_tags:
+        return
+    await db.execute(delete(SiteTag).where(SiteTag.site_id.in_(list(site_tags))))
+    rows = [
+        {"tag": tag, "site_id": site_id}
+        for site_id, tags in site_tags.items()
+        for tag in normalize_tags(tags)
+    ]
+    if rows:
+        await db.execute(insert(SiteTag), rows)
+
+
+async def remove_site_tags(db: AsyncSession, site_id: int) -> None:
+    await db.execute(delete(SiteTag).where(SiteTag.site_id == site_id))
+
+
+def tag_filter(tags: Iterable[str], match_all: bool = False):
+    """
+    Predicate on ``HistoricalSite`` matching sites carrying any (or, with
+    ``match_all``, every) one of ``tags``.
+    """
+    tags = normalize_tags(tags)
+    site_ids = select(SiteTag.site_id).where(SiteTag.tag.in_(tags))
+    if match_all:
+        site_ids = site_ids.group_by(SiteTag.site_id).having(
+            func.count(SiteTag.tag) == len(tags)
+        )
+    return HistoricalSite.id.in_(site_ids)
+
+
+async def tag_facets(db: AsyncSession, sites_stmt=None) -> List[Tuple[str, int]]:
+    """
+    ``(tag, site count)`` pairs, most used first, over the sites selected by
+    ``sites_stmt`` (a select of ``HistoricalSite``) or over all sites.
+    """
+    query = select(SiteTag.tag, func.count(SiteTag.site_id).label("count"))
+    if sites_stmt is not None:
+        site_ids = sites_stmt.with_only_columns(HistoricalSite.id).order_by(None)
+        query = query.where(SiteTag.site_id.in_(site_ids))
+    query = query.group_by(SiteTag.tag).order_by(
+        func.count(SiteTag.site_id).desc(), SiteTag.tag
+    )
+    result = await db.execute(query)
+    return [(tag, count) for tag, count in result.all()]
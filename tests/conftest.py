@@ -0,0 +1,67 @@
+import asyncio
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# The engine is created when data.database is imported, so the test database
+# has to be configured before any application module is loaded.
+TEST_DIR = Path(tempfile.mkdtemp(prefix="harlemfootprints-tests-"))
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{TEST_DIR / 'test.db'}"
+os.environ.setdefault("DB_PROFILE", "dev")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from api.admission import admission_controls  # noqa: E402
+from data.database import engine  # noqa: E402
+from data.schema import reset_schema  # noqa: E402
+from main import app  # noqa: E402
+from services import catalog_version  # noqa: E402
+from services.cache import site_cache  # noqa: E402
+
+
+async def _reset_database():
+    await reset_schema()
+    # Connections belong to this event loop; the app opens its own
+    await engine.dispose()
+
+
+def reset_admission():
+    for control in admission_controls:
+        control._limiters.clear()
+        control._buckets.clear()
+
+
+@pytest.fixture
+def client():
+    asyncio.run(_reset_database())
+    # As in a fresh process: the catalog was reset underneath this one
+    catalog_version._last_seen_version = None
+    catalog_version._produced.clear()
+    site_cache.clear()
+    reset_admission()
+    with TestClient(app) as client:
+        yield client
+
+
+def site(index: int, **values) -> dict:
+    return {
+        "name": f"Site {index}",
+        "description": f"Historical site number {index}",
+        "latitude": 40.8 + index * 0.001,
+        "longitude": -73.95,
+        "era": "Harlem Renaissance",
+        **values,
+    }
+
+
+def import_sites(client: TestClient, rows) -> dict:
+    response = client.post(
+        "/sites/bulk",
+        content="\n".join(json.dumps(row) for row in rows),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from api.admission import AdmissionLimits, ConcurrencyLimiter
+
+
+def test_requests_past_the_queue_are_shed():
+    async def run():
+        limiter = ConcurrencyLimiter(AdmissionLimits(max_concurrent=1, max_queued=1))
+        await limiter.acquire()
+        queued = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as shed:
+            await limiter.acquire()
+        limiter.release()
+        await queued
+        return shed.value, limiter.status()
+
+    shed, status = asyncio.run(run())
+
+    assert shed.status_code == 503
+    assert shed.headers["Retry-After"] == "1"
+    assert status["shed"] == 1
+
+
+def test_queued_request_times_out():
+    async def run():
+        limiter = ConcurrencyLimiter(
+            AdmissionLimits(max_concurrent=1, max_queued=1, queue_timeout=0.05)
+        )
+        await limiter.acquire()
+        with pytest.raises(HTTPException) as timed_out:
+            await limiter.acquire()
+        return timed_out.value
+
+    assert asyncio.run(run()).status_code == 503
+
+
+def test_client_over_its_rate_gets_429(client):
+    # Exports allow a burst of three per client
+    statuses = [client.get("/sites/export").status_code for _ in range(4)]
+
+    assert statuses == [200, 200, 200, 429]
+    assert client.get("/sites/export").headers["retry-after"]
+
+
+def test_export_holds_its_slot_while_streaming(client, monkeypatch):
+    from api import historical_site_router
+    from main import site_admission
+
+    in_flight = []
+
+    async def export(format):
+        yield b"{}\n"
+        in_flight.append(site_admission._limiters["GET /sites/export"].in_flight)
+        yield b"{}\n"
+
+    monkeypatch.setattr(historical_site_router, "stream_sites", export)
+
+    assert client.get("/sites/export").status_code == 200
+    assert in_flight == [1]
+    assert site_admission._limiters["GET /sites/export"].in_flight == 0
@@ -0,0 +1,68 @@
+import json
+
+from conftest import import_sites, site
+
+
+def test_rows_that_fail_are_reported_and_the_rest_imported(client):
+    body = "\n".join(
+        [
+            json.dumps(site(1)),
+            "{not json",
+            json.dumps({"name": "No era", "description": "Missing a required field"}),
+            json.dumps(["not", "an", "object"]),
+            json.dumps(site(2)),
+        ]
+    )
+
+    report = client.post(
+        "/sites/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+    ).json()
+
+    assert report["received"] == 5
+    assert report["imported"] == 2
+    assert report["failed"] == 3
+    assert [error["row"] for error in report["errors"]] == [2, 3, 4]
+    assert report["errors"][0]["error"].startswith("Invalid JSON")
+    assert len(client.get("/sites/").json()) == 2
+
+
+def test_csv_rows(client):
+    body = (
+        "name,description,era,tags,latitude,longitude\n"
+        'Apollo Theater,"Music hall, 125th Street",1910s,music|landmark,40.81,-73.95\n'
+        "Short row,only two\n"
+    )
+
+    report = client.post(
+        "/sites/bulk", content=body, headers={"Content-Type": "text/csv"}
+    ).json()
+
+    assert report["imported"] == 1
+    assert report["errors"] == [{"row": 2, "error": "Expected 6 columns, got 2"}]
+    imported = client.get("/sites/1").json()
+    assert imported["description"] == "Music hall, 125th Street"
+    assert imported["tags"] == ["music", "landmark"]
+
+
+def test_upsert_only_overwrites_supplied_columns(client):
+    import_sites(client, [site(1, tags=["jazz"], date_established="1920-01-01T00:00:00")])
+
+    import_sites(client, [{"name": "Site 1", "description": "Renamed", "era": "1920s"}])
+
+    updated = client.get("/sites/1").json()
+    assert updated["description"] == "Renamed"
+    assert updated["tags"] == ["jazz"]
+    assert updated["date_established"] == "1920-01-01T00:00:00"
+    assert updated["version"] == 2
+
+
+def test_reimporting_unchanged_rows_changes_nothing(client):
+    rows = [site(i) for i in range(3)]
+    import_sites(client, rows)
+    etag = client.get("/sites/").headers["etag"]
+
+    report = import_sites(client, rows)
+
+    assert report["imported"] == 3
+    assert client.get("/sites/", headers={"If-None-Match": etag}).status_code == 304
+    assert {row["version"] for row in client.get("/sites/").json()} == {1}
@@ -0,0 +1,120 @@
+import asyncio
+import random
+import sqlite3
+from collections import Counter, defaultdict
+
+from conftest import TEST_DIR, import_sites, site
+
+from services import cluster_index as clustering
+from services.cluster_index import CELLS_PER_TILE, ClusterIndex, cluster_index, project
+
+WORLD = (-180.0, -85.0, 180.0, 85.0)
+
+
+def total(index: ClusterIndex, zoom: int = 0) -> int:
+    return sum(feature["count"] for feature in index.clusters(*WORLD, zoom))
+
+
+def brute_force_cells(points, zoom: int) -> dict:
+    n = CELLS_PER_TILE << zoom
+    cells = defaultdict(list)
+    for site_id, latitude, longitude in points:
+        x, y = (float(value) for value in project(latitude, longitude))
+        cells[(min(int(x * n), n - 1), min(int(y * n), n - 1))].append(site_id)
+    return cells
+
+
+def brute_force_clusters(points, zoom: int, max_zoom: int):
+    """
+    (count, expansion zoom) of each multi-site cell and the ids of lone
+    sites, grouping every point by its grid cell at each zoom.
+    """
+    cells = brute_force_cells(points, zoom)
+    clusters, singles = Counter(), set()
+    for members in cells.values():
+        if len(members) == 1:
+            singles.add(members[0])
+            continue
+        group = [point for point in points if point[0] in members]
+        expansion = next(
+            (
+                deeper
+                for deeper in range(zoom + 1, max_zoom + 1)
+                if len(brute_force_cells(group, deeper)) > 1
+            ),
+            max_zoom + 1,
+        )
+        clusters[(len(members), expansion)] += 1
+    return clusters, singles
+
+
+def test_clusters_match_a_brute_force_grid():
+    generator = random.Random(7)
+    points = [
+        (site_id, generator.uniform(40.70, 40.88), generator.uniform(-74.02, -73.90))
+        for site_id in range(1, 301)
+    ]
+    # A few far away, and two sites sharing a position
+    points += [(301, 51.5, -0.12), (302, -33.9, 151.2), (303, 40.8, -73.95), (304, 40.8, -73.95)]
+    index = ClusterIndex(max_zoom=8)
+    index.load(points)
+
+    for zoom in range(0, 9):
+        features = index.clusters(*WORLD, zoom)
+        clusters, singles = brute_force_clusters(points, zoom, 8)
+
+        assert sum(feature["count"] for feature in features) == len(points)
+        assert {f["site_id"] for f in features if f["count"] == 1} == singles
+        assert (
+            Counter(
+                (f["count"], f["expansion_zoom"]) for f in features if f["count"] > 1
+            )
+            == clusters
+        )
+
+    assert sorted(f["site_id"] for f in index.clusters(*WORLD, 9)) == list(range(1, 305))
+
+
+def test_compaction_folds_writes_into_the_arrays(monkeypatch):
+    monkeypatch.setattr(clustering, "CLUSTER_COMPACT_THRESHOLD", 3)
+    index = ClusterIndex(max_zoom=4)
+    index.load([(1, 40.8, -73.95)])
+
+    for site_id in range(2, 6):
+        index.upsert(site_id, 40.8 + site_id * 0.01, -73.95)
+
+    assert len(index._moved) <= 3
+    assert len(index) == total(index) == 5
+
+
+def test_writes_during_a_rebuild_are_replayed():
+    index = ClusterIndex(max_zoom=4)
+    index.load([(1, 40.8, -73.95), (2, 40.81, -73.95)])
+
+    async def run():
+        index._journal = []
+        rebuild = asyncio.create_task(index._rebuild(index._rows()))
+        index.upsert(3, 40.82, -73.95)
+        index.remove(1)
+        await rebuild
+
+    asyncio.run(run())
+
+    assert len(index) == total(index) == 2
+    assert sorted(f["site_id"] for f in index.clusters(*WORLD, 5)) == [2, 3]
+
+
+def test_outside_writes_reload_the_index(client):
+    import_sites(client, [site(1), site(2)])
+
+    with sqlite3.connect(TEST_DIR / "test.db") as db:
+        db.execute("DELETE FROM historicalsite WHERE id = 1")
+        db.execute("UPDATE catalogversion SET version = version + 1")
+    client.get("/sites/2")
+    # The reload runs in the background; a later request lets it finish
+    for _ in range(50):
+        if len(cluster_index) == 1:
+            break
+        client.get("/health/live")
+
+    assert len(cluster_index) == 1
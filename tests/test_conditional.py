@@ -0,0 +1,53 @@
+from conftest import import_sites, site
+
+
+def test_site_not_modified(client):
+    import_sites(client, [site(1)])
+    response = client.get("/sites/1")
+    etag = response.headers["etag"]
+
+    revalidated = client.get("/sites/1", headers={"If-None-Match": etag})
+
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+    assert revalidated.content == b""
+
+
+def test_site_etag_changes_with_content(client):
+    import_sites(client, [site(1)])
+    etag = client.get("/sites/1").headers["etag"]
+
+    client.put("/sites/1", json={"description": "Restored in 1990"})
+    response = client.get("/sites/1", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["description"] == "Restored in 1990"
+
+
+def test_reused_site_id_gets_a_new_etag(client):
+    import_sites(client, [site(1)])
+    etag = client.get("/sites/1").headers["etag"]
+    client.delete("/sites/1")
+    # SQLite hands the freed id to the next insert
+    import_sites(client, [site(2)])
+
+    response = client.get("/sites/1", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json()["name"] == "Site 2"
+
+
+def test_collection_not_modified_until_catalog_changes(client):
+    import_sites(client, [site(1)])
+    etag = client.get("/sites/", params={"limit": 5}).headers["etag"]
+
+    unchanged = client.get("/sites/", params={"limit": 5}, headers={"If-None-Match": etag})
+    other_query = client.get("/sites/", params={"limit": 6}, headers={"If-None-Match": etag})
+    import_sites(client, [site(2)])
+    changed = client.get("/sites/", params={"limit": 5}, headers={"If-None-Match": etag})
+
+    assert unchanged.status_code == 304
+    assert other_query.status_code == 200
+    assert changed.status_code == 200
+    assert len(changed.json()) == 2
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+from conftest import import_sites, site
+
+IGNORED = ("id", "version")
+
+
+@pytest.fixture
+def catalog(client):
+    import_sites(
+        client,
+        [
+            site(1, tags=["jazz", "music"], date_established="1914-01-26T00:00:00"),
+            site(2, description='Says "hello", then leaves'),
+            site(3, images=["https://example.org/apollo.jpg"], address="253 W 125th St"),
+        ],
+    )
+    return client
+
+
+def export(client, format: str) -> str:
+    response = client.get("/sites/export", params={"format": format})
+    assert response.status_code == 200
+    return response.text
+
+
+def records(ndjson: str):
+    rows = [json.loads(line) for line in ndjson.splitlines()]
+    return sorted(
+        ({k: v for k, v in row.items() if k not in IGNORED} for row in rows),
+        key=lambda row: row["name"],
+    )
+
+
+def empty_catalog(client):
+    for row in client.get("/sites/").json():
+        client.delete(f"/sites/{row['id']}")
+
+
+@pytest.mark.parametrize(
+    "format, content_type", [("ndjson", "application/x-ndjson"), ("csv", "text/csv")]
+)
+def test_export_imports_back_unchanged(catalog, format, content_type):
+    before = export(catalog, "ndjson")
+    body = export(catalog, format)
+    empty_catalog(catalog)
+
+    report = catalog.post(
+        "/sites/bulk", content=body, headers={"Content-Type": content_type}
+    ).json()
+
+    assert report["failed"] == 0, report["errors"]
+    assert report["imported"] == 3
+    assert records(export(catalog, "ndjson")) == records(before)
+
+
+def test_csv_export_has_a_header_and_one_line_per_site(catalog):
+    lines = export(catalog, "csv").splitlines()
+
+    assert lines[0].startswith("id,name,description")
+    assert len(lines) == 4
@@ -0,0 +1,71 @@
+import pytest
+from conftest import import_sites, site
+
+from services import historical_site_service
+from services.search_index import MemorySearchBackend, search_index
+
+
+@pytest.fixture(params=["database", "memory"])
+def searchable(request, client, monkeypatch):
+    if request.param == "memory":
+        monkeypatch.setattr(search_index, "backend", MemorySearchBackend())
+        # Several round trips per page
+        monkeypatch.setattr(historical_site_service, "MEMORY_BATCH_SIZE", 3)
+    return client
+
+
+def names(response):
+    assert response.status_code == 200, response.text
+    return [row["name"] for row in response.json()]
+
+
+def test_name_matches_rank_first(searchable):
+    import_sites(
+        searchable,
+        [
+            {**site(1), "name": "Harlem Stage", "description": "Next to the Apollo"},
+            {**site(2), "name": "Apollo Theater", "description": "Music hall"},
+            {**site(3), "name": "Savoy Ballroom", "description": "Dance hall"},
+        ],
+    )
+
+    response = searchable.get("/sites/search", params={"query": "apollo"})
+
+    assert names(response) == ["Apollo Theater", "Harlem Stage"]
+
+
+def test_every_word_must_match(searchable):
+    import_sites(
+        searchable,
+        [
+            {**site(1), "name": "Apollo Theater", "description": "Music hall"},
+            {**site(2), "name": "Savoy Ballroom", "description": "Dance hall"},
+        ],
+    )
+
+    response = searchable.get("/sites/search", params={"query": "hall music"})
+
+    assert names(response) == ["Apollo Theater"]
+
+
+def test_pages_walk_every_match_once(searchable):
+    import_sites(searchable, [site(i, description=f"Jazz club {i}") for i in range(25)])
+    import_sites(searchable, [site(100, description="Not a match")])
+
+    found, cursor = [], None
+    while True:
+        params = {"query": "jazz", "limit": 4, **({"cursor": cursor} if cursor else {})}
+        response = searchable.get("/sites/search", params=params)
+        found += names(response)
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+
+    assert len(found) == 25
+    assert set(found) == {f"Site {i}" for i in range(25)}
+
+
+def test_invalid_cursor_is_rejected(searchable):
+    response = searchable.get("/sites/search", params={"query": "jazz", "cursor": "!!"})
+
+    assert response.status_code == 400
@@ -0,0 +1,64 @@
+import pytest
+
+from api import historical_site_router
+from conftest import import_sites, site
+from services.pagination import NEXT_CURSOR_HEADER
+
+# Sites 0-4 are inside, 5-9 north of it
+BBOX = "-74.0,40.79,-73.9,40.8045"
+
+
+def test_only_requested_columns_of_sites_in_the_box(client):
+    import_sites(client, [site(i, era=f"Era {i}") for i in range(10)])
+
+    body = client.get("/sites/in-bounds", params={"bbox": BBOX, "fields": "name,era"}).json()
+
+    assert body["count"] == 5
+    assert list(body["columns"]) == ["id", "name", "era"]
+    assert body["columns"]["name"] == [f"Site {i}" for i in range(5)]
+    assert body["columns"]["era"] == [f"Era {i}" for i in range(5)]
+
+
+def test_default_projection_and_paging(client):
+    import_sites(client, [site(i) for i in range(10)])
+
+    ids = []
+    params = {"bbox": BBOX, "limit": 2}
+    while True:
+        response = client.get("/sites/in-bounds", params=params)
+        assert list(response.json()["columns"]) == ["id", "name", "latitude", "longitude"]
+        ids += response.json()["columns"]["id"]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+        params["cursor"] = cursor
+
+    assert ids == [1, 2, 3, 4, 5]
+
+
+def test_unknown_field_is_rejected(client):
+    response = client.get("/sites/in-bounds", params={"bbox": BBOX, "fields": "name,secret"})
+
+    assert response.status_code == 400
+    assert "secret" in response.json()["detail"]
+
+
+def test_msgpack_carries_the_same_columns(client):
+    msgpack = pytest.importorskip("msgpack")
+    import_sites(client, [site(i, date_established="1920-01-01T00:00:00") for i in range(3)])
+    params = {"bbox": BBOX, "fields": "name,date_established"}
+
+    json_body = client.get("/sites/in-bounds", params=params).json()
+    response = client.get("/sites/in-bounds", params={**params, "format": "msgpack"})
+
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content) == json_body
+
+
+def test_msgpack_without_the_package_is_not_acceptable(client, monkeypatch):
+    monkeypatch.setattr(historical_site_router, "msgpack_available", lambda: False)
+
+    response = client.get("/sites/in-bounds", params={"bbox": BBOX, "format": "msgpack"})
+
+    assert response.status_code == 406
+    assert client.get("/sites/in-bounds", params={"bbox": BBOX}).status_code == 200
@@ -0,0 +1,154 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from conftest import _reset_database
+from sqlalchemy import func, update
+from sqlalchemy.future import select
+
+from data.database import AsyncSessionLocal, engine
+from models.job import Job, JobStatus
+from services import job_queue as jobs
+from services.job_queue import JobQueue
+
+
+@pytest.fixture
+def queue():
+    asyncio.run(_reset_database())
+    queue = JobQueue(workers=0, maxsize=10)
+    failures = []
+
+    @queue.handler("flaky")
+    async def flaky(payload):
+        if len(failures) < payload["failures"]:
+            failures.append(1)
+            raise RuntimeError("not yet")
+        return {"done": True}
+
+    return queue
+
+
+def run(coroutine):
+    async def and_dispose():
+        try:
+            return await coroutine
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(and_dispose())
+
+
+async def job_row(job_id: int) -> Job:
+    async with AsyncSessionLocal() as db:
+        return await db.get(Job, job_id)
+
+
+def test_job_is_offered_only_once_its_transaction_commits(queue):
+    async def scenario():
+        queue._queue = asyncio.Queue(maxsize=queue.maxsize)
+        async with AsyncSessionLocal() as db:
+            await queue.add(db, "flaky", {"failures": 0})
+            offered_before_commit = queue._queue.qsize()
+            await db.rollback()
+            job_id = await queue.add(db, "flaky", {"failures": 0})
+            await db.commit()
+            count = await db.scalar(select(func.count()).select_from(Job))
+        return offered_before_commit, count, queue._queue.get_nowait() == job_id
+
+    assert run(scenario()) == (0, 1, True)
+    assert queue.stats.enqueued == 1
+
+
+def test_failed_job_is_retried_later(queue, monkeypatch):
+    monkeypatch.setattr(jobs, "retry_delay", lambda attempts: 30.0 * attempts)
+
+    async def scenario():
+        job_id = await queue.enqueue("flaky", {"failures": 1})
+        await queue._run(job_id)
+        return await job_row(job_id)
+
+    job = run(scenario())
+
+    assert job.status == JobStatus.pending
+    assert job.attempts == 1
+    assert job.last_error == "RuntimeError: not yet"
+    assert job.run_at > datetime.utcnow() + timedelta(seconds=20)
+    assert queue.stats.retried == 1
+
+
+def test_job_fails_for_good_after_its_last_attempt(queue):
+    async def scenario():
+        job_id = await queue.enqueue("flaky", {"failures": 5}, max_attempts=2)
+        for _ in range(2):
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(Job).where(Job.id == job_id).values(run_at=datetime.utcnow())
+                )
+                await db.commit()
+            await queue._run(job_id)
+        return await job_row(job_id)
+
+    job = run(scenario())
+
+    assert job.status == JobStatus.failed
+    assert job.attempts == 2
+    assert job.finished_at is not None
+
+
+def test_retry_delay_backs_off_exponentially_with_jitter():
+    for attempts in range(1, 12):
+        ceiling = min(
+            jobs.JOB_RETRY_MAX_SECONDS, jobs.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+        )
+        assert ceiling / 2 <= jobs.retry_delay(attempts) <= ceiling
+
+
+def test_expired_lease_is_reclaimed(queue):
+    async def scenario():
+        queue._queue = asyncio.Queue(maxsize=queue.maxsize)
+        job_id = await queue.enqueue("flaky", {"failures": 0})
+        queue._queue.get_nowait()
+        queue._queued.clear()
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Job)
+                .where(Job.id == job_id)
+                .values(
+                    status=JobStatus.running,
+                    attempts=1,
+                    locked_until=datetime.utcnow() - timedelta(seconds=1),
+                )
+            )
+            await db.commit()
+        offered = await queue.recover()
+        await queue._run(queue._queue.get_nowait())
+        return offered, await job_row(job_id)
+
+    offered, job = run(scenario())
+
+    assert offered == 1
+    assert job.status == JobStatus.succeeded
+    assert job.attempts == 2
+
+
+
+def test_stop_returns_when_a_job_finishes_as_it_is_cancelled(queue):
+    queue.workers = 1
+    started, release = asyncio.Event(), asyncio.Event()
+
+    @queue.handler("quick")
+    async def quick(payload):
+        started.set()
+        await release.wait()
+        return {}
+
+    async def scenario():
+        await queue.start()
+        await queue.enqueue("quick", {})
+        await asyncio.wait_for(started.wait(), 5)
+        # The job completes in the same loop step the worker is cancelled
+        release.set()
+        await asyncio.wait_for(queue.stop(), 5)
+        return queue._tasks
+
+    assert run(scenario()) == []
@@ -0,0 +1,49 @@
+import pytest
+from conftest import import_sites, site
+from test_nearby import haversine_km
+
+ORIGIN = {"latitude": 40.8, "longitude": -73.95}
+
+
+@pytest.fixture
+def spread(client):
+    # Roughly 0.1, 1, 5, 20 and 100 km north of the origin, out of order
+    offsets = [0.9, 0.045, 0.0009, 0.18, 0.009]
+    rows = [
+        site(i, latitude=ORIGIN["latitude"] + offset, longitude=ORIGIN["longitude"])
+        for i, offset in enumerate(offsets)
+    ]
+    import_sites(client, rows)
+    return client
+
+
+def nearest(client, **params):
+    response = client.get("/sites/nearby", params={**ORIGIN, **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_nearest_sites_come_closest_first(spread):
+    found = nearest(spread, limit=3)
+
+    assert [row["name"] for row in found] == ["Site 2", "Site 4", "Site 1"]
+    for row in found:
+        distance = haversine_km(ORIGIN["latitude"], ORIGIN["longitude"], row["latitude"], row["longitude"])
+        assert row["distance_m"] == pytest.approx(distance * 1000, abs=0.01)
+
+
+def test_probe_widens_past_the_first_radius(spread):
+    # The closest two sites are beyond the first 0.5 km probe
+    found = nearest(spread, latitude=ORIGIN["latitude"] + 0.5, limit=2)
+
+    assert [row["name"] for row in found] == ["Site 3", "Site 0"]
+
+
+def test_max_distance_caps_the_search(spread):
+    found = nearest(spread, limit=5, max_distance=6)
+
+    assert [row["name"] for row in found] == ["Site 2", "Site 4", "Site 1"]
+
+
+def test_limit_or_max_distance_is_required(spread):
+    assert spread.get("/sites/nearby", params=ORIGIN).status_code == 400
@@ -0,0 +1,60 @@
+import pytest
+
+from services import media
+
+CONTENT = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def audio(tmp_path, monkeypatch):
+    (tmp_path / "audio").mkdir()
+    (tmp_path / "audio" / "tour.mp3").write_bytes(CONTENT)
+    monkeypatch.setattr(media, "MEDIA_DIR", tmp_path)
+    return "/media/audio/tour.mp3"
+
+
+def test_whole_file(client, audio):
+    response = client.get(audio)
+
+    assert response.status_code == 200
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.content == CONTENT
+
+
+@pytest.mark.parametrize(
+    "header, first, last",
+    [
+        ("bytes=0-99", 0, 99),
+        ("bytes=1000-", 1000, 1023),
+        ("bytes=-24", 1000, 1023),
+        ("bytes=1000-5000", 1000, 1023),
+    ],
+)
+def test_byte_range(client, audio, header, first, last):
+    response = client.get(audio, headers={"Range": header})
+
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes {first}-{last}/{len(CONTENT)}"
+    assert response.content == CONTENT[first : last + 1]
+
+
+@pytest.mark.parametrize("header", ["bytes=1024-", "bytes=5000-6000", "bytes=-0"])
+def test_unsatisfiable_range(client, audio, header):
+    response = client.get(audio, headers={"Range": header})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_stale_if_range_sends_the_whole_file(client, audio):
+    response = client.get(audio, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_only_media_files_are_served(client, audio, tmp_path):
+    (tmp_path / "notes.txt").write_text("not media")
+
+    assert client.get("/media/notes.txt").status_code == 404
+    assert client.get("/media/../main.py").status_code == 404
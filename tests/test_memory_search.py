@@ -0,0 +1,53 @@
+import asyncio
+from functools import partial
+
+from services.search_index import MemorySearchBackend
+
+
+class Catalog:
+    """
+    Stands in for the session ``load`` reads from; ``during`` runs as if
+    committed by another request while the rows are read.
+    """
+
+    def __init__(self, rows, during=None):
+        self.rows = rows
+        self.during = during
+
+    async def execute(self, stmt):
+        if self.during:
+            self.during()
+        return self
+
+    def all(self):
+        return self.rows
+
+
+def ids(backend: MemorySearchBackend, query: str):
+    return sorted(site_id for site_id, _ in backend.rank(query.split()))
+
+
+def test_load_replaces_the_index():
+    backend = MemorySearchBackend()
+    backend._add([(9, "Stale", "gone")])
+
+    asyncio.run(backend.load(Catalog([(1, "Apollo Theater", "music hall")])))
+
+    assert ids(backend, "stale") == []
+    assert ids(backend, "apollo") == [1]
+
+
+def test_writes_during_a_load_are_replayed():
+    backend = MemorySearchBackend()
+    rows = [(1, "Apollo Theater", "music hall"), (2, "Cotton Club", "jazz club")]
+
+    def commit():
+        backend._apply(partial(backend._remove, [rows[1]]))
+        backend._apply(partial(backend._add, [(2, "Cotton Club", "moved downtown")]))
+        backend._apply(partial(backend._add, [(3, "Savoy Ballroom", "jazz dancing")]))
+
+    asyncio.run(backend.load(Catalog(rows, commit)))
+
+    assert ids(backend, "jazz") == [3]
+    assert ids(backend, "club") == [2]
+    assert backend._total_length == sum(backend._lengths.values())
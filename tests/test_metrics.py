@@ -0,0 +1,80 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from api import instrumentation, metrics_router
+from api.instrumentation import MetricsMiddleware, N_PLUS_ONE, instrument_engine
+from conftest import import_sites, site
+
+
+def scrape(client) -> dict:
+    """
+    Samples of a /metrics response, keyed by name and label set.
+    """
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith("#"):
+            key, value = line.rsplit(" ", 1)
+            samples[key] = float(value)
+    return samples
+
+
+def test_requests_are_recorded_by_route_template(client):
+    import_sites(client, [site(1), site(2)])
+    before = scrape(client)
+
+    for site_id in (1, 2, 99):
+        client.get(f"/sites/{site_id}")
+    after = scrape(client)
+
+    def delta(key):
+        return after.get(key, 0) - before.get(key, 0)
+
+    ok = 'http_request_duration_seconds_count{method="GET",route="/sites/{site_id}",status="200"}'
+    missing = 'http_request_duration_seconds_count{method="GET",route="/sites/{site_id}",status="404"}'
+    assert delta(ok) == 2
+    assert delta(missing) == 1
+    assert not any('route="/sites/1"' in key for key in after)
+    assert delta('http_request_db_queries_count{route="/sites/{site_id}"}') == 3
+    assert delta('http_request_db_queries_sum{route="/sites/{site_id}"}') >= 3
+    assert delta('db_n_plus_one_requests_total{route="/sites/{site_id}"}') == 0
+    assert 'db_query_duration_seconds_count{operation="SELECT"}' in after
+    assert "job_queue_depth" in after
+    assert "db_pool_checkouts_total" in after
+
+
+def test_metrics_token(client, monkeypatch):
+    monkeypatch.setattr(metrics_router, "METRICS_TOKEN", "s3cret")
+
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+
+def test_repeated_selects_are_counted_as_n_plus_one(monkeypatch):
+    monkeypatch.setattr(instrumentation, "N_PLUS_ONE_THRESHOLD", 5)
+    engine = create_async_engine("sqlite+aiosqlite://")
+    instrument_engine(engine)
+    app = FastAPI()
+
+    @app.get("/rows/{count}")
+    async def rows(count: int):
+        async with engine.connect() as connection:
+            for row in range(count):
+                await connection.execute(text("SELECT :row"), {"row": row})
+        return {}
+
+    app = MetricsMiddleware(app)
+    before = N_PLUS_ONE._values.get(("/rows/{count}",), 0)
+
+    with TestClient(app) as client:
+        client.get("/rows/4")
+        assert N_PLUS_ONE._values.get(("/rows/{count}",), 0) == before
+        client.get("/rows/5")
+        client.get("/rows/20")
+
+    assert N_PLUS_ONE._values[("/rows/{count}",)] == before + 2
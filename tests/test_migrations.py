@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+from sqlalchemy import inspect, text
+
+from data.database import engine
+from data.schema import (
+    BASELINE_REVISION,
+    _current_revision,
+    _downgrade,
+    _upgrade,
+    alembic_config,
+    head_revision,
+    schema_status,
+    upgrade_schema,
+)
+
+
+async def _empty_database(conn):
+    if await conn.run_sync(_current_revision) is not None:
+        await conn.run_sync(_downgrade, alembic_config(), "base")
+    for table in ("usercontribution", "historicalsite", "alembic_version"):
+        await conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+
+
+@pytest.fixture(autouse=True)
+def empty_database_after():
+    yield
+
+    async def empty():
+        async with engine.begin() as conn:
+            await _empty_database(conn)
+        await engine.dispose()
+
+    asyncio.run(empty())
+
+
+async def _baseline_database(*statements):
+    """
+    An unversioned database as create_all() left it before migrations.
+    """
+    async with engine.begin() as conn:
+        await _empty_database(conn)
+        await conn.run_sync(_upgrade, alembic_config(), BASELINE_REVISION)
+        await conn.execute(text("DROP TABLE alembic_version"))
+        for statement in statements:
+            await conn.execute(text(statement))
+
+
+async def _adopt():
+    try:
+        await upgrade_schema()
+        async with engine.connect() as conn:
+            columns = await conn.run_sync(
+                lambda sync: {c["name"] for c in inspect(sync).get_columns("historicalsite")}
+            )
+            site = (
+                await conn.execute(text("SELECT geohash, version FROM historicalsite"))
+            ).one()
+            tags = (
+                await conn.execute(text("SELECT tag FROM sitetag ORDER BY tag"))
+            ).scalars().all()
+        return await schema_status(), columns, site, tags
+    finally:
+        await engine.dispose()
+
+
+def test_baseline_database_is_adopted_and_migrated():
+    async def run():
+        await _baseline_database(
+            "INSERT INTO historicalsite (name, description, latitude, longitude, era, "
+            "tags, images, verified, date_established) VALUES ('Apollo Theater', "
+            "'Music hall', 40.81, -73.95, '1910s', '[\"music\", \"Landmark\"]', '[]', 1, "
+            "'1914-01-26')"
+        )
+        return await _adopt()
+
+    (current, head), columns, site, tags = asyncio.run(run())
+
+    assert current == head == head_revision()
+    assert {"geohash", "version"} <= columns
+    assert site.geohash and site.version == 1
+    assert tags == ["landmark", "music"]
+
+
+def test_mismatched_unversioned_database_is_refused():
+    async def run():
+        await _baseline_database("ALTER TABLE historicalsite ADD COLUMN rating INTEGER")
+        try:
+            await upgrade_schema()
+        finally:
+            await engine.dispose()
+
+    with pytest.raises(RuntimeError, match="Cannot adopt unversioned database"):
+        asyncio.run(run())
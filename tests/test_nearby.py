@@ -0,0 +1,80 @@
+import math
+import random
+
+import pytest
+from conftest import import_sites
+
+from services.distance_engine import EARTH_RADIUS_KM
+
+CENTRES = [
+    # Harlem
+    (40.81, -73.95),
+    # Across the antimeridian (Fiji)
+    (-16.5, 179.99),
+    # Next to the pole
+    (89.95, 10.0),
+]
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def wrap(longitude: float) -> float:
+    return (longitude + 180) % 360 - 180
+
+
+@pytest.fixture
+def scattered(client):
+    rng = random.Random(7)
+    rows = []
+    for lat, lon in CENTRES:
+        for _ in range(150):
+            rows.append(
+                {
+                    "name": f"Site {len(rows)}",
+                    "description": "Scattered",
+                    "era": "Any",
+                    "latitude": max(-90.0, min(90.0, lat + rng.uniform(-0.2, 0.2))),
+                    "longitude": wrap(lon + rng.uniform(-0.3, 0.3)),
+                }
+            )
+    import_sites(client, rows)
+    return client, rows
+
+
+@pytest.mark.parametrize("centre", CENTRES)
+@pytest.mark.parametrize("radius_km", [0.5, 2, 10, 40])
+def test_radius_search_matches_a_brute_force_scan(scattered, centre, radius_km):
+    client, rows = scattered
+    lat, lon = centre
+
+    response = client.get(
+        "/sites/nearby",
+        params={"latitude": lat, "longitude": lon, "max_distance": radius_km},
+    )
+
+    assert response.status_code == 200, response.text
+    found = response.json()
+    distances = {row["name"]: haversine_km(lat, lon, row["latitude"], row["longitude"]) for row in rows}
+    expected = {name for name, distance in distances.items() if distance <= radius_km}
+    # Sites within a metre of the edge may fall either way
+    borderline = {
+        name for name, distance in distances.items() if abs(distance - radius_km) < 1e-3
+    }
+    assert {site["name"] for site in found} ^ expected <= borderline
+    assert [site["distance_m"] for site in found] == sorted(site["distance_m"] for site in found)
+    for site in found:
+        assert site["distance_m"] == pytest.approx(distances[site["name"]] * 1000, abs=0.01)
+
+
+def test_invalid_coordinates_are_rejected(client):
+    response = client.get(
+        "/sites/nearby", params={"latitude": 91, "longitude": 0, "max_distance": 1}
+    )
+
+    assert response.status_code == 400
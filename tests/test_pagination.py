@@ -0,0 +1,66 @@
+from conftest import import_sites, site
+
+from services.pagination import NEXT_CURSOR_HEADER
+
+
+def collect(client, url, **params):
+    ids, pages, cursor = [], 0, None
+    while True:
+        response = client.get(url, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        pages += 1
+        ids += [row["id"] for row in response.json()]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return ids, pages
+
+
+def test_list_pages_round_trip(client):
+    import_sites(client, [site(i) for i in range(25)])
+
+    ids, pages = collect(client, "/sites/", limit=10)
+
+    assert ids == sorted(ids)
+    assert len(ids) == len(set(ids)) == 25
+    assert pages == 3
+
+
+def test_last_full_page_has_no_cursor(client):
+    import_sites(client, [site(i) for i in range(10)])
+
+    response = client.get("/sites/", params={"limit": 10})
+
+    assert len(response.json()) == 10
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_search_pages_round_trip(client):
+    import_sites(client, [site(i, description="jazz " * (i % 4 + 1)) for i in range(30)])
+
+    ids, pages = collect(client, "/sites/search", query="jazz", limit=7)
+
+    assert len(ids) == len(set(ids)) == 30
+    assert pages == 5
+
+
+def test_date_pages_round_trip_with_ties(client):
+    years = [1920, 1905, 1920, 1899, 1905] * 3
+    import_sites(
+        client,
+        [site(i, date_established=f"{year}-01-01T00:00:00") for i, year in enumerate(years)]
+        + [site(99)],
+    )
+
+    ids, pages = collect(client, "/sites/dates", limit=4)
+
+    by_id = {row["id"]: row for row in client.get("/sites/", params={"limit": 50}).json()}
+    keys = [(by_id[i]["date_established"], i) for i in ids]
+    assert keys == sorted(keys)
+    assert len(ids) == len(set(ids)) == 15
+    assert pages == 4
+
+
+def test_invalid_cursor(client):
+    response = client.get("/sites/", params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
@@ -0,0 +1,53 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import profiling
+from api.profiling import ProfilingMiddleware
+
+TOKEN = "s3cret-token"
+
+
+@pytest.fixture
+def profiled(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", TOKEN)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    app = FastAPI()
+
+    @app.get("/hello")
+    async def hello():
+        return {"hello": "world"}
+
+    app.add_middleware(ProfilingMiddleware)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Profile": "wrong"}, {"X-Profile": TOKEN[:-1]}])
+def test_requests_without_the_token_are_not_profiled(profiled, tmp_path, headers):
+    response = profiled.get("/hello", headers={**headers, "X-Profile-Output": "inline"})
+
+    assert response.json() == {"hello": "world"}
+    assert "x-profile-id" not in response.headers
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_token_returns_the_profile_inline(profiled):
+    response = profiled.get(
+        "/hello", headers={"X-Profile": TOKEN, "X-Profile-Output": "inline"}
+    )
+
+    report = response.json()
+    assert report["route"] == "/hello"
+    assert report["status"] == 200
+    assert "collapsed" in report
+
+
+def test_token_in_the_query_writes_the_profile(profiled, tmp_path):
+    response = profiled.get("/hello", params={"profile": TOKEN, "x": "1"})
+
+    assert response.json() == {"hello": "world"}
+    profile_id = response.headers["x-profile-id"]
+    assert {path.suffix for path in tmp_path.glob(f"{profile_id}-*")} == {
+        ".json",
+        ".collapsed",
+    }
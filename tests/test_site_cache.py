@@ -0,0 +1,33 @@
+import sqlite3
+
+from conftest import TEST_DIR, import_sites, site
+
+from services.cache import site_cache
+
+
+def cached(site_id: int) -> bool:
+    return site_cache.get(site_cache.site_key(site_id)) is not None
+
+
+def test_own_writes_keep_unrelated_entries(client):
+    import_sites(client, [site(1), site(2)])
+    client.get("/sites/1")
+
+    client.put("/sites/2", json={"description": "Restored in 1990"})
+    client.get("/sites/2")
+
+    assert cached(1)
+    assert client.get("/sites/2").json()["description"] == "Restored in 1990"
+
+
+def test_writes_by_another_process_drop_the_cache(client):
+    import_sites(client, [site(1), site(2)])
+    client.get("/sites/1")
+
+    with sqlite3.connect(TEST_DIR / "test.db") as db:
+        db.execute("UPDATE historicalsite SET description = 'Changed' WHERE id = 1")
+        db.execute("UPDATE catalogversion SET version = version + 1")
+    client.get("/sites/2")
+
+    assert not cached(1)
+    assert client.get("/sites/1").json()["description"] == "Changed"
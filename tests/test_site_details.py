@@ -0,0 +1,86 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from conftest import import_sites, site
+from data.database import engine
+
+
+@contextmanager
+def recorded_queries():
+    """
+    Statements the application runs while the block executes, leaving out
+    the job queue's own polling.
+    """
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "jobs" not in statement:
+            statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+def add_contributions(client, site_id: int, statuses):
+    for status in statuses:
+        response = client.post(
+            "/contributions/",
+            json={
+                "historical_site_id": site_id,
+                "contributor_name": f"Contributor {status}",
+                "contribution_details": f"A {status} memory of site {site_id}",
+            },
+        )
+        assert response.status_code == 200, response.text
+    contributions = client.get("/contributions/all", params={"limit": 100}).json()
+    created = [c for c in contributions if c["historical_site_id"] == site_id]
+    for contribution, status in zip(created, statuses):
+        action = {"approved": "approve", "rejected": "reject"}.get(status)
+        if action:
+            client.patch(f"/contributions/{contribution['id']}/{action}")
+
+
+def seed(client, count: int):
+    import_sites(client, [site(i) for i in range(count)])
+    for site_id in range(1, count + 1):
+        add_contributions(client, site_id, ["approved", "approved", "pending", "rejected"])
+
+
+def test_detail_holds_approved_contributions_and_counts(client):
+    seed(client, 1)
+
+    detail = client.get("/sites/1/detail").json()
+
+    assert len(detail["contributions"]) == 2
+    assert {c["contributor_name"] for c in detail["contributions"]} == {
+        "Contributor approved"
+    }
+    assert detail["contribution_counts"] == {"approved": 2, "pending": 1, "rejected": 1}
+    assert client.get("/sites/99/detail").status_code == 404
+
+
+def test_detail_query_count(client):
+    seed(client, 1)
+
+    with recorded_queries() as statements:
+        assert client.get("/sites/1/detail").status_code == 200
+
+    assert len(statements) == 3
+
+
+def test_viewport_query_count_does_not_grow_with_the_page(client):
+    seed(client, 6)
+    viewport = {"min_lat": 40.7, "min_lon": -74.0, "max_lat": 40.9, "max_lon": -73.9}
+
+    with recorded_queries() as small:
+        one = client.get("/sites/viewport", params={**viewport, "limit": 1}).json()
+    with recorded_queries() as large:
+        six = client.get("/sites/viewport", params={**viewport, "limit": 6}).json()
+
+    assert len(one) == 1 and len(six) == 6
+    assert all(len(detail["contributions"]) == 2 for detail in six)
+    assert len(small) == len(large) == 3
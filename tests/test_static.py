@@ -0,0 +1,79 @@
+import gzip
+import os
+
+import pytest
+
+from api import static_router
+from services.static_assets import StaticManifest
+
+CSS = b"body { color: black; }\n" * 100
+
+
+@pytest.fixture
+def assets(client, tmp_path, monkeypatch):
+    (tmp_path / "site.css").write_bytes(CSS)
+    manifest = StaticManifest(tmp_path)
+    manifest.load()
+    monkeypatch.setattr(static_router, "static_assets", manifest)
+    return manifest
+
+
+def test_negotiates_a_precompressed_body(client, assets):
+    response = client.get("/static/site.css", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == CSS
+    assert gzip.decompress(assets._entries["site.css"][0].encoded["gzip"]) == CSS
+
+
+def test_identity_when_no_coding_is_accepted(client, assets):
+    response = client.get("/static/site.css", headers={"Accept-Encoding": "gzip;q=0"})
+
+    assert "content-encoding" not in response.headers
+    assert response.content == CSS
+
+
+def test_each_coding_has_its_own_etag(client, assets):
+    plain = client.get("/static/site.css", headers={"Accept-Encoding": "identity"})
+    gzipped = client.get("/static/site.css", headers={"Accept-Encoding": "gzip"})
+
+    assert plain.headers["etag"] != gzipped.headers["etag"]
+    revalidated = client.get(
+        "/static/site.css",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]},
+    )
+    assert revalidated.status_code == 304
+
+
+def test_fingerprinted_path_is_immutable(client, assets):
+    url = client.get("/static/_manifest.json").json()["site.css"]
+
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert "immutable" in response.headers["cache-control"]
+    assert "immutable" not in client.get("/static/site.css").headers["cache-control"]
+
+
+def test_misses_are_remembered(client, assets, tmp_path):
+    assert client.get("/static/late.css").status_code == 404
+    (tmp_path / "late.css").write_bytes(CSS)
+
+    assert client.get("/static/late.css").status_code == 404
+    assets._misses.clear()
+    assert client.get("/static/late.css").status_code == 200
+
+
+def test_files_changed_in_place_are_reindexed(client, assets, tmp_path):
+    old_url = client.get("/static/_manifest.json").json()["site.css"]
+    etag = client.get("/static/site.css").headers["etag"]
+    changed = b"body { color: red; }\n" * 100
+    (tmp_path / "site.css").write_bytes(changed)
+    os.utime(tmp_path / "site.css", ns=(0, 10**9))
+
+    response = client.get("/static/site.css", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.content == changed
+    assert client.get(old_url).status_code == 404
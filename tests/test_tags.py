@@ -0,0 +1,59 @@
+import pytest
+from conftest import import_sites, site
+
+
+@pytest.fixture
+def tagged(client):
+    import_sites(
+        client,
+        [
+            site(1, tags=["jazz", "music"]),
+            site(2, tags=["Jazz", "landmark"]),
+            site(3, tags=["music"]),
+            site(4, tags=["landmark"]),
+            site(5, tags=[]),
+        ],
+    )
+    return client
+
+
+def names(response):
+    assert response.status_code == 200, response.text
+    return sorted(row["name"] for row in response.json())
+
+
+def test_any_tag(tagged):
+    response = tagged.get("/sites/search", params={"tags": ["jazz", "music"]})
+
+    assert names(response) == ["Site 1", "Site 2", "Site 3"]
+
+
+def test_every_tag(tagged):
+    response = tagged.get(
+        "/sites/search", params={"tags": ["jazz", "music"], "tag_mode": "all"}
+    )
+
+    assert names(response) == ["Site 1"]
+
+
+def test_tags_are_case_insensitive(tagged):
+    response = tagged.get("/sites/search", params={"tags": ["JAZZ"]})
+
+    assert names(response) == ["Site 1", "Site 2"]
+
+
+def test_tags_combine_with_text_search(tagged):
+    response = tagged.get(
+        "/sites/search", params={"query": "number 2", "tags": ["landmark"]}
+    )
+
+    assert names(response) == ["Site 2"]
+
+
+def test_tag_facets(tagged):
+    response = tagged.get("/sites/tags", params={"tags": ["landmark"]})
+
+    assert response.json() == [
+        {"tag": "landmark", "count": 2},
+        {"tag": "jazz", "count": 1},
+    ]
@@ -0,0 +1,52 @@
+import pytest
+from conftest import import_sites, site
+
+
+@pytest.fixture
+def dated(client):
+    import_sites(
+        client,
+        [
+            site(1, date_established="1905-03-01T00:00:00"),
+            site(2, date_established="1909-12-31T00:00:00"),
+            site(3, date_established="1921-06-15T00:00:00"),
+            site(4, date_established="1899-01-01T00:00:00"),
+            site(5),
+        ],
+    )
+    return client
+
+
+def test_decades(dated):
+    response = dated.get("/sites/timeline")
+
+    assert response.json() == [
+        {"start_year": 1890, "end_year": 1899, "count": 1},
+        {"start_year": 1900, "end_year": 1909, "count": 2},
+        {"start_year": 1920, "end_year": 1929, "count": 1},
+    ]
+
+
+def test_centuries(dated):
+    response = dated.get("/sites/timeline", params={"bucket": "century"})
+
+    assert response.json() == [
+        {"start_year": 1800, "end_year": 1899, "count": 1},
+        {"start_year": 1900, "end_year": 1999, "count": 3},
+    ]
+
+
+def test_date_range(dated):
+    response = dated.get(
+        "/sites/timeline",
+        params={"bucket": "year", "start_date": "1900-01-01", "end_date": "1909-12-31"},
+    )
+
+    assert response.json() == [
+        {"start_year": 1905, "end_year": 1905, "count": 1},
+        {"start_year": 1909, "end_year": 1909, "count": 1},
+    ]
+
+
+def test_unknown_bucket(client):
+    assert client.get("/sites/timeline", params={"bucket": "week"}).status_code == 422